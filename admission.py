@@ -0,0 +1,200 @@
+import asyncio
+import collections
+import os
+
+from starlette.responses import JSONResponse
+
+ADMISSION_ENABLED = os.getenv("ATS_ADMISSION", "1") == "1"
+# Seconds a client is told to wait (`Retry-After`) before retrying a rejected request.
+RETRY_AFTER_SECONDS = int(os.getenv("ATS_ADMISSION_RETRY_AFTER_SECONDS", "2"))
+
+# Per-worker limits of the heavy endpoints: concurrent requests, requests
+# waiting for a slot, and the longest wait in seconds. Endpoints not listed
+# (cheap reads) are never limited. Overridden by `ATS_ADMISSION_LIMITS`,
+# e.g. "/upload-resume/=4:8:10,/match-candidates/=2:4:5".
+DEFAULT_LIMITS = {
+    "/upload-resume/": (4, 8, 10.0),
+    "/post-job/": (8, 16, 5.0),
+    "/match-candidates/": (2, 4, 5.0),
+    "/search-candidates/": (16, 32, 2.0),
+    "/similar-candidates/": (16, 32, 2.0),
+    "/match-jobs/": (16, 32, 2.0),
+    "/delete-resumes/": (1, 2, 5.0),
+}
+
+
+def parse_limits(spec):
+
+    """
+    Parses `path=concurrency:queue[:timeout]` entries separated by commas.
+
+    Returns:
+        dict: Path to `(max_concurrent, max_queued, queue_timeout)`.
+    """
+
+    limits = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        path, separator, values = entry.partition("=")
+        parts = values.split(":")
+        if not separator or not path.startswith("/") or len(parts) not in (2, 3):
+            raise ValueError(f"Invalid admission limit: {entry!r}")
+        max_concurrent, max_queued = int(parts[0]), int(parts[1])
+        queue_timeout = float(parts[2]) if len(parts) == 3 else 5.0
+        if max_concurrent < 1 or max_queued < 0 or queue_timeout < 0:
+            raise ValueError(f"Invalid admission limit: {entry!r}")
+        limits[path] = (max_concurrent, max_queued, queue_timeout)
+    return limits
+
+
+ADMISSION_LIMITS = {**DEFAULT_LIMITS, **parse_limits(os.getenv("ATS_ADMISSION_LIMITS", ""))}
+
+
+class Rejected(Exception):
+
+    def __init__(self, status_code, reason):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+
+
+class AdmissionLimiter:
+
+    """
+    Concurrency limit with a bounded, first-come wait queue.
+
+    A request is admitted while fewer than `max_concurrent` run. Otherwise it
+    waits for a slot if fewer than `max_queued` are already waiting, and is
+    rejected with 429 if not; a request that waits longer than
+    `queue_timeout` is rejected with 503.
+
+    Args:
+        max_concurrent (int): Requests allowed to run at once.
+        max_queued (int): Requests allowed to wait for a slot.
+        queue_timeout (float): Longest wait for a slot, in seconds.
+    """
+
+    def __init__(self, max_concurrent, max_queued, queue_timeout):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters = collections.deque()
+        self.admitted = 0
+        self.queued_total = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    @property
+    def queued(self):
+        return sum(not waiter.done() for waiter in self._waiters)
+
+    async def acquire(self):
+
+        if self.active < self.max_concurrent and not self.queued:
+            self.active += 1
+            self.admitted += 1
+            return
+        if self.queued >= self.max_queued:
+            self.rejected += 1
+            raise Rejected(429, "Too many requests for this endpoint; retry later.")
+
+        # A released slot is handed straight to the oldest waiter, so `active`
+        # is not decremented and a newcomer cannot overtake the queue.
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued_total += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if not waiter.done():
+                waiter.cancel()
+                self.timed_out += 1
+                raise Rejected(503, "Server is overloaded; retry later.")
+        except asyncio.CancelledError:
+            # The client went away while waiting; give back a slot it was handed.
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+        finally:
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
+        self.admitted += 1
+
+    def release(self):
+
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def stats(self):
+
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queued": self.max_queued,
+            "active": self.active,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "queued_total": self.queued_total,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+limiters = {path: AdmissionLimiter(*limit) for path, limit in ADMISSION_LIMITS.items()}
+
+
+def limiter_for(path):
+
+    """Limiter of the longest configured prefix of `path` (so `/match-jobs/` covers `/match-jobs/{resume_id}`)."""
+
+    for prefix in sorted(limiters, key=len, reverse=True):
+        if path == prefix or (prefix.endswith("/") and path.startswith(prefix)):
+            return limiters[prefix]
+    return None
+
+
+def admission_stats():
+
+    return {path: limiter.stats() for path, limiter in limiters.items()}
+
+
+class AdmissionMiddleware:
+
+    """
+    ASGI middleware applying the per-endpoint limiters before routing, so a
+    saturated endpoint sheds load without parsing bodies or touching stores,
+    while endpoints without a limit are served as usual.
+    """
+
+    def __init__(self, app, enabled=None):
+        self.app = app
+        self.enabled = ADMISSION_ENABLED if enabled is None else enabled
+
+    async def __call__(self, scope, receive, send):
+
+        limiter = limiter_for(scope["path"]) if self.enabled and scope["type"] == "http" else None
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await limiter.acquire()
+        except Rejected as e:
+            response = JSONResponse(
+                status_code=e.status_code,
+                content={"message": e.reason},
+                headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+            )
+            await response(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
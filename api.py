@@ -1,21 +1,38 @@
 import sentry_sdk
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header, Depends, Query, Request
 from fastapi.responses import JSONResponse
 from fastapi.exceptions import RequestValidationError
+from starlette.concurrency import run_in_threadpool
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from resume_parsing import parse_resume_with_llm
-from job_matching import calculate_ats_score
-from database_integration import save_candidate, save_job, delete_candidate, delete_job, session, Candidate, Job
+from job_matching import calculate_ats_score, rank_jobs_for_resume, find_similar_candidates
+from database_integration import (
+    save_candidate, save_job, delete_candidate, delete_job,
+    update_candidate, find_candidate_by_hash, fetch_candidate_records, fetch_job_records, release_session
+)
 from chroma_utils import (
     add_to_job_chroma, 
     get_all_jobs_from_chroma,
     delete_resume_from_chroma,
     delete_job_from_chroma
 )
-from embedding_utils import generate_embedding
+from embedding_utils import generate_embedding, generate_query_embedding
+from embedding_versions import registry as embedding_registry
+from tenants import DEFAULT_TENANT, validate_tenant
+from geo_utils import geocode
+from resume_attributes import SENIORITY_LEVELS, DEGREE_LEVELS
+from dedup import DEDUP_POLICY, IDENTITY_FIELDS
+from outbox import record_write, abort_write
+from compaction import bulk_delete
+from serialization import negotiated_response
+from admission import AdmissionMiddleware, admission_stats
 import numpy as np
 import bleach
 import io
+import os
+import hashlib
+import tempfile
+import uuid
 
 sentry_sdk.init(
     dsn="https://78b82319c77e287d108d3702614386dd@o4508931097100288.ingest.de.sentry.io/4508931099000912",  
@@ -24,11 +41,65 @@ sentry_sdk.init(
 )
 
 app = FastAPI()
+app.add_middleware(AdmissionMiddleware)
+
+MAX_RESUME_SIZE = 5 * 1024 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+MAX_BATCH_RECORDS = 500
+MAX_SEARCH_DEPTH = 1000
+MAX_SEARCH_QUERY_LENGTH = 1000
+MAX_SIMILAR_SEEDS = 100
+
+def get_tenant(x_tenant_id: str = Header(default=DEFAULT_TENANT)):
+
+    try:
+        return validate_tenant(x_tenant_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def get_near(near: str = None, radius_km: float = Query(default=50, gt=0, le=20000)):
+
+    # `near` is a place name from the offline gazetteer, e.g. "Baku".
+    if near is None:
+        return None
+    place = geocode(near)
+    if place is None:
+        raise HTTPException(status_code=400, detail=f"Unknown location: {near}")
+    _, latitude, longitude = place
+    return latitude, longitude, radius_km
+
+def get_attributes(
+    min_years: float = Query(default=None, ge=0),
+    max_years: float = Query(default=None, ge=0),
+    seniority: str = None,
+    degree: str = None
+):
+
+    # Minimum seniority/degree by name, e.g. `seniority=senior&degree=master`.
+    if seniority is not None and seniority not in SENIORITY_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Unknown seniority: {seniority}")
+    if degree is not None and degree not in DEGREE_LEVELS:
+        raise HTTPException(status_code=400, detail=f"Unknown degree: {degree}")
+    attributes = {
+        "min_years": min_years,
+        "max_years": max_years,
+        "min_seniority": SENIORITY_LEVELS.get(seniority),
+        "min_degree": DEGREE_LEVELS.get(degree),
+    }
+    attributes = {name: value for name, value in attributes.items() if value is not None}
+    return attributes or None
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the ATS system!"}
 
+@app.get("/admission-stats/")
+def get_admission_stats():
+
+    # Per-worker counters of the endpoint limiters: running, waiting, and
+    # rejected because the queue was full (429) or the wait timed out (503).
+    return admission_stats()
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
     
@@ -61,8 +132,51 @@ async def http_exception_handler(request, exc):
         content={"message": exc.detail}
     )
 
+async def run_off_loop(func, *args, **kwargs):
+
+    # Runs func on the thread pool with that thread's own database session,
+    # released when it returns. Handlers do all embedding, Chroma and
+    # database work through it, so the event loop only parses requests and
+    # runs the admission limiter, and cheap reads are not stuck behind
+    # inference.
+    def call():
+        try:
+            return func(*args, **kwargs)
+        finally:
+            release_session()
+
+    return await run_in_threadpool(call)
+
+async def spool_upload(file: UploadFile, suffix: str, max_size: int = MAX_RESUME_SIZE):
+
+    # Copies the upload to a named temp file in fixed-size chunks, hashing as
+    # it goes, so at most one chunk is held in memory and the extractor can
+    # read the file by path. Oversized uploads are rejected from the declared
+    # size before reading, or as soon as the running total passes the limit.
+    if file.size is not None and file.size > max_size:
+        raise HTTPException(status_code=400, detail="File size exceeds the maximum allowed limit of 5 MB.")
+
+    digest = hashlib.sha256()
+    size = 0
+    spooled = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
+    try:
+        with spooled:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(status_code=400, detail="File size exceeds the maximum allowed limit of 5 MB.")
+                digest.update(chunk)
+                spooled.write(chunk)
+    except BaseException:
+        os.remove(spooled.name)
+        raise
+    return spooled.name, digest.hexdigest(), size
+
 @app.post("/upload-resume/")
-async def upload_resume(name: str, location: str, file: UploadFile = File(...)):
+async def upload_resume(name: str, location: str, file: UploadFile = File(...), tenant: str = Depends(get_tenant)):
 
 
     if not name or name.strip() == "":
@@ -73,35 +187,84 @@ async def upload_resume(name: str, location: str, file: UploadFile = File(...)):
     if file.content_type not in ["application/pdf", "application/vnd.openxmlformats-officedocument.wordprocessingml.document"]:
         raise HTTPException(status_code=400, detail="Invalid file format. Only PDF and DOCX files are allowed.")
     
-    resume_content = await file.read()
-    
-    if not resume_content or len(resume_content) == 0:
-        raise HTTPException(status_code=400, detail="The uploaded file is empty.")
-    
-    max_file_size = 5 * 1024 * 1024  
-    if len(resume_content) > max_file_size:
-        raise HTTPException(status_code=400, detail="File size exceeds the maximum allowed limit of 5 MB.")
-    
     if file.content_type == "application/pdf":
         file_type = "pdf"
     elif file.content_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
         file_type = "docx"
-    
-    parsed_data, _ = parse_resume_with_llm(resume_content, name, location, file_type)
-    
+
+    resume_path, resume_hash, resume_size = await spool_upload(file, suffix=f".{file_type}")
+    try:
+        if resume_size == 0:
+            raise HTTPException(status_code=400, detail="The uploaded file is empty.")
+
+        # Deduplication, extraction and both writes run on one pool thread,
+        # so the journal entry stays in that thread's session and the event
+        # loop keeps serving (and shedding) other requests meanwhile.
+        return await run_off_loop(store_resume, resume_path, resume_hash, name, location, file_type, tenant)
+    finally:
+        os.remove(resume_path)
+
+def store_resume(resume_path, resume_hash, name, location, file_type, tenant):
+
+    if DEDUP_POLICY != "allow":
+        existing = find_candidate_by_hash(resume_hash, tenant=tenant)
+        # Same answers as for near duplicates: 409 under `reject`, the
+        # existing candidate's id under `merge` (there is nothing to merge).
+        if existing and DEDUP_POLICY == "reject":
+            raise HTTPException(status_code=409, detail=f"Resume is a duplicate of candidate {existing.unique_id}.")
+        if existing:
+            return {
+                "message": "Resume already uploaded",
+                "parsed_data": {"unique_id": existing.unique_id, "duplicate_of": existing.unique_id}
+            }
+
+    # The write is journaled before Chroma is touched, so an upload that
+    # dies before its PostgreSQL row is saved is finished or undone by the
+    # outbox sweep instead of leaving an orphaned vector. A near-duplicate
+    # merge re-journals the entry under the existing candidate.
+    unique_id = str(uuid.uuid4())
+    outbox_entry = record_write(
+        "resume_save", unique_id, tenant=tenant,
+        payload={"name": name, "location": location, "content_hash": resume_hash}
+    )
+    parsed_data, _ = parse_resume_with_llm(
+        resume_path, name, location, file_type,
+        tenant=tenant, content_hash=resume_hash, unique_id=unique_id, outbox_entry=outbox_entry
+    )
+
+    if "error" in parsed_data:
+        abort_write(outbox_entry)
+        if parsed_data.get("duplicate_of"):
+            raise HTTPException(status_code=409, detail=f"Resume is a duplicate of candidate {parsed_data['duplicate_of']}.")
+        raise HTTPException(status_code=500, detail=parsed_data["error"])
+
     unique_id = parsed_data.get("unique_id")
-    save_candidate({
+    candidate_data = {
         "name": name,
         "location": location,
         "experience": parsed_data.get("experience"),
         "education": parsed_data.get("education"),
-        "skills": parsed_data.get("skills")
-    }, unique_id)
-    
+        "skills": parsed_data.get("skills"),
+        "content_hash": resume_hash,
+        "embedding_text": parsed_data.get("embedding_text"),
+        "years_experience": parsed_data.get("years_experience"),
+        "seniority_level": parsed_data.get("seniority_level"),
+        "degree_level": parsed_data.get("degree_level")
+    }
+    # A merge keeps the existing candidate's name and location.
+    merged = parsed_data.get("duplicate_of") and update_candidate(
+        {field: value for field, value in candidate_data.items() if field not in IDENTITY_FIELDS},
+        unique_id, tenant=tenant, outbox_entry=outbox_entry
+    )
+    if not merged:
+        # Also reached when the merge target's row was deleted meanwhile:
+        # the resume is already in Chroma under that id, so it gets a new row.
+        save_candidate(candidate_data, unique_id, tenant=tenant, outbox_entry=outbox_entry)
+
     return {"message": "Resume uploaded successfully", "parsed_data": parsed_data}
 
 @app.post("/post-job/")
-async def post_job(job_title: str, job_description: str):
+async def post_job(job_title: str, job_description: str, tenant: str = Depends(get_tenant)):
 
     if not job_description or job_description.strip() == "":
         raise HTTPException(status_code=400, detail="Job description cannot be empty.")
@@ -117,48 +280,180 @@ async def post_job(job_title: str, job_description: str):
         strip=True  
     )
     
-    job_embedding = generate_embedding(sanitized_description)
-        
-    metadata = {
-        "title": job_title,
-        "description": sanitized_description
-    }
-    unique_id = add_to_job_chroma(job_embedding, metadata)
+    version = embedding_registry.active_version()
+
+    def store_job():
 
-    save_job(job_title, sanitized_description, unique_id)
+        job_embedding = generate_embedding(sanitized_description, version=version)
 
+        metadata = {
+            "title": job_title,
+            "description": sanitized_description
+        }
+        unique_id = str(uuid.uuid4())
+        outbox_entry = record_write(
+            "job_save", unique_id, tenant=tenant, payload={"title": job_title, "description": sanitized_description}
+        )
+        unique_id = add_to_job_chroma(
+            job_embedding, metadata, tenant=tenant, text=sanitized_description, version=version, unique_id=unique_id
+        )
+
+        save_job(job_title, sanitized_description, unique_id, tenant=tenant, outbox_entry=outbox_entry)
+        return unique_id
+
+    unique_id = await run_off_loop(store_job)
     return {"message": "Job posted successfully", "unique_id": unique_id}
 
 @app.get("/match-candidates/")
-async def match_candidates():
+async def match_candidates(
+    request: Request,
+    skills: list[str] = Query(default=None),
+    location: str = None,
+    near: tuple = Depends(get_near),
+    attributes: dict = Depends(get_attributes),
+    tenant: str = Depends(get_tenant)
+):
    
-    job_ids, job_embeddings, job_metadatas = get_all_jobs_from_chroma()
+    # Jobs and resumes are read from the same embedding version even if the
+    # active one switches while the request runs.
+    version = embedding_registry.active_version()
+    job_ids, job_embeddings, job_metadatas = await run_off_loop(get_all_jobs_from_chroma, tenant=tenant, version=version)
     
     if not job_ids:
-        return {"error": "No jobs found in Databases"}
+        return negotiated_response(request, {"error": "No jobs found in Databases"})
     
+    def match_all_jobs():
+
+        results = []
+        for i, job_embedding in enumerate(job_embeddings):
+
+            job_embedding = np.array(job_embedding)
+
+            matched_candidates = calculate_ats_score(
+                job_embedding, tenant=tenant, version=version, skills=skills, location=location, near=near,
+                attributes=attributes
+            )
+            results.append({
+                "job_id": job_ids[i],
+                "job_title": job_metadatas[i].get("title"),
+                "job_description": job_metadatas[i].get("description"),
+                "matched_candidates": matched_candidates
+            })
+        return results
+
+    # Scoring every job is the heaviest request; it runs on the thread pool
+    # so cheap reads on this worker are not stuck behind it.
+    results = await run_off_loop(match_all_jobs)
+    return negotiated_response(request, {"results": results})
+
+
+@app.get("/search-candidates/")
+async def search_candidates(
+    request: Request,
+    query: str,
+    k: int = Query(default=10, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    skills: list[str] = Query(default=None),
+    location: str = None,
+    fields: list[str] = Query(default=None),
+    near: tuple = Depends(get_near),
+    attributes: dict = Depends(get_attributes),
+    tenant: str = Depends(get_tenant)
+):
+
+    if not query.strip():
+        raise HTTPException(status_code=400, detail="Query cannot be empty.")
+    if len(query) > MAX_SEARCH_QUERY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Query exceeds {MAX_SEARCH_QUERY_LENGTH} characters.")
+    if offset + k > MAX_SEARCH_DEPTH:
+        raise HTTPException(status_code=400, detail=f"Results beyond the first {MAX_SEARCH_DEPTH} are not available.")
+
+    # Pages are cut from the top offset + k, which stays cheap because the
+    # depth is bounded and the query embedding is cached between pages.
+    version = embedding_registry.active_version()
+
+    def search():
+
+        query_embedding = generate_query_embedding(query, version=version)
+        return calculate_ats_score(
+            query_embedding, tenant=tenant, version=version, skills=skills, location=location, k=offset + k, near=near,
+            attributes=attributes
+        )[offset:offset + k]
+
+    matches = await run_off_loop(search)
+
     results = []
-    for i, job_embedding in enumerate(job_embeddings):
+    for match in matches:
+        metadata = match["metadata"] or {}
+        if fields is not None:
+            metadata = {field: metadata.get(field) for field in fields}
+        results.append({"candidate_id": match["candidate_id"], "score": float(match["score"]), "metadata": metadata})
+    return negotiated_response(request, {
+        "results": results,
+        "offset": offset,
+        "next_offset": offset + k if len(results) == k and offset + k < MAX_SEARCH_DEPTH else None
+    })
 
-        job_embedding = np.array(job_embedding)
 
-        matched_candidates = calculate_ats_score(job_embedding)
-        results.append({
-            "job_id": job_ids[i],
-            "job_title": job_metadatas[i].get("title"),
-            "job_description": job_metadatas[i].get("description"),
-            "matched_candidates": matched_candidates
-        })
-    
-    return {"results": results}
+def _similar_response(request, seed_ids, matches):
+
+    return negotiated_response(request, {
+        "seed_ids": seed_ids,
+        "similar_candidates": [
+            {"candidate_id": match["candidate_id"], "score": float(match["score"]), "metadata": match["metadata"]}
+            for match in matches
+        ]
+    })
+
+
+@app.get("/similar-candidates/")
+async def similar_candidates_batch(
+    request: Request,
+    resume_ids: list[str] = Query(...),
+    k: int = Query(default=10, ge=1, le=100),
+    tenant: str = Depends(get_tenant)
+):
+
+    # Several seeds: candidates close to the seeds' centroid.
+    if len(resume_ids) > MAX_SIMILAR_SEEDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_SIMILAR_SEEDS} resume_ids per request.")
+    version = embedding_registry.active_version()
+    matches = await run_off_loop(find_similar_candidates, resume_ids, k=k, tenant=tenant, version=version)
+    if matches is None:
+        raise HTTPException(status_code=404, detail="None of the resumes were found")
+    return _similar_response(request, resume_ids, matches)
+
+
+@app.get("/similar-candidates/{resume_id}")
+async def similar_candidates(request: Request, resume_id: str, k: int = Query(default=10, ge=1, le=100), tenant: str = Depends(get_tenant)):
+
+    version = embedding_registry.active_version()
+    matches = await run_off_loop(find_similar_candidates, [resume_id], k=k, tenant=tenant, version=version)
+    if matches is None:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    return _similar_response(request, [resume_id], matches)
+
+
+@app.get("/match-jobs/{resume_id}")
+async def match_jobs(request: Request, resume_id: str, k: int = Query(default=10, ge=1, le=100), tenant: str = Depends(get_tenant)):
+
+    version = embedding_registry.active_version()
+    matched_jobs = await run_off_loop(rank_jobs_for_resume, resume_id, k=k, tenant=tenant, version=version)
+    if matched_jobs is None:
+        raise HTTPException(status_code=404, detail="Resume not found")
+    return negotiated_response(request, {"resume_id": resume_id, "matched_jobs": matched_jobs})
 
 
 @app.delete("/delete-resume/")
-async def delete_resume(unique_id: str):
-    
-    delete_resume_from_chroma(unique_id)
-    
-    deleted = delete_candidate(unique_id)
+async def delete_resume(unique_id: str, tenant: str = Depends(get_tenant)):
+
+    def remove_resume():
+
+        outbox_entry = record_write("resume_delete", unique_id, tenant=tenant)
+        delete_resume_from_chroma(unique_id, tenant=tenant)
+        return delete_candidate(unique_id, tenant=tenant, outbox_entry=outbox_entry)
+
+    deleted = await run_off_loop(remove_resume)
     
     if deleted:
         return {"message": "Resume deleted successfully"}
@@ -166,12 +461,35 @@ async def delete_resume(unique_id: str):
         raise HTTPException(status_code=404, detail="Resume not found")
 
 
+@app.delete("/delete-resumes/")
+async def delete_resumes(
+    unique_ids: list[str] = Query(default=None),
+    older_than_days: float = None,
+    location: str = None,
+    all_resumes: bool = False,
+    tenant: str = Depends(get_tenant)
+):
+
+    # Filters combine; deleting all of a tenant's resumes must be explicit.
+    if unique_ids is None and older_than_days is None and location is None and not all_resumes:
+        raise HTTPException(status_code=400, detail="Give unique_ids, older_than_days, location or all_resumes=true.")
+
+    deleted = await run_off_loop(
+        bulk_delete, tenant, unique_ids=unique_ids, older_than_days=older_than_days, location=location
+    )
+    return {"message": "Resumes deleted successfully", "deleted": deleted}
+
+
 @app.delete("/delete-job/")
-async def delete_job(unique_id: str):
-    
-    delete_job_from_chroma(unique_id)
-    
-    deleted = delete_job(unique_id)
+async def delete_job_posting(unique_id: str, tenant: str = Depends(get_tenant)):
+
+    def remove_job():
+
+        outbox_entry = record_write("job_delete", unique_id, tenant=tenant)
+        delete_job_from_chroma(unique_id, tenant=tenant)
+        return delete_job(unique_id, tenant=tenant, outbox_entry=outbox_entry)
+
+    deleted = await run_off_loop(remove_job)
     
     if deleted:
         return {"message": "Job deleted successfully"}
@@ -180,32 +498,39 @@ async def delete_job(unique_id: str):
 
 
 @app.get("/get-resume-data/")
-async def get_resume_data(unique_id: str):
+async def get_resume_data(unique_id: str, tenant: str = Depends(get_tenant)):
     
-    candidate = session.query(Candidate).filter_by(unique_id=unique_id).first()
+    candidate = (await run_off_loop(fetch_candidate_records, [unique_id], tenant=tenant)).get(unique_id)
     if candidate:
-        return {
-            "name": candidate.name,
-            "location": candidate.location,
-            "experience": candidate.experience,
-            "education": candidate.education,
-            "skills": candidate.skills,
-        }
+        return candidate
     else:
         raise HTTPException(status_code=404, detail="Resume not found")
 
 @app.get("/get-job-data/")
-async def get_job_data(unique_id: str):
+async def get_job_data(unique_id: str, tenant: str = Depends(get_tenant)):
     
-    job = session.query(Job).filter_by(unique_id=unique_id).first()
+    job = (await run_off_loop(fetch_job_records, [unique_id], tenant=tenant)).get(unique_id)
     if job:
-        return {
-            "title": job.title,
-            "description": job.description
-        }
+        return job
     else:
-        raise HTTPException(status_code=404, detail="Job not found")     
+        raise HTTPException(status_code=404, detail="Job not found")
+
+def _check_batch(unique_ids):
+
+    if len(unique_ids) > MAX_BATCH_RECORDS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_RECORDS} unique_ids per request.")
+
+@app.get("/get-resumes-data/")
+async def get_resumes_data(unique_ids: list[str] = Query(...), tenant: str = Depends(get_tenant)):
+
+    # One request (and at most one query) for every candidate of a match list.
+    _check_batch(unique_ids)
+    records = await run_off_loop(fetch_candidate_records, unique_ids, tenant=tenant)
+    return {"resumes": records, "missing": [unique_id for unique_id in unique_ids if unique_id not in records]}
 
-        
-           
+@app.get("/get-jobs-data/")
+async def get_jobs_data(unique_ids: list[str] = Query(...), tenant: str = Depends(get_tenant)):
 
+    _check_batch(unique_ids)
+    records = await run_off_loop(fetch_job_records, unique_ids, tenant=tenant)
+    return {"jobs": records, "missing": [unique_id for unique_id in unique_ids if unique_id not in records]}
@@ -0,0 +1,264 @@
+import glob
+import gzip
+import json
+import os
+import time
+import uuid
+import numpy as np
+from database_integration import find_candidate_ids, get_candidates, get_candidate, save_candidate
+from chroma_utils import PERSIST_DIRECTORY, get_resume_records, add_to_resume_chroma
+from embedding_utils import generate_embedding, generate_embeddings, resume_text_from_metadata
+from embedding_versions import registry as embedding_registry
+from outbox import delete_resumes, record_write
+from tenants import DEFAULT_TENANT, validate_tenant
+
+ARCHIVE_DIRECTORY = os.getenv("ATS_ARCHIVE_DIRECTORY", os.path.join(PERSIST_DIRECTORY, "archive"))
+RETENTION_DAYS = float(os.getenv("ATS_RETENTION_DAYS", "730"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ATS_ARCHIVE_BATCH_SIZE", "1000"))
+
+CANDIDATE_FIELDS = (
+    "name", "location", "experience", "education", "skills", "content_hash", "embedding_text",
+    "created_at", "updated_at",
+)
+
+
+def tenant_archive_directory(tenant=DEFAULT_TENANT):
+
+    return os.path.join(ARCHIVE_DIRECTORY, validate_tenant(tenant))
+
+
+def _segments(tenant):
+
+    # A segment is `<name>.npz` (ids + embeddings) and `<name>.jsonl.gz`
+    # (rows). The JSONL file is renamed into place last, so only complete
+    # segments are listed. Names sort by creation time.
+    paths = glob.glob(os.path.join(glob.escape(tenant_archive_directory(tenant)), "*.jsonl.gz"))
+    return sorted(path[:-len(".jsonl.gz")] for path in paths)
+
+
+def _replace_atomic(temp_path, path):
+
+    with open(temp_path, "rb") as temp_file:
+        os.fsync(temp_file.fileno())
+    os.replace(temp_path, path)
+
+
+def write_segment(tenant, unique_ids, embeddings, rows):
+
+    """
+    Write one compressed archive segment: float32 embeddings in an `.npz`
+    and one JSON line per candidate in a gzip file, in the same order.
+
+    Returns:
+        str: Path of the segment without extension.
+    """
+
+    directory = tenant_archive_directory(tenant)
+    os.makedirs(directory, exist_ok=True)
+    segment = os.path.join(directory, f"{int(time.time() * 1000):015d}-{uuid.uuid4().hex[:8]}")
+
+    with open(f"{segment}.npz.tmp", "wb") as npz_file:
+        np.savez_compressed(
+            npz_file, ids=np.array(unique_ids, dtype=str), embeddings=np.asarray(embeddings, dtype=np.float32)
+        )
+    _replace_atomic(f"{segment}.npz.tmp", f"{segment}.npz")
+
+    with gzip.open(f"{segment}.jsonl.gz.tmp", "wt", encoding="utf-8") as rows_file:
+        for row in rows:
+            rows_file.write(json.dumps(row) + "\n")
+    _replace_atomic(f"{segment}.jsonl.gz.tmp", f"{segment}.jsonl.gz")
+    return segment
+
+
+def read_segment(segment):
+
+    with np.load(f"{segment}.npz") as data:
+        unique_ids = data["ids"].tolist()
+        embeddings = data["embeddings"]
+    with gzip.open(f"{segment}.jsonl.gz", "rt", encoding="utf-8") as rows_file:
+        rows = [json.loads(line) for line in rows_file]
+    return unique_ids, embeddings, rows
+
+
+def archive_candidates(tenant=DEFAULT_TENANT, inactive_days=RETENTION_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+
+    """
+    Move a tenant's candidates not uploaded or merged into for
+    `inactive_days` to the archive, and delete them from Chroma and
+    PostgreSQL. Each batch is written to its own segment before it is
+    deleted, so an interrupted run loses nothing; it can only leave a
+    batch both archived and hot, which the next run archives again.
+
+    Returns:
+        int: Number of candidates archived.
+    """
+
+    cutoff = time.time() - inactive_days * 24 * 3600
+    unique_ids = find_candidate_ids(tenant, inactive_before=cutoff)
+    version = embedding_registry.active_version()
+    archived = 0
+    for start in range(0, len(unique_ids), batch_size):
+        chunk = unique_ids[start:start + batch_size]
+        records = get_resume_records(chunk, tenant=tenant, version=version)
+        candidates = {candidate.unique_id: candidate for candidate in get_candidates(chunk, tenant)}
+
+        # Rows without a vector are left for the reconciliation sweep to
+        # restore; they are archived by a later run.
+        stored = [
+            (unique_id, embedding, metadata)
+            for unique_id, embedding, metadata in zip(records['ids'], records['embeddings'], records['metadatas'])
+            if unique_id in candidates
+        ]
+        if not stored:
+            continue
+
+        archived_at = time.time()
+        rows = [
+            {
+                "unique_id": unique_id,
+                "embedding_version": version,
+                "archived_at": archived_at,
+                "candidate": {field: getattr(candidates[unique_id], field) for field in CANDIDATE_FIELDS},
+                "metadata": metadata,
+            }
+            for unique_id, _, metadata in stored
+        ]
+        write_segment(tenant, [unique_id for unique_id, _, _ in stored], [embedding for _, embedding, _ in stored], rows)
+        archived += delete_resumes([unique_id for unique_id, _, _ in stored], tenant=tenant)
+    return archived
+
+
+def _normalize(matrix):
+
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def search_archive(queries, tenant=DEFAULT_TENANT, k=10):
+
+    """
+    Batch cosine search over a tenant's archive, one segment in memory at a
+    time. Queries are embedded once per embedding version found in the
+    archive; an id archived more than once counts with its newest copy.
+
+    Args:
+        queries (list[str]): Query texts.
+        tenant (str): Tenant whose archive is searched.
+        k (int): Results per query.
+
+    Returns:
+        list[list[dict]]: Per query, the top matches as
+        `{"candidate_id", "score", "metadata"}`, best first.
+    """
+
+    query_vectors = {}
+    best_scores = [np.empty(0, dtype=np.float32) for _ in queries]
+    best_rows = [[] for _ in queries]
+    seen = set()
+
+    for segment in reversed(_segments(tenant)):
+        unique_ids, embeddings, rows = read_segment(segment)
+        keep = [position for position, unique_id in enumerate(unique_ids) if unique_id not in seen]
+        seen.update(unique_ids)
+        if not keep:
+            continue
+
+        version = rows[0]["embedding_version"]
+        if version not in query_vectors:
+            query_vectors[version] = _normalize(generate_embeddings(queries, version=version))
+        scores = query_vectors[version] @ _normalize(embeddings[keep]).T
+
+        for query in range(len(queries)):
+            merged_scores = np.concatenate([best_scores[query], scores[query]])
+            merged_rows = best_rows[query] + [rows[position] for position in keep]
+            top = np.argsort(-merged_scores, kind="stable")[:k]
+            best_scores[query] = merged_scores[top]
+            best_rows[query] = [merged_rows[i] for i in top]
+
+    return [
+        [
+            {"candidate_id": row["unique_id"], "score": float(score), "metadata": row["metadata"]}
+            for score, row in zip(best_scores[query], best_rows[query])
+        ]
+        for query in range(len(queries))
+    ]
+
+
+def _find_archived(unique_ids, tenant):
+
+    wanted = set(unique_ids)
+    found = {}
+    for segment in reversed(_segments(tenant)):
+        segment_ids, embeddings, rows = read_segment(segment)
+        for position, unique_id in enumerate(segment_ids):
+            if unique_id in wanted and unique_id not in found:
+                found[unique_id] = (embeddings[position], rows[position])
+        if len(found) == len(wanted):
+            break
+    return found
+
+
+def rehydrate(unique_ids, tenant=DEFAULT_TENANT):
+
+    """
+    Restore archived candidates into Chroma and PostgreSQL, journaled like
+    an upload. Candidates that are already hot are skipped. Embeddings of
+    another embedding version are recomputed from the stored text.
+
+    Returns:
+        list[str]: Ids restored.
+    """
+
+    version = embedding_registry.active_version()
+    restored = []
+    for unique_id, (embedding, row) in _find_archived(unique_ids, tenant).items():
+        if get_candidate(unique_id, tenant):
+            continue
+        candidate, metadata = row["candidate"], row["metadata"]
+        text = candidate.get("embedding_text") or resume_text_from_metadata(metadata)
+        if row["embedding_version"] != version:
+            embedding = generate_embedding(text, version=version)
+
+        outbox_entry = record_write(
+            "resume_save", unique_id, tenant=tenant,
+            payload={field: candidate.get(field) for field in ("name", "location", "content_hash")}
+        )
+        add_to_resume_chroma(
+            list(map(float, embedding)), metadata, tenant=tenant, text=text, version=version, unique_id=unique_id
+        )
+        save_candidate({**candidate, "embedding_text": text}, unique_id, tenant=tenant, outbox_entry=outbox_entry)
+        restored.append(unique_id)
+    return restored
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Archive inactive candidates and bring them back.")
+    parser.add_argument("--tenant", default=DEFAULT_TENANT)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    archive_parser = subparsers.add_parser("archive", help="Archive candidates inactive for --inactive-days.")
+    archive_parser.add_argument("--inactive-days", type=float, default=RETENTION_DAYS)
+    search_parser = subparsers.add_parser("search", help="Search the archive with one or more queries.")
+    search_parser.add_argument("--query", action="append", required=True)
+    search_parser.add_argument("-k", type=int, default=10)
+    rehydrate_parser = subparsers.add_parser("rehydrate", help="Restore candidates by id or by archive search.")
+    rehydrate_parser.add_argument("--ids", nargs="+", default=[])
+    rehydrate_parser.add_argument("--query", action="append", default=[])
+    rehydrate_parser.add_argument("-k", type=int, default=10)
+    args = parser.parse_args()
+
+    tenant = validate_tenant(args.tenant)
+    if args.command == "archive":
+        print(f"Archived {archive_candidates(tenant, args.inactive_days)} candidates.")
+    elif args.command == "search":
+        for query, matches in zip(args.query, search_archive(args.query, tenant, args.k)):
+            print(json.dumps({"query": query, "matches": matches}, indent=2))
+    else:
+        unique_ids = list(args.ids)
+        if args.query:
+            for matches in search_archive(args.query, tenant, args.k):
+                unique_ids.extend(match["candidate_id"] for match in matches)
+        print(f"Rehydrated {len(rehydrate(unique_ids, tenant))} candidates.")
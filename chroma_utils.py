@@ -1,70 +1,804 @@
 import chromadb
-from chromadb.utils import embedding_functions
+from chromadb.api.types import EmbeddingFunction
+import glob
 import os
+import shutil
+import sqlite3
 import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import numpy as np
+from embedding_snapshot import load_snapshot, update_snapshot, rebuild_snapshot, compact_snapshot
+from projection import load_projection
+from vector_index import VECTOR_INDEX_BACKENDS
+from tenants import DEFAULT_TENANT, validate_tenant, tenant_collection_name
+from embedding_versions import (
+    registry as embedding_registry, DEFAULT_EMBEDDING_VERSION, validate_version, versioned_collection_name
+)
+from embedding_utils import generate_embedding, generate_embeddings
 
 PERSIST_DIRECTORY = "/mnt/ebs/chroma_db_data"
 
+RESUME_SNAPSHOT_ENABLED = os.getenv("ATS_RESUME_SNAPSHOT", "0") == "1"
+RESUME_SNAPSHOT_PATH = os.path.join(PERSIST_DIRECTORY, "resume_snapshot.bin")
+# Chroma-nın metadata bazası (bütün versiyalar üçün ortaqdır).
+CHROMA_SQLITE_PATH = os.path.join(PERSIST_DIRECTORY, "chroma.sqlite3")
+CHROMA_BATCH_SIZE = 1000
+
+VECTOR_INDEX_BACKEND = os.getenv("ATS_VECTOR_INDEX", "chroma")
+ANN_INDEX_DIRECTORY = os.path.join(PERSIST_DIRECTORY, "resume_ann_index")
+ANN_INDEX_PARAMS = {
+    "hnsw": {
+        "M": int(os.getenv("ATS_HNSW_M", "16")),
+        "ef_construction": int(os.getenv("ATS_HNSW_EF_CONSTRUCTION", "200")),
+        "ef": int(os.getenv("ATS_HNSW_EF", "64")),
+    },
+    # nlist 0: 4 * sqrt(namizədlərin sayı) klaster. min_train_size-dan az
+    # vektor olduqda klasterlər öyrədilmir və sorğular hamısını skan edir.
+    "ivf": {
+        "nlist": int(os.getenv("ATS_IVF_NLIST", "0")) or None,
+        "nprobe": int(os.getenv("ATS_IVF_NPROBE", "8")),
+        "min_train_size": int(os.getenv("ATS_IVF_MIN_TRAIN", "10000")),
+    },
+}.get(VECTOR_INDEX_BACKEND, {})
+# ANN indeksləri və kolleksiyalar (tenant, embedding versiyası) cütü üzrə saxlanılır.
+_resume_ann_indexes = {}
+
+if VECTOR_INDEX_BACKEND != "chroma" and VECTOR_INDEX_BACKEND not in VECTOR_INDEX_BACKENDS:
+    raise RuntimeError(f"Unknown ATS_VECTOR_INDEX backend: {VECTOR_INDEX_BACKEND!r}")
+
+RESUME_SHARD_COUNT = max(int(os.getenv("ATS_RESUME_SHARDS", "1")), 1)
+# İş embedding matrisi (tenant, versiya) üzrə yaddaşda saxlanılır; bu
+# prosesdəki yazılar onu dərhal yeniləyir, digər worker-lərin yazıları isə
+# ən geci TTL bitəndə görünür.
+JOB_MATRIX_TTL_SECONDS = float(os.getenv("ATS_JOB_MATRIX_TTL_SECONDS", "300"))
+_job_matrices = {}
+_resume_shard_collections = {}
+_job_collections = {}
+_tenant_lock = threading.RLock()
+_shard_executor = None
+
 os.makedirs(PERSIST_DIRECTORY, exist_ok=True)
 
 client = chromadb.PersistentClient(path=PERSIST_DIRECTORY)
 
-embedding_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="sentence-transformers/all-MiniLM-L6-v2")
+class SharedModelEmbeddingFunction(EmbeddingFunction):
+
+    # Chroma-nın öz SentenceTransformer nüsxəsi əvəzinə embedding_utils-dəki
+    # modeldən (və ya embedding serverindən) istifadə edir, beləliklə hər
+    # worker modeli iki dəfə yükləmir.
+    def __call__(self, input):
+        return [np.asarray(row, dtype=np.float32) for row in generate_embeddings(input, version=DEFAULT_EMBEDDING_VERSION)]
+
+embedding_fn = SharedModelEmbeddingFunction()
 
 resume_collection = client.get_or_create_collection(name="resume_collection", embedding_function=embedding_fn)
 
 job_collection = client.get_or_create_collection(name="job_collection", embedding_function=embedding_fn)
 
 
-def add_to_resume_chroma(embedding, metadata):
+def add_to_resume_chroma(embedding, metadata, tenant=DEFAULT_TENANT, text=None, version=None, unique_id=None):
 
-    unique_id = str(uuid.uuid4())
-    resume_collection.add(ids=[unique_id], embeddings=[embedding], metadatas=[metadata])
+    # `embedding` `version` ilə (standart olaraq aktiv versiya) yaradılıb;
+    # qurulmaqda olan digər versiyalar üçün `text` öz modelləri ilə embed edilir.
+    # `unique_id` yazı əvvəlcə outbox-da jurnala salındıqda verilir.
+    unique_id = unique_id or str(uuid.uuid4())
+    _write_resume("add", unique_id, embedding, metadata, tenant, text, version)
     return unique_id  
 
-def add_to_job_chroma(embedding, metadata):
+def update_resume_in_chroma(unique_id, embedding, metadata, tenant=DEFAULT_TENANT, text=None, version=None):
+
+    """
+    Mövcud resume-in embedding və metadatasını yeniləyir (məs. təkrar
+    yüklənmiş resume birləşdirildikdə).
+
+    Args:
+        unique_id (str): Resume-in unikal ID-si.
+        embedding: Yeni embedding.
+        metadata (dict): Yeni metadata.
+        tenant (str): Müştəri (tenant) ID-si.
+        text (str): Embedding-in mənbə mətni (digər embedding versiyaları üçün).
+        version (str): `embedding`-i yaradan embedding versiyası.
+    """
+
+    _write_resume("upsert", unique_id, embedding, metadata, tenant, text, version)
+
+def _write_resume(operation, unique_id, embedding, metadata, tenant, text, version):
 
-    unique_id = str(uuid.uuid4())
-    job_collection.add(ids=[unique_id], embeddings=[embedding], metadatas=[metadata])
+    version = _version(version)
+    versions = [(version, embedding)]
+    if text is not None:
+        versions += [(other, generate_embedding(text, version=other)) for other in _other_writable_versions(version)]
+
+    for write_version, write_embedding in versions:
+        shard = _resume_shard_for(unique_id, tenant, write_version)
+        getattr(shard, operation)(ids=[unique_id], embeddings=[write_embedding], metadatas=[metadata])
+        if VECTOR_INDEX_BACKEND != "chroma":
+            get_resume_ann_index(tenant, write_version).add([unique_id], [write_embedding])
+        if RESUME_SNAPSHOT_ENABLED:
+            _update_resume_snapshot(tenant, write_version, add_ids=[unique_id], add_embeddings=[write_embedding])
+
+def add_to_job_chroma(embedding, metadata, tenant=DEFAULT_TENANT, text=None, version=None, unique_id=None):
+
+    unique_id = unique_id or str(uuid.uuid4())
+    version = _version(version)
+    get_job_collection(tenant, version).add(ids=[unique_id], embeddings=[embedding], metadatas=[metadata])
+    _update_job_matrix(tenant, version, add=(unique_id, embedding, metadata))
+    if text is not None:
+        for other in _other_writable_versions(version):
+            other_embedding = generate_embedding(text, version=other)
+            get_job_collection(tenant, other).add(ids=[unique_id], embeddings=[other_embedding], metadatas=[metadata])
+            _update_job_matrix(tenant, other, add=(unique_id, other_embedding, metadata))
     return unique_id
 
-def search_resume_chroma(query_embedding, k=10):
+def search_resume_chroma(query_embedding, k=10, tenant=DEFAULT_TENANT, version=None):
+
+    version = _version(version)
+    if VECTOR_INDEX_BACKEND != "chroma":
+        return _search_resume_ann(query_embedding, k, tenant, version)
 
-    results = resume_collection.query(
-        query_embeddings=[query_embedding],
-        n_results=k,
-        include=["embeddings", "metadatas"] 
-    )
-    return results
+    shards = get_resume_shards(tenant, version)
+    if len(shards) == 1:
+        results = shards[0].query(
+            query_embeddings=[query_embedding],
+            n_results=k,
+            include=["embeddings", "metadatas"] 
+        )
+        return results
 
-def get_all_jobs_from_chroma():
+    def query_shard(shard):
+        return shard.query(
+            query_embeddings=[query_embedding],
+            n_results=k,
+            include=["embeddings", "metadatas", "distances"]
+        )
+
+    return _merge_shard_results(list(_get_shard_executor().map(query_shard, shards)), k)
+
+def get_all_jobs_from_chroma(tenant=DEFAULT_TENANT, version=None):
   
-    results = job_collection.get(include=["embeddings", "metadatas"])
+    results = get_job_collection(tenant, version).get(include=["embeddings", "metadatas"])
     return results['ids'], results['embeddings'], results['metadatas']
 
-def delete_resume_from_chroma(unique_id):
+def delete_resume_from_chroma(unique_id, tenant=DEFAULT_TENANT):
 
     """
     Resume kolleksiyasından unikal ID-yə görə resume silir.
 
     Args:
         unique_id (str): Silinəcək resume-in unikal ID-si.
+        tenant (str): Müştəri (tenant) ID-si.
+    """
+
+    for version in embedding_registry.writable_versions():
+        _resume_shard_for(unique_id, tenant, version).delete(ids=[unique_id])
+        if VECTOR_INDEX_BACKEND != "chroma":
+            get_resume_ann_index(tenant, version).delete([unique_id])
+        if RESUME_SNAPSHOT_ENABLED:
+            _update_resume_snapshot(tenant, version, remove_ids=[unique_id])
+
+def delete_resumes_from_chroma(unique_ids, tenant=DEFAULT_TENANT, batch_size=CHROMA_BATCH_SIZE):
+
+    """
+    Resume-ləri toplu silir: hər shard-a partiya başına bir `delete`, ANN
+    indeksinə və snapshot-a isə bir yazı gedir.
+
+    Args:
+        unique_ids (list[str]): Silinəcək resume-lərin unikal ID-ləri.
+        tenant (str): Müştəri (tenant) ID-si.
+        batch_size (int): Partiya ölçüsü.
     """
 
-    resume_collection.delete(ids=[unique_id])
+    unique_ids = list(unique_ids)
+    for start in range(0, len(unique_ids), batch_size):
+        batch = unique_ids[start:start + batch_size]
+        for version in embedding_registry.writable_versions():
+            shards = get_resume_shards(tenant, version)
+            by_shard = {}
+            for unique_id in batch:
+                by_shard.setdefault(resume_shard_index(unique_id), []).append(unique_id)
+            for shard, shard_ids in by_shard.items():
+                shards[shard].delete(ids=shard_ids)
+            if VECTOR_INDEX_BACKEND != "chroma":
+                get_resume_ann_index(tenant, version).delete(batch)
+            if RESUME_SNAPSHOT_ENABLED:
+                _update_resume_snapshot(tenant, version, remove_ids=batch)
 
-def delete_job_from_chroma(unique_id):
+def delete_job_from_chroma(unique_id, tenant=DEFAULT_TENANT):
 
     """
     İş kolleksiyasından unikal ID-yə görə iş silir.
 
     Args:
         unique_id (str): Silinəcək işin unikal ID-si.
+        tenant (str): Müştəri (tenant) ID-si.
     """
 
-    job_collection.delete(ids=[unique_id])    
+    for version in embedding_registry.writable_versions():
+        get_job_collection(tenant, version).delete(ids=[unique_id])
+        _update_job_matrix(tenant, version, remove_id=unique_id)
+
+def _normalize_rows(matrix):
+
+    matrix = np.asarray(matrix, dtype=np.float32).reshape(len(matrix), -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+def load_job_matrix(tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Müştərinin bütün işlərinin normallaşdırılmış embedding matrisini
+    yaddaşdan qaytarır; yoxdursa və ya TTL bitibsə, Chroma-dan partiyalarla
+    yenidən qurur.
+
+    Returns:
+        dict: `ids` (list), `matrix` (float32, sətirlər normallaşdırılıb), `metadatas` (list).
+    """
+
+    version = _version(version)
+    key = (tenant, version)
+    cached = _job_matrices.get(key)
+    if cached is not None and time.monotonic() - cached["loaded_at"] < JOB_MATRIX_TTL_SECONDS:
+        return cached
+
+    ids, embeddings, metadatas = [], [], []
+    for batch in iter_job_batches(["embeddings", "metadatas"], tenant=tenant, version=version):
+        ids.extend(batch['ids'])
+        embeddings.extend(batch['embeddings'])
+        metadatas.extend(batch['metadatas'])
+    loaded = {
+        "ids": ids,
+        "matrix": _normalize_rows(embeddings) if ids else np.zeros((0, 0), dtype=np.float32),
+        "metadatas": metadatas,
+        "loaded_at": time.monotonic(),
+    }
+    with _tenant_lock:
+        _job_matrices[key] = loaded
+    return loaded
+
+def _update_job_matrix(tenant, version, add=None, remove_id=None):
+
+    # Yüklənmiş matris kopyalanaraq dəyişdirilir (copy-on-write), ona görə
+    # eyni anda onu oxuyan sorğular köhnə, tam nüsxə ilə işləməyə davam edir.
+    key = (tenant, version)
+    with _tenant_lock:
+        cached = _job_matrices.get(key)
+        if cached is None:
+            return
+        keep = [position for position, unique_id in enumerate(cached["ids"]) if unique_id != remove_id]
+        ids = [cached["ids"][position] for position in keep]
+        metadatas = [cached["metadatas"][position] for position in keep]
+        matrix = cached["matrix"][keep] if len(keep) != len(cached["ids"]) else cached["matrix"]
+        if add is not None:
+            unique_id, embedding, metadata = add
+            row = _normalize_rows([embedding])
+            ids.append(unique_id)
+            metadatas.append(metadata)
+            matrix = np.vstack([matrix, row]) if len(matrix) else row
+        _job_matrices[key] = {**cached, "ids": ids, "matrix": matrix, "metadatas": metadatas}
+
+def invalidate_job_matrix(tenant=DEFAULT_TENANT, version=None):
+
+    # Kolleksiyaya birbaşa yazılardan sonra (re-embedding, import) matris
+    # növbəti oxunuşda yenidən qurulur.
+    with _tenant_lock:
+        _job_matrices.pop((tenant, _version(version)), None)
+
+
+def _version(version):
+
+    # Oxunuş və yazılar açıq versiya verilməyibsə, aktiv embedding versiyasına gedir.
+    return validate_version(version) if version else embedding_registry.active_version()
+
+def _other_writable_versions(version):
+
+    return [other for other in embedding_registry.writable_versions() if other != version]
+
+def collection_name(name, tenant=DEFAULT_TENANT, version=DEFAULT_EMBEDDING_VERSION):
+
+    """
+    Müştəri (tenant) və embedding versiyası üçün kolleksiya adı. Standart
+    tenant və `v1` versiyası orijinal adları saxlayır.
+    """
+
+    return versioned_collection_name(tenant_collection_name(name, tenant), version)
+
+def get_job_collection(tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Müştərinin (tenant) iş kolleksiyasını verilmiş embedding versiyası üçün
+    qaytarır. Standart tenant və `v1` üçün bu, orijinal `job_collection`-dır.
+    """
+
+    version = _version(version)
+    if tenant == DEFAULT_TENANT and version == DEFAULT_EMBEDDING_VERSION:
+        return job_collection
+    key = (tenant, version)
+    with _tenant_lock:
+        collection = _job_collections.get(key)
+        if collection is None:
+            collection = client.get_or_create_collection(
+                name=collection_name("job_collection", tenant, version), embedding_function=embedding_fn
+            )
+            _job_collections[key] = collection
+    return collection
+
+def tenant_directory(tenant=DEFAULT_TENANT):
+
+    """
+    Müştərinin lokal fayllarının (snapshot, ANN indeksi) saxlandığı qovluq.
+    Standart tenant köhnə yolları istifadə edir.
+    """
+
+    if validate_tenant(tenant) == DEFAULT_TENANT:
+        return PERSIST_DIRECTORY
+    directory = os.path.join(PERSIST_DIRECTORY, "tenants", tenant)
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+def resume_snapshot_path(tenant=DEFAULT_TENANT, version=DEFAULT_EMBEDDING_VERSION):
+
+    if tenant == DEFAULT_TENANT and version == DEFAULT_EMBEDDING_VERSION:
+        return RESUME_SNAPSHOT_PATH
+    return os.path.join(tenant_directory(tenant), versioned_collection_name("resume_snapshot", version) + ".bin")
+
+def resume_projection_path(tenant=DEFAULT_TENANT, version=DEFAULT_EMBEDDING_VERSION):
+
+    # Snapshot-un yanında saxlanılır və versiya silinəndə onunla birgə silinir.
+    return f"{resume_snapshot_path(tenant, version)}.projection.npz"
+
+def load_resume_projection(tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Resume embedding-ləri üçün qurulmuş PCA proyeksiyasını qaytarır
+    (`python projection.py fit`); yoxdursa None.
+    """
+
+    return load_projection(resume_projection_path(tenant, _version(version)))
+
+def resume_ann_directory(tenant=DEFAULT_TENANT, version=DEFAULT_EMBEDDING_VERSION):
+
+    if tenant == DEFAULT_TENANT and version == DEFAULT_EMBEDDING_VERSION:
+        return ANN_INDEX_DIRECTORY
+    return os.path.join(tenant_directory(tenant), versioned_collection_name("resume_ann_index", version))
+
+
+def get_resume_metadatas(unique_ids, tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Resume kolleksiyasından verilmiş ID-lərin metadatalarını qaytarır.
+
+    Args:
+        unique_ids (list[str]): Resume ID-ləri.
+        tenant (str): Müştəri (tenant) ID-si.
+        version (str): Embedding versiyası (standart olaraq aktiv versiya).
+
+    Returns:
+        dict: ID -> metadata.
+    """
+
+    if not unique_ids:
+        return {}
+    results = _get_resumes(unique_ids, include=["metadatas"], tenant=tenant, version=version)
+    return dict(zip(results['ids'], results['metadatas']))
+
+def rebuild_resume_snapshot(tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Resume kolleksiyasındakı bütün embedding-ləri partiyalarla oxuyub
+    snapshot faylını yenidən yazır.
+
+    Returns:
+        int: Snapshot-dakı namizədlərin sayı.
+    """
+
+    version = _version(version)
+    ids, embeddings = [], []
+
+    def read_rows():
+        for batch in iter_resume_batches(include=["embeddings"], tenant=tenant, version=version):
+            ids.extend(batch['ids'])
+            embeddings.extend(batch['embeddings'])
+        return ids, embeddings
+
+    rebuild_snapshot(resume_snapshot_path(tenant, version), read_rows)
+    return len(ids)
+
+def _update_resume_snapshot(tenant, version, add_ids=(), add_embeddings=(), remove_ids=()):
+
+    # Yazı yalnız delta jurnalına əlavədir; jurnal böyüdükdə sıxlaşdırma
+    # sorğunu bloklamamaq üçün fon thread-ində aparılır.
+    path = resume_snapshot_path(tenant, version)
+    if update_snapshot(path, add_ids=add_ids, add_embeddings=add_embeddings, remove_ids=remove_ids):
+        threading.Thread(target=compact_snapshot, args=(path,), daemon=True).start()
+
+def load_resume_snapshot(tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Resume snapshot-unu yaddaşa xəritələnmiş (mmap) formada qaytarır;
+    fayl yoxdursa, əvvəlcə onu qurur.
+    """
+
+    version = _version(version)
+    path = resume_snapshot_path(tenant, version)
+    snapshot = load_snapshot(path)
+    if snapshot is None:
+        rebuild_resume_snapshot(tenant, version)
+        snapshot = load_snapshot(path)
+    return snapshot
+
+def get_resume_ann_index(tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Konfiqurasiya olunmuş lokal ANN indeksini (məs. HNSW) qaytarır və
+    prosesdə bir dəfə yükləyir. İndeks boşdursa, amma kolleksiyada resume
+    varsa (məs. backend mövcud sistemdə yenicə aktivləşdirilib), axtarışa
+    başlamazdan əvvəl indeks kolleksiyadan qurulur. Hər müştərinin (tenant)
+    və embedding versiyasının öz indeksi var.
+    """
+
+    version = _version(version)
+    key = (tenant, version)
+    index = _resume_ann_indexes.get(key)
+    if index is None:
+        with _tenant_lock:
+            index = _resume_ann_indexes.get(key)
+            if index is None:
+                index = VECTOR_INDEX_BACKENDS[VECTOR_INDEX_BACKEND](
+                    resume_ann_directory(tenant, version), **ANN_INDEX_PARAMS
+                )
+                if len(index) == 0 and count_resumes(tenant, version) > 0:
+                    index.bulk_load(_resume_embedding_batches(tenant, version), only_if_empty=True)
+                _resume_ann_indexes[key] = index
+    return index
+
+def count_resumes(tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Müştərinin bütün shard-larındakı resume-lərin ümumi sayını qaytarır.
+    """
+
+    return sum(shard.count() for shard in get_resume_shards(tenant, version))
+
+def _resume_embedding_batches(tenant, version):
+
+    for batch in iter_resume_batches(include=["embeddings"], tenant=tenant, version=version):
+        yield batch['ids'], batch['embeddings']
+
+def _search_resume_ann(query_embedding, k, tenant, version):
+
+    ids, distances = get_resume_ann_index(tenant, version).query(query_embedding, k)
+    stored = _get_resumes(ids, include=["embeddings", "metadatas"], tenant=tenant, version=version)
+    position = {unique_id: i for i, unique_id in enumerate(stored['ids'])}
+    found = [i for i, unique_id in enumerate(ids) if unique_id in position]
+
+    return {
+        'ids': [[ids[i] for i in found]],
+        'distances': [[distances[i] for i in found]],
+        'embeddings': [[stored['embeddings'][position[ids[i]]] for i in found]],
+        'metadatas': [[stored['metadatas'][position[ids[i]]] for i in found]],
+    }
+
+def rebuild_resume_ann_index(tenant=DEFAULT_TENANT, version=None):
+
+    """
+    ANN indeksini resume kolleksiyasından yaddaşda yenidən qurur və WAL-dan
+    keçmədən tək checkpoint kimi yazır.
+
+    Returns:
+        int: İndeksdəki resume-lərin sayı.
+    """
+
+    version = _version(version)
+    index = get_resume_ann_index(tenant, version)
+    index.bulk_load(_resume_embedding_batches(tenant, version))
+    return len(index)
+
+def get_resume_shards(tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Müştərinin (tenant) resume shard kolleksiyalarını verilmiş embedding
+    versiyası üçün qaytarır. Standart tenant, `v1` və tək shard olduqda bu,
+    orijinal `resume_collection`-dır.
+    """
+
+    version = _version(version)
+    if tenant == DEFAULT_TENANT and version == DEFAULT_EMBEDDING_VERSION and RESUME_SHARD_COUNT == 1:
+        return [resume_collection]
+    key = (tenant, version)
+    shards = _resume_shard_collections.get(key)
+    if shards is None:
+        with _tenant_lock:
+            shards = _resume_shard_collections.get(key)
+            if shards is None:
+                name = collection_name("resume_collection", tenant, version)
+                names = [name] if RESUME_SHARD_COUNT == 1 else [f"{name}_shard_{shard}" for shard in range(RESUME_SHARD_COUNT)]
+                shards = [client.get_or_create_collection(name=name, embedding_function=embedding_fn) for name in names]
+                _resume_shard_collections[key] = shards
+    return shards
+
+def resume_shard_index(unique_id):
+
+    """
+    Resume-in aid olduğu shard-ın nömrəsini unikal ID-nin hash-inə görə qaytarır.
+    """
+
+    return zlib.crc32(unique_id.encode("utf-8")) % RESUME_SHARD_COUNT
+
+def _resume_shard_for(unique_id, tenant=DEFAULT_TENANT, version=None):
+
+    return get_resume_shards(tenant, version)[resume_shard_index(unique_id)]
+
+def upsert_resume_batch(unique_ids, embeddings, metadatas, tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Bir neçə resume-ni sahib olduqları shard-lara yazır (yenidən embedding
+    zamanı istifadə olunur). ANN indeksi və snapshot yenilənmir; onları
+    sonra `rebuild_resume_ann_index` və `rebuild_resume_snapshot` qurur.
+
+    Args:
+        unique_ids (list[str]): Resume ID-ləri.
+        embeddings (list): Embedding-lər.
+        metadatas (list[dict]): Metadatalar.
+        tenant (str): Müştəri (tenant) ID-si.
+        version (str): Embedding versiyası.
+    """
+
+    shards = get_resume_shards(tenant, version)
+    positions = {}
+    for position, unique_id in enumerate(unique_ids):
+        positions.setdefault(resume_shard_index(unique_id), []).append(position)
+    for shard, shard_positions in positions.items():
+        shards[shard].upsert(
+            ids=[unique_ids[i] for i in shard_positions],
+            embeddings=[embeddings[i] for i in shard_positions],
+            metadatas=[metadatas[i] for i in shard_positions]
+        )
+
+def _get_shard_executor():
+
+    global _shard_executor
+    if _shard_executor is None:
+        _shard_executor = ThreadPoolExecutor(max_workers=RESUME_SHARD_COUNT, thread_name_prefix="resume-shard")
+    return _shard_executor
+
+def _merge_shard_results(shard_results, k):
+
+    hits = []
+    for results in shard_results:
+        for position, distance in enumerate(results['distances'][0]):
+            hits.append((distance, results, position))
+    hits.sort(key=lambda hit: hit[0])
+    hits = hits[:k]
+
+    return {
+        'ids': [[results['ids'][0][position] for _, results, position in hits]],
+        'distances': [[distance for distance, _, _ in hits]],
+        'embeddings': [[results['embeddings'][0][position] for _, results, position in hits]],
+        'metadatas': [[results['metadatas'][0][position] for _, results, position in hits]],
+    }
+
+def _get_resumes(unique_ids, include, tenant=DEFAULT_TENANT, version=None):
+
+    shards = get_resume_shards(tenant, version)
+    grouped = {}
+    for unique_id in unique_ids:
+        grouped.setdefault(resume_shard_index(unique_id), []).append(unique_id)
+
+    merged = {'ids': [], **{field: [] for field in include}}
+    for shard, ids in grouped.items():
+        batch = shards[shard].get(ids=ids, include=include)
+        merged['ids'].extend(batch['ids'])
+        for field in include:
+            merged[field].extend(batch[field])
+    return merged
+
+def get_resume_records(unique_ids, tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Verilmiş ID-lərin embedding-lərini və metadatalarını qaytarır.
+
+    Returns:
+        dict: Chroma `get` nəticəsi (`ids`, `embeddings`, `metadatas`).
+    """
+
+    return _get_resumes(list(unique_ids), include=["embeddings", "metadatas"], tenant=tenant, version=version)
+
+def iter_resume_batches(include, batch_size=CHROMA_BATCH_SIZE, tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Müştərinin bütün resume shard-larını partiyalarla oxuyur.
+
+    Args:
+        include (list[str]): Chroma `include` sahələri.
+        batch_size (int): Partiya ölçüsü.
+        tenant (str): Müştəri (tenant) ID-si.
+        version (str): Embedding versiyası (standart olaraq aktiv versiya).
+
+    Yields:
+        dict: Chroma `get` nəticəsi.
+    """
+
+    for shard in get_resume_shards(tenant, version):
+        offset = 0
+        while True:
+            batch = shard.get(include=include, limit=batch_size, offset=offset)
+            if not batch['ids']:
+                break
+            yield batch
+            offset += len(batch['ids'])
+
+def iter_job_batches(include, batch_size=CHROMA_BATCH_SIZE, tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Müştərinin iş kolleksiyasını partiyalarla oxuyur.
+
+    Yields:
+        dict: Chroma `get` nəticəsi.
+    """
+
+    collection = get_job_collection(tenant, version)
+    offset = 0
+    while True:
+        batch = collection.get(include=include, limit=batch_size, offset=offset)
+        if not batch['ids']:
+            break
+        yield batch
+        offset += len(batch['ids'])
+
+def get_job_metadatas(unique_ids, tenant=DEFAULT_TENANT, version=None):
+
+    """
+    İş kolleksiyasından verilmiş ID-lərin metadatalarını qaytarır.
+
+    Returns:
+        dict: ID -> metadata.
+    """
+
+    if not unique_ids:
+        return {}
+    results = get_job_collection(tenant, version).get(ids=list(unique_ids), include=["metadatas"])
+    return dict(zip(results['ids'], results['metadatas']))
+
+def drop_version_collections(version, tenants):
+
+    """
+    Embedding versiyasının bütün kolleksiyalarını, ANN indekslərini və
+    snapshot-larını silir (sıxlaşdırmadan sonra köhnə versiya üçün).
+
+    Args:
+        version (str): Silinəcək embedding versiyası (aktiv olmamalıdır).
+        tenants (list[str]): Müştərilər (tenant).
+
+    Returns:
+        list[str]: Silinmiş kolleksiyaların adları.
+    """
+
+    if version == embedding_registry.active_version():
+        raise ValueError(f"Embedding version {version} is active")
+    existing = set(client.list_collections())
+    dropped = []
+    with _tenant_lock:
+        for tenant in tenants:
+            for name in _version_collection_names(tenant, version):
+                if name in existing:
+                    client.delete_collection(name)
+                    dropped.append(name)
+            _resume_shard_collections.pop((tenant, version), None)
+            _job_collections.pop((tenant, version), None)
+            _job_matrices.pop((tenant, version), None)
+            _resume_ann_indexes.pop((tenant, version), None)
+            shutil.rmtree(resume_ann_directory(tenant, version), ignore_errors=True)
+            snapshot_path = resume_snapshot_path(tenant, version)
+            for path in [snapshot_path] + glob.glob(f"{glob.escape(snapshot_path)}.*"):
+                if os.path.exists(path):
+                    os.remove(path)
+    return dropped
+
+def _version_collection_names(tenant, version):
+
+    names = [collection_name("job_collection", tenant, version)]
+    resume_name = collection_name("resume_collection", tenant, version)
+    return names + [resume_name] + [f"{resume_name}_shard_{shard}" for shard in range(RESUME_SHARD_COUNT)]
+
+def version_segment_directories(version, tenants):
+
+    """
+    Embedding versiyasının kolleksiyalarına aid vektor seqmentlərinin
+    qovluqlarını qaytarır. Arxiv, ANN indeksləri, snapshot-lar və
+    chroma.sqlite3 bura daxil deyil.
+
+    Args:
+        version (str): Embedding versiyası.
+        tenants (list[str]): Müştərilər (tenant).
+
+    Returns:
+        list[str]: Mövcud seqment qovluqları.
+    """
+
+    names = [name for tenant in tenants for name in _version_collection_names(tenant, version)]
+    if not names or not os.path.exists(CHROMA_SQLITE_PATH):
+        return []
+    # Seqment qovluqları seqmentin id-si ilə adlanır; kolleksiya ilə əlaqəni
+    # yalnız Chroma-nın öz bazası saxlayır.
+    connection = sqlite3.connect(f"file:{CHROMA_SQLITE_PATH}?mode=ro", uri=True)
+    try:
+        rows = connection.execute(
+            "SELECT segments.id FROM segments JOIN collections ON segments.collection = collections.id "
+            f"WHERE segments.scope = 'VECTOR' AND collections.name IN ({', '.join('?' * len(names))})",
+            names
+        ).fetchall()
+    finally:
+        connection.close()
+    directories = [os.path.join(PERSIST_DIRECTORY, segment_id) for segment_id, in rows]
+    return [directory for directory in directories if os.path.isdir(directory)]
+
+def get_job_records(unique_ids, tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Verilmiş iş ID-lərinin embedding-lərini və metadatalarını qaytarır.
+
+    Returns:
+        dict: Chroma `get` nəticəsi (`ids`, `embeddings`, `metadatas`).
+    """
+
+    if not unique_ids:
+        return {'ids': [], 'embeddings': [], 'metadatas': []}
+    return get_job_collection(tenant, version).get(ids=list(unique_ids), include=["embeddings", "metadatas"])
+
+def reshard_resume_collection(tenant=DEFAULT_TENANT, version=None):
+
+    """
+    Tək `resume_collection`-dakı resume-ləri konfiqurasiya olunmuş shard-lara
+    köçürür. Hər partiya köçürüldükdən sonra silindiyi üçün proses yarımçıq
+    qalsa, təkrar işə salına bilər.
+
+    Returns:
+        int: Köçürülən resume-lərin sayı.
+    """
+
+    if RESUME_SHARD_COUNT == 1:
+        return 0
+
+    version = _version(version)
+    if tenant == DEFAULT_TENANT and version == DEFAULT_EMBEDDING_VERSION:
+        source = resume_collection
+    else:
+        source = client.get_or_create_collection(
+            name=collection_name("resume_collection", tenant, version), embedding_function=embedding_fn
+        )
+    shards = get_resume_shards(tenant, version)
+    moved = 0
+    while True:
+        batch = source.get(include=["embeddings", "metadatas"], limit=CHROMA_BATCH_SIZE)
+        if not batch['ids']:
+            break
+
+        grouped = {}
+        for position, unique_id in enumerate(batch['ids']):
+            grouped.setdefault(resume_shard_index(unique_id), []).append(position)
+        for shard, positions in grouped.items():
+            shards[shard].upsert(
+                ids=[batch['ids'][i] for i in positions],
+                embeddings=[batch['embeddings'][i] for i in positions],
+                metadatas=[batch['metadatas'][i] for i in positions]
+            )
+
+        source.delete(ids=batch['ids'])
+        moved += len(batch['ids'])
+    return moved
 
 
+if __name__ == "__main__":
+    import argparse
 
-    
+    parser = argparse.ArgumentParser(description="Chroma maintenance commands.")
+    parser.add_argument("command", choices=["reshard"])
+    parser.add_argument("--tenant", default=DEFAULT_TENANT)
+    args = parser.parse_args()
 
+    if args.command == "reshard":
+        print(f"Moved {reshard_resume_collection(validate_tenant(args.tenant))} resumes into {RESUME_SHARD_COUNT} shards.")
@@ -0,0 +1,203 @@
+import os
+import time
+import numpy as np
+from database_integration import find_candidate_ids, list_tenants
+from chroma_utils import (
+    CHROMA_SQLITE_PATH,
+    CHROMA_BATCH_SIZE,
+    RESUME_SNAPSHOT_ENABLED,
+    VECTOR_INDEX_BACKEND,
+    iter_resume_batches,
+    iter_job_batches,
+    upsert_resume_batch,
+    get_job_collection,
+    search_resume_chroma,
+    count_resumes,
+    delete_resumes_from_chroma,
+    rebuild_resume_snapshot,
+    rebuild_resume_ann_index,
+    drop_version_collections,
+    version_segment_directories
+)
+from embedding_versions import registry
+from outbox import delete_resumes
+from tenants import DEFAULT_TENANT, validate_tenant
+
+# After the switch, requests that pinned the old version finish before its
+# collections are dropped.
+COMPACTION_DRAIN_SECONDS = float(os.getenv("ATS_COMPACTION_DRAIN_SECONDS", "30"))
+COMPACTION_LATENCY_QUERIES = 50
+SQLITE_NOTE = (
+    "chroma_sqlite_bytes is shared by all versions; deleted rows leave free pages "
+    "that SQLite reuses but only VACUUM returns to the filesystem"
+)
+
+
+def directory_size(path):
+
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except FileNotFoundError:
+                pass
+    return total
+
+
+def measure(tenants, version, queries=COMPACTION_LATENCY_QUERIES):
+
+    """
+    Disk usage of the vector segments of `version`'s collections, resume
+    count and search latency of `version`. Archive, ANN indexes, snapshots
+    and caches in the persist directory are not counted; Chroma's SQLite
+    file is reported on its own. Latency is sampled with stored embeddings
+    of the largest tenant as queries.
+    """
+
+    counts = {tenant: count_resumes(tenant, version) for tenant in tenants}
+    sqlite_paths = [CHROMA_SQLITE_PATH, f"{CHROMA_SQLITE_PATH}-wal"]
+    stats = {
+        "disk_bytes": sum(directory_size(path) for path in version_segment_directories(version, tenants)),
+        "chroma_sqlite_bytes": sum(os.path.getsize(path) for path in sqlite_paths if os.path.exists(path)),
+        "note": SQLITE_NOTE,
+        "resumes": sum(counts.values()),
+    }
+    tenant = max(counts, key=counts.get) if counts else DEFAULT_TENANT
+    sample = []
+    for batch in iter_resume_batches(include=["embeddings"], batch_size=queries, tenant=tenant, version=version):
+        sample.extend(batch['embeddings'])
+        break
+
+    latencies = []
+    for query in sample:
+        start = time.perf_counter()
+        search_resume_chroma(query, k=10, tenant=tenant, version=version)
+        latencies.append((time.perf_counter() - start) * 1000)
+    if latencies:
+        stats["query_mean_ms"] = float(np.mean(latencies))
+        stats["query_p95_ms"] = float(np.percentile(latencies, 95))
+    return stats
+
+
+def next_version():
+
+    numbers = [int(version[1:]) for version in registry.load()["versions"]]
+    return f"v{max(numbers) + 1}"
+
+
+def _resume_ids(tenant, version, batch_size):
+
+    return {
+        unique_id
+        for batch in iter_resume_batches(include=[], batch_size=batch_size, tenant=tenant, version=version)
+        for unique_id in batch['ids']
+    }
+
+
+def _copy_tenant(tenant, source, version, batch_size):
+
+    for batch in iter_resume_batches(
+        include=["embeddings", "metadatas"], batch_size=batch_size, tenant=tenant, version=source
+    ):
+        upsert_resume_batch(batch['ids'], batch['embeddings'], batch['metadatas'], tenant=tenant, version=version)
+
+    jobs = get_job_collection(tenant, version)
+    for batch in iter_job_batches(include=["embeddings", "metadatas"], batch_size=batch_size, tenant=tenant, version=source):
+        jobs.upsert(ids=batch['ids'], embeddings=batch['embeddings'], metadatas=batch['metadatas'])
+
+    # A resume deleted while its batch was being copied can be written back
+    # into the new version after the delete; drop whatever the source no
+    # longer has.
+    resurrected = _resume_ids(tenant, version, batch_size) - _resume_ids(tenant, source, batch_size)
+    if resurrected:
+        delete_resumes_from_chroma(sorted(resurrected), tenant=tenant)
+
+    if RESUME_SNAPSHOT_ENABLED:
+        rebuild_resume_snapshot(tenant, version)
+    if VECTOR_INDEX_BACKEND != "chroma":
+        rebuild_resume_ann_index(tenant, version)
+
+
+def compact(drain_seconds=COMPACTION_DRAIN_SECONDS, batch_size=CHROMA_BATCH_SIZE):
+
+    """
+    Rewrite every tenant's resume and job collections into fresh ones and
+    switch reads to them, leaving deleted rows and index tombstones behind.
+
+    The copy is a new embedding version with the active version's model:
+    embeddings are copied as is, writes made during the copy go to both
+    versions, and the switch is the registry's atomic activation. The old
+    version's collections, snapshots and ANN indexes are then dropped.
+
+    Returns:
+        dict: The new and old version, dropped collections, and index size
+        and query latency before and after.
+    """
+
+    source = registry.active_version()
+    tenants = list_tenants()
+    before = measure(tenants, source)
+
+    version = next_version()
+    registry.register(version, registry.model_for(source))
+    for tenant in tenants:
+        _copy_tenant(tenant, source, version, batch_size)
+    registry.mark_ready(version)
+    registry.activate(version)
+
+    time.sleep(drain_seconds)
+    registry.retire(source)
+    dropped = drop_version_collections(source, tenants)
+
+    return {
+        "version": version,
+        "previous_version": source,
+        "dropped_collections": dropped,
+        "before": before,
+        "after": measure(tenants, version),
+    }
+
+
+def bulk_delete(tenant=DEFAULT_TENANT, unique_ids=None, older_than_days=None, location=None):
+
+    """
+    Delete a tenant's resumes matching all given filters from both stores.
+
+    Returns:
+        int: Number of candidates deleted.
+    """
+
+    created_before = time.time() - older_than_days * 24 * 3600 if older_than_days is not None else None
+    return delete_resumes(
+        find_candidate_ids(tenant, unique_ids=unique_ids, created_before=created_before, location=location),
+        tenant=tenant
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Bulk delete resumes and compact the vector index.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    compact_parser = subparsers.add_parser("compact", help="Rewrite all collections and swap them in.")
+    compact_parser.add_argument("--drain-seconds", type=float, default=COMPACTION_DRAIN_SECONDS)
+    subparsers.add_parser("measure", help="Report index size and query latency.")
+    delete_parser = subparsers.add_parser("delete", help="Delete a tenant's resumes matching all filters.")
+    delete_parser.add_argument("--tenant", default=DEFAULT_TENANT)
+    delete_parser.add_argument("--ids", nargs="+")
+    delete_parser.add_argument("--older-than-days", type=float)
+    delete_parser.add_argument("--location")
+    delete_parser.add_argument("--all", action="store_true", help="Required to delete without a filter.")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        print(json.dumps(compact(args.drain_seconds), indent=2))
+    elif args.command == "measure":
+        print(json.dumps(measure(list_tenants(), registry.active_version()), indent=2))
+    else:
+        if not (args.ids or args.older_than_days is not None or args.location or args.all):
+            parser.error("give --ids, --older-than-days, --location or --all")
+        deleted = bulk_delete(validate_tenant(args.tenant), args.ids, args.older_than_days, args.location)
+        print(f"Deleted {deleted} resumes.")
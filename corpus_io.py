@@ -0,0 +1,285 @@
+import json
+import os
+import time
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+from database_integration import session, Candidate, Job, list_tenants, bulk_insert_candidates, bulk_insert_jobs
+from chroma_utils import (
+    RESUME_SNAPSHOT_ENABLED,
+    VECTOR_INDEX_BACKEND,
+    get_resume_records,
+    get_job_records,
+    get_job_collection,
+    invalidate_job_matrix,
+    upsert_resume_batch,
+    rebuild_resume_snapshot,
+    rebuild_resume_ann_index
+)
+from embedding_utils import generate_embeddings, resume_embedding_text
+from embedding_versions import registry as embedding_registry
+from tenants import validate_tenant
+
+CORPUS_BATCH_SIZE = int(os.getenv("ATS_CORPUS_BATCH_SIZE", "5000"))
+
+CANDIDATE_COLUMNS = (
+    "name", "location", "experience", "education", "skills", "content_hash", "embedding_text",
+    "created_at", "updated_at",
+)
+JOB_COLUMNS = ("title", "description")
+FLOAT_COLUMNS = {"created_at", "updated_at"}
+
+
+def _require_pyarrow():
+
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed; install it to export or import the corpus.")
+
+
+def _schema(columns):
+
+    # Embeddings are a float32 list column (null for rows without a vector)
+    # and Chroma metadata a JSON string; the table columns stay typed for
+    # analytics.
+    fields = [
+        pa.field("tenant_id", pa.string()),
+        pa.field("unique_id", pa.string()),
+        pa.field("embedding", pa.list_(pa.float32())),
+        pa.field("metadata", pa.string()),
+    ]
+    for column in columns:
+        fields.append(pa.field(column, pa.float64() if column in FLOAT_COLUMNS else pa.string()))
+    return pa.schema(fields)
+
+
+def _iter_rows(model, tenant, batch_size):
+
+    last_id = 0
+    while True:
+        rows = (
+            session.query(model)
+            .filter(model.tenant_id == tenant, model.id > last_id)
+            .order_by(model.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+        session.expunge_all()
+
+
+def _export_table(path, model, columns, get_records, tenants, version, batch_size):
+
+    schema = _schema(columns)
+    count = 0
+    with pq.ParquetWriter(f"{path}.tmp", schema, compression="zstd") as writer:
+        for tenant in tenants:
+            for rows in _iter_rows(model, tenant, batch_size):
+                records = get_records([row.unique_id for row in rows], tenant=tenant, version=version)
+                stored = {
+                    unique_id: (embedding, metadata)
+                    for unique_id, embedding, metadata in zip(records['ids'], records['embeddings'], records['metadatas'])
+                }
+                columns_data = {
+                    "tenant_id": [tenant] * len(rows),
+                    "unique_id": [row.unique_id for row in rows],
+                    "embedding": [
+                        np.asarray(stored[row.unique_id][0], dtype=np.float32) if row.unique_id in stored else None
+                        for row in rows
+                    ],
+                    "metadata": [
+                        json.dumps(stored[row.unique_id][1]) if row.unique_id in stored else None for row in rows
+                    ],
+                }
+                for column in columns:
+                    columns_data[column] = [getattr(row, column) for row in rows]
+                writer.write_table(pa.table(columns_data, schema=schema))
+                count += len(rows)
+    os.replace(f"{path}.tmp", path)
+    return count
+
+
+def export_corpus(directory, tenants=None, batch_size=CORPUS_BATCH_SIZE):
+
+    """
+    Dump candidates and jobs (PostgreSQL rows, Chroma metadata and
+    embeddings of the active version) to `resumes.parquet` and
+    `jobs.parquet` in `directory`, streaming one row group per batch.
+    `manifest.json` records the embedding model so an import can tell
+    whether the vectors are reusable.
+
+    Returns:
+        dict: The manifest.
+    """
+
+    _require_pyarrow()
+    os.makedirs(directory, exist_ok=True)
+    tenants = [validate_tenant(tenant) for tenant in tenants] if tenants else list_tenants()
+    version = embedding_registry.active_version()
+
+    manifest = {
+        "exported_at": time.time(),
+        "embedding_version": version,
+        "embedding_model": embedding_registry.model_for(version),
+        "tenants": tenants,
+        "resumes": _export_table(
+            os.path.join(directory, "resumes.parquet"), Candidate, CANDIDATE_COLUMNS, get_resume_records,
+            tenants, version, batch_size
+        ),
+        "jobs": _export_table(
+            os.path.join(directory, "jobs.parquet"), Job, JOB_COLUMNS, get_job_records, tenants, version, batch_size
+        ),
+    }
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as manifest_file:
+        json.dump(manifest, manifest_file, indent=2)
+    return manifest
+
+
+def _embeddings(batch):
+
+    column = batch.column("embedding")
+    if len(column) and column.null_count == 0:
+        # Zero-copy view of the list values when every row has a vector.
+        return list(np.asarray(column.flatten(), dtype=np.float32).reshape(len(column), -1))
+    return [None if value is None else np.asarray(value, dtype=np.float32) for value in column.to_pylist()]
+
+
+def _resume_text(row):
+
+    return row["embedding_text"] or resume_embedding_text(
+        row["experience"] or "", row["education"] or "", row["skills"] or ""
+    )
+
+
+def _resume_metadata(row):
+
+    return {
+        "name": row["name"],
+        "location": row["location"],
+        "experience": row["experience"] or "",
+        "education": row["education"] or "",
+        "skills": row["skills"] or "",
+    }
+
+
+def _import_resumes(tenant, rows, embeddings, version):
+
+    missing = [position for position, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        fresh = generate_embeddings([_resume_text(rows[position]) for position in missing], version=version)
+        for position, embedding in zip(missing, fresh):
+            embeddings[position] = embedding
+    upsert_resume_batch(
+        [row["unique_id"] for row in rows],
+        [list(map(float, embedding)) for embedding in embeddings],
+        [json.loads(row["metadata"]) if row["metadata"] else _resume_metadata(row) for row in rows],
+        tenant=tenant,
+        version=version
+    )
+    return bulk_insert_candidates(
+        [{"unique_id": row["unique_id"], **{column: row[column] for column in CANDIDATE_COLUMNS}} for row in rows],
+        tenant=tenant
+    )
+
+
+def _import_jobs(tenant, rows, embeddings, version):
+
+    missing = [position for position, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        fresh = generate_embeddings([rows[position]["description"] or "" for position in missing], version=version)
+        for position, embedding in zip(missing, fresh):
+            embeddings[position] = embedding
+    get_job_collection(tenant, version).upsert(
+        ids=[row["unique_id"] for row in rows],
+        embeddings=[list(map(float, embedding)) for embedding in embeddings],
+        metadatas=[
+            json.loads(row["metadata"]) if row["metadata"] else {"title": row["title"], "description": row["description"]}
+            for row in rows
+        ]
+    )
+    invalidate_job_matrix(tenant, version)
+    return bulk_insert_jobs(
+        [{"unique_id": row["unique_id"], **{column: row[column] for column in JOB_COLUMNS}} for row in rows],
+        tenant=tenant
+    )
+
+
+def _import_table(path, import_batch, reuse_embeddings, version, batch_size, touched):
+
+    inserted = 0
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        embeddings = _embeddings(batch) if reuse_embeddings else [None] * batch.num_rows
+        rows = batch.select([name for name in batch.schema.names if name != "embedding"]).to_pylist()
+        by_tenant = {}
+        for row, embedding in zip(rows, embeddings):
+            rows_of_tenant, embeddings_of_tenant = by_tenant.setdefault(validate_tenant(row["tenant_id"]), ([], []))
+            rows_of_tenant.append(row)
+            embeddings_of_tenant.append(embedding)
+        for tenant, (tenant_rows, tenant_embeddings) in by_tenant.items():
+            inserted += import_batch(tenant, tenant_rows, tenant_embeddings, version)
+            touched.add(tenant)
+    return inserted
+
+
+def import_corpus(directory, batch_size=CORPUS_BATCH_SIZE):
+
+    """
+    Load an export into Chroma (active embedding version) and PostgreSQL in
+    large batches. Exported vectors are reused when they were made with the
+    active version's model; otherwise, and for rows exported without a
+    vector, the stored text is embedded. Chroma writes are upserts and rows
+    that already exist are skipped, so an interrupted import can be re-run.
+    Snapshots and ANN indexes of the imported tenants are rebuilt at the end.
+
+    Returns:
+        dict: Number of candidate and job rows inserted.
+    """
+
+    _require_pyarrow()
+    with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as manifest_file:
+        manifest = json.load(manifest_file)
+    version = embedding_registry.active_version()
+    reuse_embeddings = manifest["embedding_model"] == embedding_registry.model_for(version)
+
+    touched = set()
+    result = {
+        "resumes": _import_table(
+            os.path.join(directory, "resumes.parquet"), _import_resumes, reuse_embeddings, version, batch_size, touched
+        ),
+        "jobs": _import_table(
+            os.path.join(directory, "jobs.parquet"), _import_jobs, reuse_embeddings, version, batch_size, touched
+        ),
+    }
+    for tenant in sorted(touched):
+        if RESUME_SNAPSHOT_ENABLED:
+            rebuild_resume_snapshot(tenant, version)
+        if VECTOR_INDEX_BACKEND != "chroma":
+            rebuild_resume_ann_index(tenant, version)
+    return result
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Export or import candidates and jobs as Parquet.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export")
+    export_parser.add_argument("directory")
+    export_parser.add_argument("--tenant", action="append", help="Tenant to export (default: all).")
+    export_parser.add_argument("--batch-size", type=int, default=CORPUS_BATCH_SIZE)
+    import_parser = subparsers.add_parser("import")
+    import_parser.add_argument("directory")
+    import_parser.add_argument("--batch-size", type=int, default=CORPUS_BATCH_SIZE)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        print(json.dumps(export_corpus(args.directory, args.tenant, args.batch_size), indent=2))
+    else:
+        print(json.dumps(import_corpus(args.directory, args.batch_size), indent=2))
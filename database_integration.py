@@ -1,79 +1,620 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float
+import os
+import time
+import re
+from sqlalchemy import create_engine, Column, Integer, String, Text, Float, Index, inspect, text, func, or_
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.schema import CreateColumn
+from geo_utils import geohash_cover, haversine_km, location_fields
+from local_cache import LruCache, SqliteCache, TieredCache
+from resume_attributes import derive_attributes
+from tenants import DEFAULT_TENANT
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL environment variable is not set!")
 
+# Read-through cache of the candidate/job records served to the UI. Each
+# worker has its own LRU; writes through this module invalidate it, and the
+# TTL bounds how long a worker can serve a record changed by another one.
+# Setting ATS_RECORD_CACHE_SHARED_PATH adds a SQLite tier shared on the host.
+RECORD_CACHE_ENABLED = os.getenv("ATS_RECORD_CACHE", "1") == "1"
+RECORD_CACHE_SHARED_PATH = os.getenv("ATS_RECORD_CACHE_SHARED_PATH")
+RECORD_CACHE_TTL_SECONDS = float(os.getenv("ATS_RECORD_CACHE_TTL_SECONDS", "60"))
+record_cache = TieredCache(
+    LruCache(
+        max_entries=int(os.getenv("ATS_RECORD_CACHE_MAX_ENTRIES", "10000")),
+        ttl_seconds=RECORD_CACHE_TTL_SECONDS
+    ),
+    SqliteCache(RECORD_CACHE_SHARED_PATH, ttl_seconds=RECORD_CACHE_TTL_SECONDS) if RECORD_CACHE_SHARED_PATH else None
+)
+RECORD_QUERY_BATCH_SIZE = 1000
+
+CANDIDATE_RECORD_FIELDS = ("name", "location", "experience", "education", "skills")
+JOB_RECORD_FIELDS = ("title", "description")
+
 Base = declarative_base()
 
 class Candidate(Base):
     
     __tablename__ = 'candidates'
     id = Column(Integer, primary_key=True)
+    tenant_id = Column(String, nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT, index=True)
     unique_id = Column(String, unique=True)  
     name = Column(String)  
-    location = Column(String)
+    location = Column(String, index=True)
     experience = Column(String)
     education = Column(String)
     skills = Column(String)
+    content_hash = Column(String, index=True)
+    # Text the resume embedding was computed from, so it can be re-embedded
+    # with another model without the original file.
+    embedding_text = Column(Text)
+    # Upload time (epoch seconds) for deletes by age; NULL for rows created
+    # before the column existed, which age-based deletes never match.
+    created_at = Column(Float, default=time.time, index=True)
+    # Last upload or merge into this candidate, for inactivity-based retention.
+    updated_at = Column(Float, default=time.time, onupdate=time.time, index=True)
+    # Location geocoded at ingest against the offline gazetteer (NULL when
+    # unknown); geohash prefixes pre-filter radius searches.
+    latitude = Column(Float)
+    longitude = Column(Float)
+    geohash = Column(String)
+    # Attributes derived from experience/education at ingest (see
+    # resume_attributes), for range filters; NULL when unknown.
+    years_experience = Column(Float, index=True)
+    seniority_level = Column(Integer, index=True)
+    degree_level = Column(Integer, index=True)
+
+    __table_args__ = (
+        Index("ix_candidates_tenant_location", "tenant_id", "location"),
+        Index("ix_candidates_tenant_geohash", "tenant_id", "geohash", postgresql_ops={"geohash": "varchar_pattern_ops"}),
+    )
+
+class CandidateSkill(Base):
+
+    # One row per normalized skill of a candidate, so skill filters are an
+    # index lookup instead of substring matching on `candidates.skills`.
+    __tablename__ = 'candidate_skills'
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String, nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT)
+    unique_id = Column(String, nullable=False, index=True)
+    skill = Column(String, nullable=False)
+
+    __table_args__ = (Index("ix_candidate_skills_tenant_skill", "tenant_id", "skill", "unique_id"),)
 
 class Job(Base):
     
     __tablename__ = 'jobs'
     id = Column(Integer, primary_key=True)
+    tenant_id = Column(String, nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT, index=True)
     unique_id = Column(String, unique=True) 
     title = Column(String)
     description = Column(String)
 
+class OutboxEntry(Base):
+
+    # Journal of Chroma + PostgreSQL writes. An entry is recorded before the
+    # Chroma side is written and marked done in the same transaction as the
+    # PostgreSQL side, so a pending entry means the two may disagree.
+    __tablename__ = 'outbox'
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(String, nullable=False, default=DEFAULT_TENANT, server_default=DEFAULT_TENANT, index=True)
+    operation = Column(String, nullable=False)
+    unique_id = Column(String, nullable=False, index=True)
+    payload = Column(Text)
+    status = Column(String, nullable=False, default="pending", server_default="pending", index=True)
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text)
+    created_at = Column(Float, nullable=False, default=time.time)
+    updated_at = Column(Float, nullable=False, default=time.time)
+
+# Key of the PostgreSQL advisory lock serializing schema migrations.
+SCHEMA_LOCK_KEY = 0x617473
+
+def migrate_columns(connection):
+
+    # create_all does not alter existing tables; add columns introduced since
+    # a table was created, with their server defaults (existing rows get e.g.
+    # the default tenant), and create indexes added since. Column DDL is
+    # rendered by the dialect's compiler, so defaults are quoted by it.
+    dialect = connection.dialect
+    preparer = dialect.identifier_preparer
+    # SQLite has no ADD COLUMN IF NOT EXISTS; there the inspection below is
+    # the only guard.
+    if_not_exists = "IF NOT EXISTS " if dialect.name == "postgresql" else ""
+    inspector = inspect(connection)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            column_ddl = CreateColumn(column).compile(dialect=dialect)
+            connection.execute(text(
+                f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {if_not_exists}{column_ddl}"
+            ))
+        existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(connection, checkfirst=True)
+
+def migrate_schema(engine):
+
+    # Creates missing tables, columns and indexes. Run once per deployment
+    # before the workers start (`python database_integration.py migrate`);
+    # on PostgreSQL concurrent runs wait on an advisory lock held until the
+    # transaction commits, and then find the schema already up to date.
+    with engine.begin() as connection:
+        if connection.dialect.name == "postgresql":
+            connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        Base.metadata.create_all(connection)
+        migrate_columns(connection)
+
 engine = create_engine(DATABASE_URL)
-Base.metadata.create_all(engine)
 Session = sessionmaker(bind=engine)
-session = Session()
+# One session per thread: API handlers run both on the event loop and on the
+# thread pool, and background jobs have threads of their own.
+session_registry = scoped_session(Session)
+session = session_registry
+
+def release_session():
+
+    # Closes the calling thread's session, so a pooled thread does not keep
+    # a transaction (and its connection) open between requests.
+    session_registry.remove()
+
+def complete_outbox_entry(outbox_entry):
+
+    # Marks the entry done; the caller commits it together with its own write.
+    if outbox_entry is not None:
+        outbox_entry.status = "done"
+        outbox_entry.updated_at = time.time()
+
+def normalize_skills(skills):
+
+    # Parsers return a list, older rows and imports a comma separated string.
+    if not skills:
+        return []
+    if isinstance(skills, str):
+        skills = re.split(r"[,;\n]", skills)
+    normalized = []
+    for skill in skills:
+        skill = " ".join(str(skill).split()).lower()
+        if skill and skill not in normalized:
+            normalized.append(skill)
+    return normalized
+
+def skills_text(skills):
+
+    return ", ".join(skills) if isinstance(skills, (list, tuple)) else skills
 
-def save_candidate(parsed_data, unique_id):
+def _skill_rows(unique_id, tenant, skills):
+
+    return [CandidateSkill(tenant_id=tenant, unique_id=unique_id, skill=skill) for skill in normalize_skills(skills)]
+
+def _delete_skills(unique_ids, tenant):
+
+    (
+        session.query(CandidateSkill)
+        .filter(CandidateSkill.tenant_id == tenant, CandidateSkill.unique_id.in_(list(unique_ids)))
+        .delete(synchronize_session=False)
+    )
+
+def _record_key(kind, unique_id, tenant):
+
+    return f"{kind}:{tenant}:{unique_id}"
+
+# Bumped on every candidate write through this worker, so in-memory indexes
+# built from the candidates table (job_matching's attribute index) can tell
+# they are stale without polling the database.
+candidate_generations = {}
+
+def _invalidate_records(kind, unique_ids, tenant):
+
+    if kind == "candidate":
+        candidate_generations[tenant] = candidate_generations.get(tenant, 0) + 1
+    for unique_id in unique_ids:
+        record_cache.delete(_record_key(kind, unique_id, tenant))
+
+def _fetch_records(kind, model, fields, unique_ids, tenant):
+
+    records = {}
+    missing = []
+    for unique_id in dict.fromkeys(unique_ids):
+        cached = record_cache.get(_record_key(kind, unique_id, tenant)) if RECORD_CACHE_ENABLED else None
+        if cached is None:
+            missing.append(unique_id)
+        else:
+            records[unique_id] = cached
+
+    columns = [getattr(model, field) for field in fields]
+    for start in range(0, len(missing), RECORD_QUERY_BATCH_SIZE):
+        rows = (
+            session.query(model.unique_id, *columns)
+            .filter(model.tenant_id == tenant, model.unique_id.in_(missing[start:start + RECORD_QUERY_BATCH_SIZE]))
+        )
+        for unique_id, *values in rows:
+            records[unique_id] = dict(zip(fields, values))
+            if RECORD_CACHE_ENABLED:
+                record_cache.set(_record_key(kind, unique_id, tenant), records[unique_id])
+    return records
+
+def fetch_candidate_records(unique_ids, tenant=DEFAULT_TENANT):
+
+    """
+    Candidate fields shown by the UI for many ids, from the record cache or
+    one `IN (...)` query per batch of misses.
+
+    Returns:
+        dict: Record per unique_id found; unknown ids are left out.
+    """
+
+    return _fetch_records("candidate", Candidate, CANDIDATE_RECORD_FIELDS, unique_ids, tenant)
+
+def fetch_job_records(unique_ids, tenant=DEFAULT_TENANT):
+
+    """Job title and description for many ids; see `fetch_candidate_records`."""
+
+    return _fetch_records("job", Job, JOB_RECORD_FIELDS, unique_ids, tenant)
+
+def attribute_fields(parsed_data):
+
+    # Attributes derived during parsing are passed in; other writers (imports,
+    # rehydration, roll-forward) only have the text.
+    derived = derive_attributes(parsed_data.get("experience"), parsed_data.get("education"))
+    return {
+        field: parsed_data[field] if parsed_data.get(field) is not None else value
+        for field, value in derived.items()
+    }
+
+def save_candidate(parsed_data, unique_id, tenant=DEFAULT_TENANT, outbox_entry=None):
 
     candidate = Candidate(
+        tenant_id=tenant,
         unique_id=unique_id,
         name=parsed_data.get("name"),
         location=parsed_data.get("location"),
         experience=parsed_data.get("experience"),
         education=parsed_data.get("education"),
-        skills=parsed_data.get("skills")
+        skills=skills_text(parsed_data.get("skills")),
+        content_hash=parsed_data.get("content_hash"),
+        embedding_text=parsed_data.get("embedding_text"),
+        **location_fields(parsed_data.get("location")),
+        **attribute_fields(parsed_data)
     )
     session.add(candidate)
+    session.add_all(_skill_rows(unique_id, tenant, parsed_data.get("skills")))
+    complete_outbox_entry(outbox_entry)
     session.commit()
+    _invalidate_records("candidate", [unique_id], tenant)
 
-def save_job(job_title, job_description, unique_id):
+def update_candidate(parsed_data, unique_id, tenant=DEFAULT_TENANT, outbox_entry=None):
+
+    candidate = get_candidate(unique_id, tenant)
+    if candidate is None:
+        return False
+    for field in ("name", "location", "experience", "education", "content_hash", "embedding_text"):
+        if parsed_data.get(field) is not None:
+            setattr(candidate, field, parsed_data[field])
+    if parsed_data.get("location") is not None:
+        for field, value in location_fields(parsed_data["location"]).items():
+            setattr(candidate, field, value)
+    if parsed_data.get("experience") is not None or parsed_data.get("education") is not None:
+        attributes = {"experience": candidate.experience, "education": candidate.education}
+        attributes.update((field, value) for field, value in parsed_data.items() if value is not None)
+        for field, value in attribute_fields(attributes).items():
+            setattr(candidate, field, value)
+    if parsed_data.get("skills") is not None:
+        candidate.skills = skills_text(parsed_data["skills"])
+        _delete_skills([unique_id], tenant)
+        session.add_all(_skill_rows(unique_id, tenant, parsed_data["skills"]))
+    complete_outbox_entry(outbox_entry)
+    session.commit()
+    _invalidate_records("candidate", [unique_id], tenant)
+    return True
+
+def save_job(job_title, job_description, unique_id, tenant=DEFAULT_TENANT, outbox_entry=None):
 
     job = Job(
+        tenant_id=tenant,
         unique_id=unique_id,
         title=job_title,
         description=job_description
     )
     session.add(job)
+    complete_outbox_entry(outbox_entry)
+    session.commit()
+    _invalidate_records("job", [unique_id], tenant)
+
+def get_candidate(unique_id, tenant=DEFAULT_TENANT):
+
+    return session.query(Candidate).filter_by(tenant_id=tenant, unique_id=unique_id).first()
+
+def find_candidate_by_hash(content_hash, tenant=DEFAULT_TENANT):
+
+    return session.query(Candidate).filter_by(tenant_id=tenant, content_hash=content_hash).first()
+
+def find_candidate_ids(
+    tenant=DEFAULT_TENANT, unique_ids=None, created_before=None, location=None, inactive_before=None, skills=None,
+    near=None, limit=None
+):
+
+    # Filters combine; `skills` matches candidates having all of them and
+    # `near` is `(latitude, longitude, radius_km)`.
+    query = session.query(Candidate.unique_id).filter(Candidate.tenant_id == tenant)
+    if unique_ids is not None:
+        query = query.filter(Candidate.unique_id.in_(list(unique_ids)))
+    if created_before is not None:
+        query = query.filter(Candidate.created_at < created_before)
+    if location is not None:
+        query = query.filter(Candidate.location == location)
+    if inactive_before is not None:
+        query = query.filter(func.coalesce(Candidate.updated_at, Candidate.created_at) < inactive_before)
+    wanted_skills = normalize_skills(skills)
+    if wanted_skills:
+        having_skills = (
+            session.query(CandidateSkill.unique_id)
+            .filter(CandidateSkill.tenant_id == tenant, CandidateSkill.skill.in_(wanted_skills))
+            .group_by(CandidateSkill.unique_id)
+            .having(func.count(func.distinct(CandidateSkill.skill)) == len(wanted_skills))
+        )
+        query = query.filter(Candidate.unique_id.in_(having_skills))
+    query = query.order_by(Candidate.id)
+    if near is None:
+        if limit is not None:
+            query = query.limit(limit)
+        return [unique_id for (unique_id,) in query]
+
+    # Geohash prefixes select the cells around the point through the index;
+    # the exact distance is checked on the few rows they return.
+    latitude, longitude, radius_km = near
+    cells = geohash_cover(latitude, longitude, radius_km)
+    if cells == [""]:
+        query = query.filter(Candidate.geohash.isnot(None))
+    else:
+        query = query.filter(or_(*[Candidate.geohash.like(f"{cell}%") for cell in cells]))
+    unique_ids = [
+        unique_id
+        for unique_id, candidate_latitude, candidate_longitude in query.add_columns(Candidate.latitude, Candidate.longitude)
+        if haversine_km(latitude, longitude, candidate_latitude, candidate_longitude) <= radius_km
+    ]
+    return unique_ids[:limit] if limit is not None else unique_ids
+
+def get_candidates(unique_ids, tenant=DEFAULT_TENANT):
+
+    return (
+        session.query(Candidate)
+        .filter(Candidate.tenant_id == tenant, Candidate.unique_id.in_(list(unique_ids)))
+        .all()
+    )
+
+def list_tenants():
+
+    tenants = {DEFAULT_TENANT}
+    for model in (Candidate, Job):
+        tenants.update(tenant for (tenant,) in session.query(model.tenant_id).distinct())
+    return sorted(tenants)
+
+def bulk_insert_candidates(rows, tenant=DEFAULT_TENANT):
+
+    # Rows whose unique_id already exists are skipped, so an interrupted
+    # import can simply be run again.
+    existing = set(find_candidate_ids(tenant, unique_ids=[row["unique_id"] for row in rows]))
+    new_rows = [
+        {
+            **row, "tenant_id": tenant, "skills": skills_text(row.get("skills")),
+            **location_fields(row.get("location")), **attribute_fields(row)
+        }
+        for row in rows if row["unique_id"] not in existing
+    ]
+    session.bulk_insert_mappings(Candidate, new_rows)
+    session.bulk_insert_mappings(CandidateSkill, [
+        {"tenant_id": tenant, "unique_id": row["unique_id"], "skill": skill}
+        for row in new_rows for skill in normalize_skills(row["skills"])
+    ])
+    session.commit()
+    _invalidate_records("candidate", [row["unique_id"] for row in new_rows], tenant)
+    return len(new_rows)
+
+def backfill_candidate_skills(batch_size=1000):
+
+    """
+    Fill `candidate_skills` for candidates saved before the table existed,
+    in primary key order. Candidates that already have skill rows are left
+    alone, so the backfill can be interrupted and run again.
+
+    Returns:
+        int: Number of candidates backfilled.
+    """
+
+    backfilled = 0
+    last_id = 0
+    while True:
+        rows = (
+            session.query(Candidate.id, Candidate.tenant_id, Candidate.unique_id, Candidate.skills)
+            .filter(Candidate.id > last_id)
+            .order_by(Candidate.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return backfilled
+        last_id = rows[-1].id
+        indexed = {
+            (tenant, unique_id) for tenant, unique_id in
+            session.query(CandidateSkill.tenant_id, CandidateSkill.unique_id)
+            .filter(CandidateSkill.unique_id.in_([row.unique_id for row in rows]))
+            .distinct()
+        }
+        missing = [row for row in rows if (row.tenant_id, row.unique_id) not in indexed and normalize_skills(row.skills)]
+        session.bulk_insert_mappings(CandidateSkill, [
+            {"tenant_id": row.tenant_id, "unique_id": row.unique_id, "skill": skill}
+            for row in missing for skill in normalize_skills(row.skills)
+        ])
+        session.commit()
+        backfilled += len(missing)
+
+def backfill_candidate_locations(batch_size=1000):
+
+    """
+    Geocode candidates saved before locations were geocoded (rows with a
+    location but no geohash), in primary key order.
+
+    Returns:
+        int: Number of candidates geocoded.
+    """
+
+    geocoded = 0
+    last_id = 0
+    while True:
+        rows = (
+            session.query(Candidate)
+            .filter(Candidate.id > last_id, Candidate.geohash.is_(None), Candidate.location.isnot(None))
+            .order_by(Candidate.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return geocoded
+        last_id = rows[-1].id
+        for candidate in rows:
+            fields = location_fields(candidate.location)
+            if fields["geohash"] is not None:
+                for field, value in fields.items():
+                    setattr(candidate, field, value)
+                geocoded += 1
+        session.commit()
+
+def backfill_candidate_attributes(batch_size=1000):
+
+    """
+    Derive years of experience, seniority and degree for candidates saved
+    before these columns existed (all three NULL), in primary key order.
+
+    Returns:
+        int: Number of candidates updated.
+    """
+
+    updated = 0
+    last_id = 0
+    while True:
+        rows = (
+            session.query(Candidate)
+            .filter(
+                Candidate.id > last_id,
+                Candidate.years_experience.is_(None),
+                Candidate.seniority_level.is_(None),
+                Candidate.degree_level.is_(None)
+            )
+            .order_by(Candidate.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return updated
+        last_id = rows[-1].id
+        for candidate in rows:
+            fields = derive_attributes(candidate.experience, candidate.education)
+            if any(value is not None for value in fields.values()):
+                for field, value in fields.items():
+                    setattr(candidate, field, value)
+                updated += 1
+        session.commit()
+
+def iter_candidate_attributes(tenant=DEFAULT_TENANT, batch_size=10000):
+
+    # (unique_id, years_experience, seniority_level, degree_level) of every
+    # candidate, in keyset-paginated batches.
+    last_id = 0
+    while True:
+        rows = (
+            session.query(
+                Candidate.id, Candidate.unique_id,
+                Candidate.years_experience, Candidate.seniority_level, Candidate.degree_level
+            )
+            .filter(Candidate.tenant_id == tenant, Candidate.id > last_id)
+            .order_by(Candidate.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield [tuple(row[1:]) for row in rows]
+
+def bulk_insert_jobs(rows, tenant=DEFAULT_TENANT):
+
+    unique_ids = [row["unique_id"] for row in rows]
+    existing = {
+        unique_id for (unique_id,) in
+        session.query(Job.unique_id).filter(Job.tenant_id == tenant, Job.unique_id.in_(unique_ids))
+    }
+    new_rows = [{**row, "tenant_id": tenant} for row in rows if row["unique_id"] not in existing]
+    session.bulk_insert_mappings(Job, new_rows)
     session.commit()
+    return len(new_rows)
+
+def get_job(unique_id, tenant=DEFAULT_TENANT):
 
-def delete_candidate(unique_id):
+    return session.query(Job).filter_by(tenant_id=tenant, unique_id=unique_id).first()
 
-    candidate = session.query(Candidate).filter_by(unique_id=unique_id).first()
+def delete_candidate(unique_id, tenant=DEFAULT_TENANT, outbox_entry=None):
+
+    candidate = get_candidate(unique_id, tenant)
     if candidate:
         session.delete(candidate)
+        _delete_skills([unique_id], tenant)
+    complete_outbox_entry(outbox_entry)
+    if candidate or outbox_entry is not None:
         session.commit()
-        return True
-    return False
+    _invalidate_records("candidate", [unique_id], tenant)
+    return candidate is not None
+
+def delete_candidates(unique_ids, tenant=DEFAULT_TENANT, outbox_entries=()):
 
-def delete_job(unique_id):
+    deleted = (
+        session.query(Candidate)
+        .filter(Candidate.tenant_id == tenant, Candidate.unique_id.in_(list(unique_ids)))
+        .delete(synchronize_session=False)
+    )
+    _delete_skills(unique_ids, tenant)
+    for outbox_entry in outbox_entries:
+        complete_outbox_entry(outbox_entry)
+    session.commit()
+    _invalidate_records("candidate", unique_ids, tenant)
+    return deleted
+
+def delete_job(unique_id, tenant=DEFAULT_TENANT, outbox_entry=None):
     
-    job = session.query(Job).filter_by(unique_id=unique_id).first()
+    job = get_job(unique_id, tenant)
     if job:
         session.delete(job)
+    complete_outbox_entry(outbox_entry)
+    if job or outbox_entry is not None:
         session.commit()
-        return True
-    return False
-    
-    
+    _invalidate_records("job", [unique_id], tenant)
+    return job is not None
+
+if __name__ == "__main__":
+    import argparse
 
+    parser = argparse.ArgumentParser(description="Database maintenance.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("migrate", help="Create missing tables, columns and indexes.")
+    subparsers.add_parser("backfill-skills", help="Index the skills of candidates saved before candidate_skills.")
+    subparsers.add_parser("backfill-locations", help="Geocode candidates saved before locations were geocoded.")
+    subparsers.add_parser("backfill-attributes", help="Derive experience/seniority/degree of existing candidates.")
+    args = parser.parse_args()
 
+    if args.command == "migrate":
+        migrate_schema(engine)
+        print("Schema is up to date.")
+    elif args.command == "backfill-skills":
+        print(f"Backfilled skills of {backfill_candidate_skills()} candidates.")
+    elif args.command == "backfill-locations":
+        print(f"Geocoded {backfill_candidate_locations()} candidates.")
+    else:
+        print(f"Derived attributes of {backfill_candidate_attributes()} candidates.")
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import re
+import numpy as np
+from chroma_utils import search_resume_chroma
+from tenants import DEFAULT_TENANT
+
+DEDUP_POLICIES = ("merge", "reject", "allow")
+DEDUP_POLICY = os.getenv("ATS_DEDUP_POLICY", "merge")
+EMBEDDING_THRESHOLD = float(os.getenv("ATS_DEDUP_EMBEDDING_THRESHOLD", "0.97"))
+MINHASH_THRESHOLD = float(os.getenv("ATS_DEDUP_MINHASH_THRESHOLD", "0.8"))
+MINHASH_PERMUTATIONS = 128
+SHINGLE_SIZE = 3
+# Candidate fields a merge keeps from the existing candidate; the resume
+# content (experience, education, skills, embedding) comes from the upload.
+IDENTITY_FIELDS = ("name", "location")
+
+if DEDUP_POLICY not in DEDUP_POLICIES:
+    raise RuntimeError(f"Unknown ATS_DEDUP_POLICY: {DEDUP_POLICY!r}")
+
+# Universal hashing (a * h + b) mod p with a 31-bit prime, so products of
+# 31-bit operands fit in uint64 and all permutations vectorize.
+_MERSENNE_PRIME = (1 << 31) - 1
+_permutation_rng = np.random.default_rng(1)
+_PERMUTATION_A = _permutation_rng.integers(1, _MERSENNE_PRIME, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERMUTATION_B = _permutation_rng.integers(0, _MERSENNE_PRIME, size=MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+
+    """Set of word `size`-grams of the lower-cased text."""
+
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text):
+
+    """
+    MinHash signature of the text's shingles, one minimum per permutation.
+    Two signatures agree in a fraction of positions that estimates the
+    Jaccard similarity of the shingle sets.
+    """
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest(), "little")
+         for shingle in shingles(text)],
+        dtype=np.uint64
+    ) % _MERSENNE_PRIME
+    if hashes.size == 0:
+        return np.full(MINHASH_PERMUTATIONS, _MERSENNE_PRIME, dtype=np.uint64)
+    permuted = (np.outer(_PERMUTATION_A, hashes) + _PERMUTATION_B[:, None]) % _MERSENNE_PRIME
+    return permuted.min(axis=1)
+
+
+def minhash_similarity(signature_a, signature_b):
+
+    """Estimated Jaccard similarity of two MinHash signatures."""
+
+    return float(np.mean(np.asarray(signature_a) == np.asarray(signature_b)))
+
+
+def find_near_duplicate(embedding, text, tenant=DEFAULT_TENANT, text_of=None, version=None):
+
+    """
+    Look for an already stored resume that is a near duplicate of a new one.
+
+    The nearest stored resume by embedding is a candidate only if its cosine
+    similarity reaches `EMBEDDING_THRESHOLD`; it is confirmed when the MinHash
+    similarity of the extracted texts reaches `MINHASH_THRESHOLD`.
+
+    Args:
+        embedding: Embedding of the new resume.
+        text (str): Extracted text the embedding was computed from.
+        tenant (str): Tenant to search.
+        text_of (callable): Rebuilds a stored resume's text from its metadata.
+        version (str): Embedding version `embedding` was generated with.
+
+    Returns:
+        str | None: unique_id of the duplicate, or None.
+    """
+
+    results = search_resume_chroma(embedding, k=1, tenant=tenant, version=version)
+    if not results['ids'] or not results['ids'][0]:
+        return None
+
+    candidate_id = results['ids'][0][0]
+    candidate_embedding = np.asarray(results['embeddings'][0][0], dtype=np.float32)
+    query = np.asarray(embedding, dtype=np.float32)
+    denominator = np.linalg.norm(query) * np.linalg.norm(candidate_embedding)
+    if denominator == 0 or float(query @ candidate_embedding) / denominator < EMBEDDING_THRESHOLD:
+        return None
+
+    metadata = results['metadatas'][0][0] or {}
+    candidate_text = text_of(metadata) if text_of else metadata.get("text", "")
+    if minhash_similarity(minhash_signature(text), minhash_signature(candidate_text)) < MINHASH_THRESHOLD:
+        return None
+    return candidate_id
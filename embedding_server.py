@@ -0,0 +1,291 @@
+import asyncio
+import json
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+EMBEDDING_SERVER_SOCKET = os.getenv("ATS_EMBEDDING_SERVER_SOCKET")
+# Texts of concurrent requests (from every worker) are encoded together, up
+# to this many per batch; a batch waits at most this long to fill up.
+MAX_BATCH_SIZE = int(os.getenv("ATS_EMBEDDING_SERVER_MAX_BATCH", "64"))
+MAX_BATCH_WAIT_MS = float(os.getenv("ATS_EMBEDDING_SERVER_MAX_WAIT_MS", "2"))
+# After a failed call the client goes straight to in-process inference for
+# this long before trying the server again.
+RETRY_SECONDS = float(os.getenv("ATS_EMBEDDING_SERVER_RETRY_SECONDS", "30"))
+
+# Messages are length-prefixed. A request is one JSON frame
+# (`{"model": ..., "texts": [...]}`); a response is a JSON frame
+# (`{"shape": [n, dim]}` or `{"error": ...}`) followed by the float32 rows.
+_LENGTH = struct.Struct("<I")
+
+
+class EmbeddingServerUnavailable(RuntimeError):
+    pass
+
+
+def _frame(data):
+
+    return _LENGTH.pack(len(data)) + data
+
+
+def _recv_exactly(connection, size):
+
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = connection.recv_into(view[received:])
+        if count == 0:
+            raise ConnectionError("Embedding server closed the connection.")
+        received += count
+    return buffer
+
+
+def _recv_frame(connection):
+
+    return _recv_exactly(connection, _LENGTH.unpack(_recv_exactly(connection, _LENGTH.size))[0])
+
+
+class EmbeddingClient:
+
+    """
+    Pooled client of the embedding server.
+
+    Connections are kept open and reused by later calls, one caller at a
+    time each, so a worker's threads do not reconnect per embedding. When
+    the server cannot be reached or times out, calls raise
+    `EmbeddingServerUnavailable` immediately for `retry_seconds`, so callers
+    fall back to in-process inference without paying a timeout each time.
+    An inference error reported by the server raises it too (once).
+
+    Args:
+        path (str): Unix socket of the server.
+        pool_size (int): Idle connections kept open.
+        timeout (float): Socket timeout in seconds.
+        retry_seconds (float): How long a failed server is skipped.
+    """
+
+    def __init__(self, path, pool_size=8, timeout=30.0, retry_seconds=RETRY_SECONDS):
+        self.path = path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self._idle = queue.LifoQueue()
+        self._unavailable_until = 0.0
+
+    def _connect(self):
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.settimeout(self.timeout)
+        try:
+            connection.connect(self.path)
+        except OSError:
+            connection.close()
+            raise
+        return connection
+
+    def _release(self, connection):
+        if self._idle.qsize() < self.pool_size:
+            self._idle.put(connection)
+        else:
+            connection.close()
+
+    def _call(self, connection, request):
+        connection.sendall(_frame(request))
+        header = json.loads(bytes(_recv_frame(connection)))
+        payload = _recv_frame(connection)
+        return header, payload
+
+    def encode(self, model_name, texts):
+
+        """
+        Embeddings of `texts` computed by the server.
+
+        Returns:
+            np.ndarray: One float32 row per text.
+        """
+
+        if time.monotonic() < self._unavailable_until:
+            raise EmbeddingServerUnavailable(f"Embedding server at {self.path} is unavailable.")
+        request = json.dumps({"model": model_name, "texts": list(texts)}).encode("utf-8")
+
+        try:
+            pooled = self._idle.get_nowait()
+        except queue.Empty:
+            pooled = None
+        # A pooled connection may have been closed by a server restart; it is
+        # retried once on a fresh connection before the server counts as down.
+        # A timeout is not retried: a hung server would time out again.
+        header = None
+        for connection in ([pooled] if pooled is not None else []) + [None]:
+            try:
+                connection = connection or self._connect()
+                header, payload = self._call(connection, request)
+                break
+            except OSError as e:
+                if connection is not None:
+                    connection.close()
+                error = e
+                if not isinstance(e, ConnectionError):
+                    break
+        if header is None:
+            self._unavailable_until = time.monotonic() + self.retry_seconds
+            raise EmbeddingServerUnavailable(f"Embedding server at {self.path} is unavailable: {error}") from error
+
+        self._release(connection)
+        if "error" in header:
+            raise EmbeddingServerUnavailable(f"Embedding server failed: {header['error']}")
+        return np.frombuffer(payload, dtype=np.float32).reshape(header["shape"])
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class EmbeddingServer:
+
+    """
+    Owns the embedding models for all API workers on the host and batches
+    their requests dynamically: texts arriving while a batch is encoded, or
+    within `max_wait_ms` of the first one, are encoded together (per model).
+
+    Args:
+        encode (callable): `(model_name, texts) -> array` doing the inference.
+        max_batch (int): Texts per batch.
+        max_wait_ms (float): Longest wait for a batch to fill up.
+    """
+
+    def __init__(self, encode, max_batch=MAX_BATCH_SIZE, max_wait_ms=MAX_BATCH_WAIT_MS):
+        self._encode = encode
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queues = {}
+        # Inference runs on one thread, so the event loop keeps accepting
+        # requests (which join the next batch) while a batch is encoded.
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self.batches = 0
+        self.texts = 0
+
+    async def embed(self, model_name, texts):
+
+        if model_name not in self._queues:
+            self._queues[model_name] = asyncio.Queue()
+            asyncio.get_running_loop().create_task(self._run_batches(model_name))
+        future = asyncio.get_running_loop().create_future()
+        await self._queues[model_name].put((texts, future))
+        return await future
+
+    async def _run_batches(self, model_name):
+
+        requests = self._queues[model_name]
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await requests.get()]
+            count = len(batch[0][0])
+            deadline = loop.time() + self.max_wait
+            while count < self.max_batch:
+                try:
+                    item = requests.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(requests.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                batch.append(item)
+                count += len(item[0])
+
+            texts = [text for item_texts, _ in batch for text in item_texts]
+            try:
+                embeddings = await loop.run_in_executor(self._executor, self._encode, model_name, texts)
+                embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            self.batches += 1
+            self.texts += len(texts)
+            start = 0
+            for item_texts, future in batch:
+                if not future.done():
+                    future.set_result(embeddings[start:start + len(item_texts)])
+                start += len(item_texts)
+
+    async def handle(self, reader, writer):
+
+        try:
+            while True:
+                try:
+                    length = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))[0]
+                    request = json.loads(await reader.readexactly(length))
+                except asyncio.IncompleteReadError:
+                    return
+                try:
+                    texts = request["texts"]
+                    if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                        raise ValueError("texts must be a list of strings.")
+                    embeddings = await self.embed(request["model"], texts)
+                    writer.write(_frame(json.dumps({"shape": list(embeddings.shape)}).encode("utf-8")))
+                    writer.write(_frame(np.ascontiguousarray(embeddings).tobytes()))
+                except Exception as e:
+                    writer.write(_frame(json.dumps({"error": str(e)}).encode("utf-8")) + _frame(b""))
+                await writer.drain()
+        except ConnectionError:
+            return
+        finally:
+            writer.close()
+
+    async def serve(self, path, ready=None):
+
+        """Serves on the Unix socket `path` until cancelled; `ready` (a threading.Event) is set once listening."""
+
+        if os.path.exists(path):
+            os.remove(path)
+        server = await asyncio.start_unix_server(self.handle, path=path)
+        os.chmod(path, 0o660)
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def serve_in_thread(server, path):
+
+    """Runs `server` on a background event loop thread (used by tests and embedded setups)."""
+
+    ready = threading.Event()
+    thread = threading.Thread(target=lambda: asyncio.run(server.serve(path, ready)), daemon=True)
+    thread.start()
+    if not ready.wait(10):
+        raise RuntimeError("Embedding server did not start.")
+    return thread
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve embeddings to the API workers over a Unix socket.")
+    parser.add_argument("--socket", default=EMBEDDING_SERVER_SOCKET, required=EMBEDDING_SERVER_SOCKET is None)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_BATCH_WAIT_MS)
+    args = parser.parse_args()
+
+    from embedding_utils import encode_locally
+
+    print(f"Serving embeddings on {args.socket}.")
+    asyncio.run(EmbeddingServer(encode_locally, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms).serve(args.socket))
@@ -0,0 +1,587 @@
+import fcntl
+import json
+import os
+import struct
+import tempfile
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+SNAPSHOT_MAGIC = b"ATSSNAP2"
+SNAPSHOT_DTYPE = np.float32
+_HEADER_LENGTH = struct.Struct("<Q")
+_RECORD_LENGTH = struct.Struct("<I")
+_RECORD_PREFIX = struct.Struct("<cH")
+_RECORD_DIM = struct.Struct("<H")
+_ALIGNMENT = 64
+
+# The delta log is folded into a new base once it exceeds this many bytes,
+# or this fraction of the base matrix size, whichever is larger.
+COMPACT_MIN_DELTA_BYTES = 4 * 1024 * 1024
+COMPACT_DELTA_RATIO = 0.1
+
+_snapshot_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _normalize_rows(matrix):
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _align(length):
+
+    return length + (-length) % _ALIGNMENT
+
+
+def _delta_path(path, epoch):
+
+    return f"{path}.{epoch}.delta"
+
+
+def _read_header(path):
+
+    with open(path, "rb") as snapshot_file:
+        if snapshot_file.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a candidate embedding snapshot.")
+        (header_length,) = _HEADER_LENGTH.unpack(snapshot_file.read(_HEADER_LENGTH.size))
+        return json.loads(snapshot_file.read(header_length).decode("utf-8"))
+
+
+def _current_epoch(path):
+
+    try:
+        return _read_header(path)["epoch"]
+    except FileNotFoundError:
+        return 0
+
+
+def _write_base(temp_file, ids, matrix, epoch):
+
+    encoded = [unique_id.encode("utf-8") for unique_id in ids]
+    id_width = max((len(unique_id) for unique_id in encoded), default=1)
+    id_block = np.array(encoded, dtype=f"S{id_width}") if encoded else np.zeros(0, dtype=f"S{id_width}")
+
+    header = {
+        "count": matrix.shape[0],
+        "dim": matrix.shape[1],
+        "dtype": np.dtype(SNAPSHOT_DTYPE).str,
+        "id_width": id_width,
+        "epoch": epoch,
+        "ids_offset": 0,
+        "matrix_offset": 0,
+    }
+    # Offsets depend on the header length, which depends on the offsets;
+    # reserve enough digits by encoding once with placeholder values.
+    placeholder = json.dumps({**header, "ids_offset": 10 ** 15, "matrix_offset": 10 ** 15}).encode("utf-8")
+    header["ids_offset"] = _align(len(SNAPSHOT_MAGIC) + _HEADER_LENGTH.size + len(placeholder))
+    header["matrix_offset"] = _align(header["ids_offset"] + id_block.nbytes)
+    encoded_header = json.dumps(header).encode("utf-8").ljust(len(placeholder))
+
+    temp_file.write(SNAPSHOT_MAGIC)
+    temp_file.write(_HEADER_LENGTH.pack(len(encoded_header)))
+    temp_file.write(encoded_header)
+    temp_file.seek(header["ids_offset"])
+    temp_file.write(id_block.tobytes())
+    temp_file.seek(header["matrix_offset"])
+    temp_file.write(matrix.tobytes())
+    temp_file.flush()
+    os.fsync(temp_file.fileno())
+
+
+def _encode_record(op, unique_id, vector=None):
+
+    encoded_id = unique_id.encode("utf-8")
+    payload = _RECORD_PREFIX.pack(op, len(encoded_id)) + encoded_id
+    if vector is not None:
+        payload += _RECORD_DIM.pack(vector.shape[0]) + vector.astype(SNAPSHOT_DTYPE).tobytes()
+    return _RECORD_LENGTH.pack(len(payload)) + payload
+
+
+def _decode_records(data):
+
+    position = 0
+    while position + _RECORD_LENGTH.size <= len(data):
+        (length,) = _RECORD_LENGTH.unpack_from(data, position)
+        start = position + _RECORD_LENGTH.size
+        if start + length > len(data):
+            break
+
+        op, id_length = _RECORD_PREFIX.unpack_from(data, start)
+        cursor = start + _RECORD_PREFIX.size
+        unique_id = data[cursor:cursor + id_length].decode("utf-8")
+        cursor += id_length
+        vector = None
+        if op == b"A":
+            (dim,) = _RECORD_DIM.unpack_from(data, cursor)
+            cursor += _RECORD_DIM.size
+            vector = np.frombuffer(data, dtype=SNAPSHOT_DTYPE, count=dim, offset=cursor)
+
+        position = start + length
+        yield position, op, unique_id, vector
+
+
+class SnapshotView:
+
+    """
+    Read view over a snapshot base file plus the rows appended to its delta log.
+
+    The base ids and matrix are memory-mapped read-only, so every worker
+    shares them through the page cache. Ids are stored as a fixed-width byte
+    block rather than in the header, so reloading after a compaction does not
+    parse millions of strings. Rows replaced or deleted through the delta log
+    are masked out of the base; added rows are kept in a small in-memory
+    matrix until the next compaction.
+
+    Request threads share a view, so `sync` changes the masks and delta
+    rows under `_lock` and readers work on a copy taken under it.
+    """
+
+    def __init__(self, path, header):
+        self.path = path
+        self.epoch = header["epoch"]
+        count, dim = header["count"], header["dim"]
+        self.dim = dim
+
+        if count == 0:
+            self._base_ids = np.zeros(0, dtype=f"S{header['id_width']}")
+            self._base_matrix = np.zeros((0, dim), dtype=header["dtype"])
+        else:
+            self._base_ids = np.memmap(path, dtype=f"S{header['id_width']}", mode="r", offset=header["ids_offset"], shape=(count,))
+            self._base_matrix = np.memmap(path, dtype=header["dtype"], mode="r", offset=header["matrix_offset"], shape=(count, dim))
+
+        self._base_live = np.ones(count, dtype=bool)
+        self._delta_ids = []
+        self._delta_vectors = []
+        self._delta_live = []
+        self._delta_position = {}
+        self._delta_matrix = None
+        self._delta_offset = 0
+        self._lock = threading.RLock()
+
+    @property
+    def base_count(self):
+        return self._base_ids.shape[0]
+
+    @property
+    def row_count(self):
+        with self._lock:
+            return self.base_count + len(self._delta_ids)
+
+    @property
+    def base_matrix(self):
+
+        # Memory-mapped base rows, including rows masked out since.
+        return self._base_matrix
+
+    def __len__(self):
+        with self._lock:
+            return int(self._base_live.sum()) + sum(self._delta_live)
+
+    def sync(self):
+
+        """Applies delta records appended since the last call."""
+
+        with self._lock:
+            delta_path = _delta_path(self.path, self.epoch)
+            try:
+                if os.path.getsize(delta_path) <= self._delta_offset:
+                    return
+            except FileNotFoundError:
+                return
+
+            with open(delta_path, "rb") as delta_file:
+                delta_file.seek(self._delta_offset)
+                data = delta_file.read()
+
+            changed = set()
+            consumed = 0
+            for consumed, op, unique_id, vector in _decode_records(data):
+                changed.add(unique_id)
+                previous = self._delta_position.pop(unique_id, None)
+                if previous is not None:
+                    self._delta_live[previous] = False
+                if op == b"A":
+                    self.dim = self.dim or vector.shape[0]
+                    self._delta_position[unique_id] = len(self._delta_ids)
+                    self._delta_ids.append(unique_id)
+                    self._delta_vectors.append(vector)
+                    self._delta_live.append(True)
+
+            self._delta_offset += consumed
+            self._delta_matrix = None
+            self._mask_base(changed)
+
+    def _mask_base(self, unique_ids):
+        width = self._base_ids.dtype.itemsize
+        encoded = [unique_id.encode("utf-8") for unique_id in unique_ids]
+        encoded = [unique_id for unique_id in encoded if len(unique_id) <= width]
+        if encoded and self.base_count:
+            self._base_live[np.isin(self._base_ids, np.array(encoded, dtype=self._base_ids.dtype))] = False
+
+    def _state(self):
+
+        # Base mask, delta matrix and delta mask as of one point in time.
+        with self._lock:
+            return self._base_live.copy(), self._delta_block(), np.asarray(self._delta_live, dtype=bool)
+
+    def base_live(self):
+
+        """Copy of the mask of base rows not replaced or deleted since the last compaction."""
+
+        with self._lock:
+            return self._base_live.copy()
+
+    def _delta_block(self):
+        if self._delta_matrix is None:
+            if self._delta_vectors:
+                self._delta_matrix = np.vstack(self._delta_vectors)
+            else:
+                self._delta_matrix = np.zeros((0, self.dim), dtype=SNAPSHOT_DTYPE)
+        return self._delta_matrix
+
+    def id_at(self, row):
+
+        """Returns the candidate id of a combined (base, then delta) row number."""
+
+        if row < self.base_count:
+            return self._base_ids[row].decode("utf-8")
+        return self._delta_ids[row - self.base_count]
+
+    def rows_for(self, unique_ids):
+
+        """Returns the live combined row numbers of the given candidate ids."""
+
+        wanted = set(unique_ids)
+        with self._lock:
+            base_live = self._base_live.copy()
+            delta_positions = list(self._delta_position.items())
+        rows = []
+        width = self._base_ids.dtype.itemsize
+        encoded = [unique_id.encode("utf-8") for unique_id in wanted if len(unique_id.encode("utf-8")) <= width]
+        if encoded and self.base_count:
+            mask = np.isin(self._base_ids, np.array(encoded, dtype=self._base_ids.dtype)) & base_live
+            rows.extend(np.flatnonzero(mask).tolist())
+        rows.extend(
+            self.base_count + position
+            for unique_id, position in delta_positions
+            if unique_id in wanted
+        )
+        return np.asarray(sorted(rows), dtype=np.int64)
+
+    def scores(self, query, rows=None):
+
+        """
+        Cosine scores of a unit-length query, masked to -inf for dead rows.
+
+        Without `rows` the base matrix is multiplied in place through the
+        memory map, so no copy of the candidate embeddings is made.
+        """
+
+        base_live, delta, delta_live = self._state()
+        if rows is None:
+            if self.base_count:
+                base_scores = np.asarray(self._base_matrix @ query, dtype=SNAPSHOT_DTYPE)
+                base_scores[~base_live] = -np.inf
+            else:
+                base_scores = np.zeros(0, dtype=SNAPSHOT_DTYPE)
+            delta_scores = delta @ query if delta.shape[0] else np.zeros(0, dtype=SNAPSHOT_DTYPE)
+            delta_scores = np.where(delta_live, delta_scores, -np.inf)
+            return np.concatenate([base_scores, delta_scores])
+
+        rows = np.asarray(rows, dtype=np.int64)
+        in_base = rows < self.base_count
+        result = np.full(rows.shape[0], -np.inf, dtype=SNAPSHOT_DTYPE)
+        base_rows = rows[in_base]
+        if base_rows.size:
+            result[in_base] = np.where(base_live[base_rows], self._base_matrix[base_rows] @ query, -np.inf)
+        delta_rows = rows[~in_base] - self.base_count
+        if delta_rows.size:
+            # Rows appended after this call's copy score as dead.
+            known = delta_rows < delta_live.shape[0]
+            scored = np.full(delta_rows.shape[0], -np.inf, dtype=SNAPSHOT_DTYPE)
+            scored[known] = np.where(delta_live[delta_rows[known]], delta[delta_rows[known]] @ query, -np.inf)
+            result[~in_base] = scored
+        return result
+
+    def live_rows(self):
+
+        """Returns (ids, matrix) for every live row; used when compacting."""
+
+        base_live, delta, delta_live = self._state()
+        base_rows = np.flatnonzero(base_live)
+        ids = [unique_id.decode("utf-8") for unique_id in self._base_ids[base_rows]]
+        blocks = [np.asarray(self._base_matrix[base_rows], dtype=SNAPSHOT_DTYPE)] if base_rows.size else []
+
+        live = np.flatnonzero(delta_live)
+        ids.extend(self._delta_ids[position] for position in live)
+        if live.size:
+            blocks.append(delta[live])
+        return ids, np.concatenate(blocks, axis=0) if blocks else np.zeros((0, self.dim), dtype=SNAPSHOT_DTYPE)
+
+
+@contextmanager
+def snapshot_lock(path):
+
+    """
+    Serialises snapshot writers across worker processes with an advisory
+    lock file next to the snapshot. Writers hold it only for an append or
+    for the final swap of a rebuild, never for a full scan.
+    """
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def load_snapshot(path):
+
+    """
+    Returns the snapshot view at `path` with its delta log applied, or None
+    if no base snapshot has been built yet.
+
+    Views are cached per process and re-opened only when the base file has
+    been replaced; otherwise a call costs a `stat` plus reading new delta
+    records.
+    """
+
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        with _cache_lock:
+            _snapshot_cache.pop(path, None)
+        return None
+
+    key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _cache_lock:
+        cached = _snapshot_cache.get(path)
+        if cached is None or cached[0] != key:
+            cached = (key, SnapshotView(path, _read_header(path)))
+            _snapshot_cache[path] = cached
+
+    view = cached[1]
+    view.sync()
+    return view
+
+
+def update_snapshot(path, add_ids=(), add_embeddings=(), remove_ids=()):
+
+    """
+    Appends adds, replacements and deletions to the snapshot's delta log.
+
+    The cost is independent of the snapshot size. When no base snapshot has
+    been built yet, records are only logged while the first rebuild is in
+    flight (it creates the log when it starts and removes it when it swaps
+    the base in), so that it does not miss them; otherwise there is nothing
+    to update and the rebuild will read the rows from their source.
+
+    Returns:
+        bool: True when the delta log is large enough to be compacted.
+    """
+
+    add_embeddings = np.asarray(add_embeddings, dtype=SNAPSHOT_DTYPE).reshape(len(add_ids), -1) if len(add_ids) else None
+    records = [_encode_record(b"D", str(unique_id)) for unique_id in remove_ids]
+    if add_embeddings is not None:
+        normalized = _normalize_rows(add_embeddings)
+        records.extend(_encode_record(b"A", str(unique_id), vector) for unique_id, vector in zip(add_ids, normalized))
+
+    with snapshot_lock(path):
+        try:
+            header = _read_header(path)
+        except FileNotFoundError:
+            header = {"epoch": 0, "count": 0, "dim": 0}
+
+        delta_path = _delta_path(path, header["epoch"])
+        if header["epoch"] == 0 and not os.path.exists(delta_path):
+            return False
+        with open(delta_path, "ab") as delta_file:
+            delta_file.write(b"".join(records))
+            delta_file.flush()
+            os.fsync(delta_file.fileno())
+        delta_size = os.path.getsize(delta_path)
+
+    if header["count"] == 0 and header["dim"] == 0:
+        return False
+    base_bytes = header["count"] * header["dim"] * np.dtype(SNAPSHOT_DTYPE).itemsize
+    return delta_size >= max(COMPACT_MIN_DELTA_BYTES, COMPACT_DELTA_RATIO * base_bytes)
+
+
+def rebuild_snapshot(path, read_rows, expected_epoch=None):
+
+    """
+    Builds a new base snapshot from `read_rows()` and swaps it in.
+
+    `read_rows` runs without the writer lock, so uploads and deletes keep
+    appending while it scans. Records appended to the current delta log
+    after the scan started are carried over into the new epoch's log,
+    which makes the swap lossless.
+
+    Args:
+        path (str): Snapshot file path.
+        read_rows (callable): Returns (ids, embeddings) for the new base.
+        expected_epoch (int, optional): Abort unless the snapshot is still
+            at this epoch; used when `read_rows` derives from the old base.
+
+    Returns:
+        bool: False if another rebuild swapped in a new epoch meanwhile.
+    """
+
+    epoch = _current_epoch(path)
+    if expected_epoch is not None and epoch != expected_epoch:
+        return False
+    delta_path = _delta_path(path, epoch)
+    if epoch == 0:
+        # Tells `update_snapshot` to log writes made while the first base is built.
+        with snapshot_lock(path):
+            open(delta_path, "ab").close()
+    try:
+        start_offset = os.path.getsize(delta_path)
+    except FileNotFoundError:
+        start_offset = 0
+
+    ids, embeddings = read_rows()
+    ids = [str(unique_id) for unique_id in ids]
+    matrix = np.asarray(embeddings, dtype=SNAPSHOT_DTYPE)
+    if not ids:
+        matrix = np.zeros((0, matrix.shape[-1] if matrix.ndim == 2 else 0), dtype=SNAPSHOT_DTYPE)
+    if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+        raise ValueError("Snapshot embeddings must be a 2-D matrix with one row per id.")
+    matrix = np.ascontiguousarray(_normalize_rows(matrix), dtype=SNAPSHOT_DTYPE)
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".snapshot-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            _write_base(temp_file, ids, matrix, epoch + 1)
+
+        with snapshot_lock(path):
+            if _current_epoch(path) != epoch:
+                os.remove(temp_path)
+                return False
+
+            tail = b""
+            if os.path.exists(delta_path):
+                with open(delta_path, "rb") as delta_file:
+                    delta_file.seek(start_offset)
+                    tail = delta_file.read()
+            with open(_delta_path(path, epoch + 1), "wb") as next_delta:
+                next_delta.write(tail)
+                next_delta.flush()
+                os.fsync(next_delta.fileno())
+
+            os.replace(temp_path, path)
+
+            # Readers may still be replaying the previous epoch's log; only
+            # the one before it is safe to drop. Nobody reads the log kept
+            # before the first base existed.
+            stale = _delta_path(path, epoch - 1 if epoch > 0 else 0)
+            if os.path.exists(stale):
+                os.remove(stale)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return True
+
+
+def write_snapshot(path, ids, embeddings):
+
+    """
+    Replaces the snapshot at `path` with the given ids and embeddings.
+
+    Args:
+        path (str): Snapshot file path.
+        ids (list[str]): Candidate unique ids, one per embedding row.
+        embeddings (array-like): Embedding matrix of shape (len(ids), dim).
+    """
+
+    return rebuild_snapshot(path, lambda: (ids, embeddings))
+
+
+def compact_snapshot(path):
+
+    """
+    Folds the delta log into a new base snapshot. Only one process compacts
+    at a time; concurrent callers return False immediately.
+    """
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path + ".compact.lock", "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        try:
+            try:
+                view = SnapshotView(path, _read_header(path))
+            except FileNotFoundError:
+                return False
+
+            def read_rows():
+                view.sync()
+                return view.live_rows()
+
+            return rebuild_snapshot(path, read_rows, expected_epoch=view.epoch)
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def top_k(snapshot, query_embedding, k=10, rows=None):
+
+    """
+    Scores `query_embedding` against the snapshot by cosine similarity.
+
+    Args:
+        snapshot (SnapshotView): Loaded snapshot.
+        query_embedding (array-like): Query vector.
+        k (int): Number of results.
+        rows (array-like, optional): Restrict scoring to these row numbers.
+
+    Returns:
+        list[tuple[str, float]]: (candidate id, score) pairs, best first.
+    """
+
+    if k <= 0 or snapshot.dim == 0:
+        return []
+
+    query = np.asarray(query_embedding, dtype=SNAPSHOT_DTYPE).ravel()
+    norm = np.linalg.norm(query)
+    if norm == 0:
+        return []
+    query = query / norm
+
+    scores = snapshot.scores(query, rows)
+    if rows is None:
+        rows = np.arange(scores.shape[0])
+    else:
+        rows = np.asarray(rows, dtype=np.int64)
+
+    live = np.flatnonzero(np.isfinite(scores))
+    if live.size == 0:
+        return []
+    k = min(k, live.size)
+    best = live[np.argpartition(-scores[live], k - 1)[:k]]
+    best = best[np.argsort(-scores[best], kind="stable")]
+    return [(snapshot.id_at(int(rows[i])), float(scores[i])) for i in best]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Rebuild the resume embedding snapshot.")
+    parser.add_argument("--tenant", default="default")
+    args = parser.parse_args()
+
+    from chroma_utils import rebuild_resume_snapshot
+    from tenants import validate_tenant
+
+    count = rebuild_resume_snapshot(validate_tenant(args.tenant))
+    print(f"Wrote resume snapshot with {count} candidates.")
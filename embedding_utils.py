@@ -2,15 +2,112 @@ import os
 os.environ["SENTENCE_TRANSFORMERS_DISABLE_ONNX"] = "1"
 
 
+import threading
 from sentence_transformers import SentenceTransformer
-model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+from embedding_versions import registry, DEFAULT_EMBEDDING_MODEL
+from embedding_server import EmbeddingClient, EmbeddingServerUnavailable, EMBEDDING_SERVER_SOCKET
+from local_cache import LruCache
 
+# With ATS_EMBEDDING_SERVER_SOCKET set, embeddings are computed by the shared
+# server (`python embedding_server.py`) and this worker only loads the model
+# if it has to fall back to in-process inference.
+embedding_client = EmbeddingClient(EMBEDDING_SERVER_SOCKET) if EMBEDDING_SERVER_SOCKET else None
+model = None if embedding_client else SentenceTransformer(DEFAULT_EMBEDDING_MODEL)
 
-def generate_embedding(text):
+# Embeddings of recent free-text search queries, so repeated searches and
+# typeahead refinements skip the model. Keyed by model, not version.
+query_embedding_cache = LruCache(
+    max_entries=int(os.getenv("ATS_QUERY_EMBEDDING_CACHE_SIZE", "1024")),
+    ttl_seconds=float(os.getenv("ATS_QUERY_EMBEDDING_CACHE_TTL_SECONDS", "3600"))
+)
 
+# Models of other embedding versions, loaded on first use (e.g. while a
+# re-embedding job builds a new version).
+_models = {}
+_models_lock = threading.Lock()
+
+
+def get_model(model_name):
+
+    global model
+    if model_name == DEFAULT_EMBEDDING_MODEL:
+        if model is None:
+            with _models_lock:
+                if model is None:
+                    model = SentenceTransformer(DEFAULT_EMBEDDING_MODEL)
+        return model
+    with _models_lock:
+        if model_name not in _models:
+            _models[model_name] = SentenceTransformer(model_name)
+        return _models[model_name]
+
+
+def encode_locally(model_name, texts, batch_size=64):
+
+    return get_model(model_name).encode(list(texts), batch_size=batch_size)
+
+
+def _encode_on_server(model_name, texts):
+
+    # None when the server is not configured or unreachable.
+    if embedding_client is None:
+        return None
+    try:
+        return embedding_client.encode(model_name, texts)
+    except EmbeddingServerUnavailable:
+        return None
+
+
+def generate_embedding(text, version=None):
+
+    # version defaults to the embedding version currently serving reads
     if not text or not isinstance(text, str) or text.strip() == "":
         raise ValueError("Input text is empty or invalid.")
-    return model.encode(text)
+    model_name = registry.model_for(version or registry.active_version())
+    embeddings = _encode_on_server(model_name, [text])
+    if embeddings is not None:
+        return embeddings[0]
+    return get_model(model_name).encode(text)
+
+
+def generate_query_embedding(text, version=None):
+
+    if not text or not isinstance(text, str) or text.strip() == "":
+        raise ValueError("Input text is empty or invalid.")
+    text = " ".join(text.split())
+    key = (registry.model_for(version or registry.active_version()), text)
+    embedding = query_embedding_cache.get(key)
+    if embedding is None:
+        embedding = generate_embedding(text, version=version)
+        # Shared between requests, so callers must not modify it.
+        embedding.setflags(write=False)
+        query_embedding_cache.set(key, embedding)
+    return embedding
+
+
+def generate_embeddings(texts, version=None, batch_size=64):
+
+    model_name = registry.model_for(version or registry.active_version())
+    texts = list(texts)
+    embeddings = _encode_on_server(model_name, texts) if texts else None
+    if embeddings is not None:
+        return embeddings
+    return encode_locally(model_name, texts, batch_size=batch_size)
+
+
+def resume_embedding_text(experience, education, skills):
+
+    return (
+        f"Experience: {experience} "
+        f"Education: {education} "
+        f"Skills: {skills}"
+    )
+
+def resume_text_from_metadata(metadata):
+
+    return resume_embedding_text(
+        metadata.get("experience", ""), metadata.get("education", ""), metadata.get("skills", [])
+    )
 
 
     
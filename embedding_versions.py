@@ -0,0 +1,193 @@
+import fcntl
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+
+DEFAULT_EMBEDDING_VERSION = "v1"
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_REGISTRY_PATH = os.getenv("ATS_EMBEDDING_REGISTRY", "/mnt/ebs/chroma_db_data/embedding_versions.json")
+
+# Versions are short so that tenant + version + shard suffixes still fit in
+# Chroma's 63 character collection names.
+VERSION_PATTERN = re.compile(r"^v[1-9][0-9]{0,2}$")
+
+STATUS_ACTIVE = "active"
+STATUS_BUILDING = "building"
+STATUS_READY = "ready"
+STATUS_RETIRED = "retired"
+
+
+def validate_version(version):
+
+    """Check an embedding version id (`v1` ... `v999`) and return it unchanged."""
+
+    if not isinstance(version, str) or not VERSION_PATTERN.match(version):
+        raise ValueError(f"Invalid embedding version: {version!r}")
+    return version
+
+
+def versioned_collection_name(name, version):
+
+    """
+    Name of a collection holding embeddings of `version`. The default version
+    keeps the original names, so existing collections are version `v1`.
+    """
+
+    validate_version(version)
+    if version == DEFAULT_EMBEDDING_VERSION:
+        return name
+    return f"{name}__{version}"
+
+
+def _default_registry():
+    return {
+        "active": DEFAULT_EMBEDDING_VERSION,
+        "versions": {DEFAULT_EMBEDDING_VERSION: {"model": DEFAULT_EMBEDDING_MODEL, "status": STATUS_ACTIVE}},
+    }
+
+
+class EmbeddingRegistry:
+
+    """
+    Which embedding model each version uses, which version serves reads,
+    and the progress of versions being built.
+
+    The registry is a small JSON file replaced atomically, so switching the
+    active version is a single rename that every worker picks up on its next
+    read. Writers serialize on a lock file next to it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._cached = None
+        self._cached_stat = None
+        self._cache_lock = threading.Lock()
+
+    def load(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return _default_registry()
+        key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        with self._cache_lock:
+            if self._cached_stat != key:
+                with open(self.path, "r", encoding="utf-8") as registry_file:
+                    self._cached = json.load(registry_file)
+                self._cached_stat = key
+            return json.loads(json.dumps(self._cached))
+
+    @contextmanager
+    def _locked(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(f"{self.path}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _update(self, mutate):
+        with self._locked():
+            registry = self.load()
+            mutate(registry)
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as registry_file:
+                json.dump(registry, registry_file, indent=2, sort_keys=True)
+                registry_file.flush()
+                os.fsync(registry_file.fileno())
+            os.replace(temp_path, self.path)
+            return registry
+
+    def active_version(self):
+        return self.load()["active"]
+
+    def model_for(self, version):
+        versions = self.load()["versions"]
+        if version not in versions:
+            raise KeyError(f"Unknown embedding version: {version!r}")
+        return versions[version]["model"]
+
+    def writable_versions(self):
+
+        """
+        The active version followed by versions being built or kept ready for
+        a rollback; new writes go to all of them.
+        """
+
+        registry = self.load()
+        building = sorted(
+            version for version, entry in registry["versions"].items()
+            if entry["status"] in (STATUS_BUILDING, STATUS_READY) and version != registry["active"]
+        )
+        return [registry["active"]] + building
+
+    def version_info(self, version):
+        return self.load()["versions"].get(version)
+
+    def register(self, version, model_name):
+
+        """Start building `version` with `model_name`; re-registering the same pair keeps its progress."""
+
+        validate_version(version)
+
+        def mutate(registry):
+            entry = registry["versions"].get(version)
+            if entry is not None and entry["model"] != model_name:
+                raise ValueError(f"Embedding version {version} already uses model {entry['model']!r}")
+            if entry is None:
+                registry["versions"][version] = {"model": model_name, "status": STATUS_BUILDING, "progress": {}}
+
+        return self._update(mutate)["versions"][version]
+
+    def update_progress(self, version, **progress):
+        def mutate(registry):
+            registry["versions"][version].setdefault("progress", {}).update(progress)
+
+        self._update(mutate)
+
+    def mark_ready(self, version):
+        def mutate(registry):
+            if registry["versions"][version]["status"] == STATUS_BUILDING:
+                registry["versions"][version]["status"] = STATUS_READY
+
+        self._update(mutate)
+
+    def activate(self, version):
+
+        """
+        Switch reads to `version`. The previous version stays `ready` and
+        keeps receiving writes, so re-activating it rolls back without losing
+        uploads; `retire` stops that once the switch is final.
+        """
+
+        def mutate(registry):
+            entry = registry["versions"].get(version)
+            if entry is None:
+                raise KeyError(f"Unknown embedding version: {version!r}")
+            if entry["status"] in (STATUS_BUILDING, STATUS_RETIRED):
+                raise ValueError(f"Embedding version {version} is {entry['status']} and cannot serve reads")
+            previous = registry["active"]
+            if previous != version:
+                registry["versions"][previous]["status"] = STATUS_READY
+            entry["status"] = STATUS_ACTIVE
+            registry["active"] = version
+
+        self._update(mutate)
+
+    def retire(self, version):
+
+        """Stop writing to a version that no longer serves reads."""
+
+        def mutate(registry):
+            if registry["active"] == version:
+                raise ValueError(f"Embedding version {version} is active")
+            registry["versions"][version]["status"] = STATUS_RETIRED
+
+        self._update(mutate)
+
+
+registry = EmbeddingRegistry(EMBEDDING_REGISTRY_PATH)
@@ -0,0 +1,156 @@
+import csv
+import math
+import os
+import re
+import threading
+import unicodedata
+
+GAZETTEER_PATH = os.getenv("ATS_GAZETTEER_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gazetteer.csv"))
+# Precision 7 cells are about 150 m across, well below any useful radius.
+GEOHASH_PRECISION = 7
+# Radius queries are covered by at most this many geohash prefixes; the
+# precision is lowered until the cover fits.
+MAX_COVER_CELLS = 32
+EARTH_RADIUS_KM = 6371.0
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def normalize_place(text):
+
+    """Lookup key of a place name: case, accents, punctuation and spacing removed."""
+
+    text = text.casefold().replace("ə", "e").replace("ı", "i")
+    text = "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+def load_gazetteer(path=GAZETTEER_PATH):
+
+    """
+    Offline gazetteer (`name,country,latitude,longitude,aliases`), keyed by
+    normalized name and alias. `ATS_GAZETTEER_PATH` can point at a larger
+    file (e.g. converted from GeoNames) with the same columns.
+    """
+
+    places = {}
+    with open(path, newline="", encoding="utf-8") as gazetteer_file:
+        for row in csv.DictReader(gazetteer_file):
+            place = (row["name"], float(row["latitude"]), float(row["longitude"]))
+            for name in [row["name"]] + [alias for alias in (row.get("aliases") or "").split("|") if alias]:
+                places.setdefault(normalize_place(name), place)
+    return places
+
+
+def _places():
+
+    global _gazetteer
+    with _gazetteer_lock:
+        if _gazetteer is None:
+            _gazetteer = load_gazetteer()
+        return _gazetteer
+
+
+def geocode(location):
+
+    """
+    Coordinates of a free-text location such as "Baku" or "Bakı, Azerbaijan":
+    the whole text is looked up first, then each comma separated part.
+
+    Returns:
+        tuple: `(name, latitude, longitude)`, or None if no part is known.
+    """
+
+    if not location or not isinstance(location, str):
+        return None
+    places = _places()
+    for candidate in [location] + location.split(","):
+        place = places.get(normalize_place(candidate))
+        if place is not None:
+            return place
+    return None
+
+
+def geohash_encode(latitude, longitude, precision=GEOHASH_PRECISION):
+
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash, bits, bit_count, even = [], 0, 0, True
+    while len(geohash) < precision:
+        value, interval = (longitude, lon_range) if even else (latitude, lat_range)
+        middle = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            interval[0] = middle
+        else:
+            interval[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(geohash)
+
+
+def _cell_size(precision):
+
+    # Longitude gets the extra bit when 5 * precision is odd.
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lon_bits
+
+
+def haversine_km(latitude1, longitude1, latitude2, longitude2):
+
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(longitude2 - longitude1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def geohash_cover(latitude, longitude, radius_km, max_cells=MAX_COVER_CELLS):
+
+    """
+    Geohash prefixes whose cells together contain the circle of `radius_km`
+    around a point (a superset: callers filter by exact distance).
+
+    Returns:
+        list[str]: Prefixes; `[""]` when the circle needs the whole globe.
+    """
+
+    d_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    south, north = max(latitude - d_lat, -90.0), min(latitude + d_lat, 90.0)
+    cos_lat = min(math.cos(math.radians(south)), math.cos(math.radians(north)))
+    if north >= 90.0 or south <= -90.0 or cos_lat <= 0 or d_lat / cos_lat >= 180.0:
+        return [""]
+    d_lon = d_lat / cos_lat
+    west, east = longitude - d_lon, longitude + d_lon
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = _cell_size(precision)
+        rows = range(math.floor((south + 90.0) / height), math.floor((north + 90.0) / height) + 1)
+        columns = range(math.floor((west + 180.0) / width), math.floor((east + 180.0) / width) + 1)
+        if len(rows) * len(columns) > max_cells:
+            continue
+        cells = set()
+        for row in rows:
+            cell_latitude = min(-90.0 + (row + 0.5) * height, 90.0)
+            for column in columns:
+                cell_longitude = (-180.0 + (column + 0.5) * width + 180.0) % 360.0 - 180.0
+                cells.add(geohash_encode(cell_latitude, cell_longitude, precision))
+        return sorted(cells)
+    return [""]
+
+
+def location_fields(location):
+
+    """`latitude`, `longitude` and `geohash` columns of a candidate location (None if unknown)."""
+
+    place = geocode(location)
+    if place is None:
+        return {"latitude": None, "longitude": None, "geohash": None}
+    _, latitude, longitude = place
+    return {"latitude": latitude, "longitude": longitude, "geohash": geohash_encode(latitude, longitude)}
@@ -1,12 +1,183 @@
+import os
+import threading
+import time
 from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-from chroma_utils import search_resume_chroma
+from chroma_utils import (
+    search_resume_chroma,
+    get_resume_metadatas,
+    get_resume_records,
+    load_job_matrix,
+    load_resume_snapshot,
+    load_resume_projection,
+    RESUME_SNAPSHOT_ENABLED,
+    CHROMA_BATCH_SIZE
+)
+from database_integration import find_candidate_ids, iter_candidate_attributes, candidate_generations
+from embedding_snapshot import top_k
+from projection import first_pass_rows, PROJECTION_ENABLED, SHORTLIST_FACTOR, MIN_SHORTLIST
+from tenants import DEFAULT_TENANT
 
-def calculate_ats_score(job_embedding):
-    
+# Per-tenant arrays of the candidates' derived attributes, so range filters
+# are one vectorized mask instead of a database query per search. Rebuilt
+# after candidate writes through this worker, and after the TTL for writes
+# made by other workers.
+ATTRIBUTE_INDEX_TTL_SECONDS = float(os.getenv("ATS_ATTRIBUTE_INDEX_TTL_SECONDS", "300"))
+_attribute_indexes = {}
+_attribute_index_lock = threading.Lock()
+
+def load_attribute_index(tenant=DEFAULT_TENANT):
+
+    generation = candidate_generations.get(tenant, 0)
+    cached = _attribute_indexes.get(tenant)
+    if (
+        cached is not None and cached["generation"] == generation
+        and time.monotonic() - cached["loaded_at"] < ATTRIBUTE_INDEX_TTL_SECONDS
+    ):
+        return cached
+
+    ids, years, seniority, degree = [], [], [], []
+    for batch in iter_candidate_attributes(tenant):
+        for unique_id, years_experience, seniority_level, degree_level in batch:
+            ids.append(unique_id)
+            # Unknown values never satisfy a predicate: NaN compares false and
+            # -1 is below every level.
+            years.append(np.nan if years_experience is None else years_experience)
+            seniority.append(-1 if seniority_level is None else seniority_level)
+            degree.append(-1 if degree_level is None else degree_level)
+    loaded = {
+        "ids": np.array(ids, dtype=object),
+        "years": np.array(years, dtype=np.float32),
+        "seniority": np.array(seniority, dtype=np.int8),
+        "degree": np.array(degree, dtype=np.int8),
+        "generation": generation,
+        "loaded_at": time.monotonic(),
+    }
+    with _attribute_index_lock:
+        _attribute_indexes[tenant] = loaded
+    return loaded
+
+def filter_by_attributes(tenant=DEFAULT_TENANT, min_years=None, max_years=None, min_seniority=None, min_degree=None):
+
+    # Ids of the candidates matching every given range predicate.
+    index = load_attribute_index(tenant)
+    mask = np.ones(len(index["ids"]), dtype=bool)
+    if min_years is not None:
+        mask &= index["years"] >= min_years
+    if max_years is not None:
+        mask &= index["years"] <= max_years
+    if min_seniority is not None:
+        mask &= index["seniority"] >= min_seniority
+    if min_degree is not None:
+        mask &= index["degree"] >= min_degree
+    return index["ids"][mask].tolist()
+
+def calculate_ats_score_from_snapshot(job_embedding, k=10, tenant=DEFAULT_TENANT, version=None, candidate_ids=None):
+
+    snapshot = load_resume_snapshot(tenant, version)
+    rows = None
+    if candidate_ids is not None:
+        rows = snapshot.rows_for(candidate_ids)
+        if rows.size == 0:
+            return []
+    elif PROJECTION_ENABLED:
+        # First pass in the reduced space, exact re-ranking of the shortlist.
+        projection = load_resume_projection(tenant, version)
+        if projection is not None and projection.source_dim == snapshot.dim:
+            rows = first_pass_rows(snapshot, projection, job_embedding, max(k * SHORTLIST_FACTOR, MIN_SHORTLIST))
+    scored = top_k(snapshot, job_embedding, k=k, rows=rows)
+    metadatas = get_resume_metadatas([candidate_id for candidate_id, _ in scored], tenant=tenant, version=version)
+
+    return [
+        {
+            "candidate_id": candidate_id,
+            "score": score,
+            "metadata": metadatas.get(candidate_id)
+        }
+        for candidate_id, score in scored
+    ]
+
+def calculate_ats_score_for_candidates(job_embedding, candidate_ids, k=10, tenant=DEFAULT_TENANT, version=None):
+
+    # Exact cosine scoring of a pre-selected candidate set: rows of the
+    # snapshot when it is enabled, else fetched from Chroma in batches with
+    # only the running top k kept.
+    if RESUME_SNAPSHOT_ENABLED:
+        return calculate_ats_score_from_snapshot(
+            job_embedding, k=k, tenant=tenant, version=version, candidate_ids=candidate_ids
+        )
+    job_vector = np.asarray(job_embedding, dtype=np.float32)
+    job_vector = job_vector / (np.linalg.norm(job_vector) or 1.0)
+    best = []
+    for start in range(0, len(candidate_ids), CHROMA_BATCH_SIZE):
+        records = get_resume_records(candidate_ids[start:start + CHROMA_BATCH_SIZE], tenant=tenant, version=version)
+        if not records['ids']:
+            continue
+        matrix = np.asarray(records['embeddings'], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1)
+        norms[norms == 0] = 1.0
+        scores = matrix @ job_vector / norms
+        best.extend(zip(scores.tolist(), records['ids'], records['metadatas']))
+        best = sorted(best, key=lambda match: match[0], reverse=True)[:k]
+
+    return [
+        {"candidate_id": candidate_id, "score": score, "metadata": metadata}
+        for score, candidate_id, metadata in best
+    ]
+
+def rank_jobs_for_resume(resume_id, k=10, tenant=DEFAULT_TENANT, version=None):
+
+    # Reverse matching: one matrix-vector product against the cached job
+    # matrix of the same embedding version.
+    records = get_resume_records([resume_id], tenant=tenant, version=version)
+    if not records['ids']:
+        return None
+    jobs = load_job_matrix(tenant, version)
+    if not jobs["ids"]:
+        return []
+
+    resume_vector = np.asarray(records['embeddings'][0], dtype=np.float32)
+    resume_vector = resume_vector / (np.linalg.norm(resume_vector) or 1.0)
+    scores = jobs["matrix"] @ resume_vector
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return [
+        {
+            "job_id": jobs["ids"][position],
+            "job_title": (jobs["metadatas"][position] or {}).get("title"),
+            "score": float(scores[position])
+        }
+        for position in top
+    ]
+
+def calculate_ats_score(
+    job_embedding, tenant=DEFAULT_TENANT, version=None, skills=None, location=None, k=10, near=None, attributes=None
+):
+
+    # version must be the embedding version job_embedding was generated
+    # with; resumes of another model's vector space are not comparable.
     try:
 
-        search_results = search_resume_chroma(job_embedding, k=10)
+        if skills or location or near or attributes:
+            # Pre-select candidates through the PostgreSQL indexes and the
+            # attribute mask and score only those, instead of filtering a
+            # global top k afterwards. `near` is `(latitude, longitude,
+            # radius_km)`; `attributes` the keyword arguments of
+            # filter_by_attributes.
+            candidate_ids = filter_by_attributes(tenant, **attributes) if attributes else None
+            if skills or location or near:
+                selected = find_candidate_ids(tenant, location=location, skills=skills, near=near)
+                if candidate_ids is not None:
+                    allowed = set(candidate_ids)
+                    selected = [candidate_id for candidate_id in selected if candidate_id in allowed]
+                candidate_ids = selected
+            return calculate_ats_score_for_candidates(job_embedding, candidate_ids, k=k, tenant=tenant, version=version)
+
+        if RESUME_SNAPSHOT_ENABLED:
+            return calculate_ats_score_from_snapshot(job_embedding, k=k, tenant=tenant, version=version)
+
+        search_results = search_resume_chroma(job_embedding, k=k, tenant=tenant, version=version)
         candidate_ids = search_results['ids'][0]
         candidate_embeddings = search_results['embeddings'][0]
         candidate_metadatas = search_results['metadatas'][0]
@@ -30,7 +201,18 @@ def calculate_ats_score(job_embedding):
     except Exception:
         raise
 
+def find_similar_candidates(resume_ids, k=10, tenant=DEFAULT_TENANT, version=None):
 
-    
-
+    # Seeds are queried with the centroid of their stored (normalized)
+    # vectors, so nothing is re-embedded; the seeds themselves are excluded.
+    records = get_resume_records(resume_ids, tenant=tenant, version=version)
+    if not records['ids']:
+        return None
+    seeds = np.asarray(records['embeddings'], dtype=np.float32)
+    norms = np.linalg.norm(seeds, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    centroid = (seeds / norms).mean(axis=0)
 
+    seed_ids = set(records['ids'])
+    matches = calculate_ats_score(centroid, tenant=tenant, version=version, k=k + len(seed_ids))
+    return [match for match in matches if match["candidate_id"] not in seed_ids][:k]
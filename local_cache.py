@@ -0,0 +1,176 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class SqliteCache:
+
+    """
+    Small persistent key/value cache on SQLite, shared by all worker
+    processes on the host.
+
+    Values are JSON. Entries older than `ttl_seconds` are treated as missing
+    and removed when read; once more than `max_entries` are stored, the least
+    recently used entries are evicted.
+    """
+
+    def __init__(self, path, ttl_seconds=30 * 24 * 3600, max_entries=100_000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_cache_accessed_at ON cache (accessed_at)")
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+
+        """Cached value for `key`, or None if missing or expired."""
+
+        connection = self._connection()
+        row = connection.execute("SELECT value, created_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > self.ttl_seconds:
+            connection.execute("DELETE FROM cache WHERE key = ?", (key,))
+            return None
+        connection.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, key, value):
+
+        """Store `value` under `key` and evict least recently used entries over the limit."""
+
+        connection = self._connection()
+        now = time.time()
+        connection.execute(
+            "INSERT OR REPLACE INTO cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+            (key, json.dumps(value), now, now)
+        )
+        excess = connection.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            connection.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at ASC LIMIT ?)", (excess,)
+            )
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def purge_expired(self):
+
+        """Remove all expired entries; returns how many were removed."""
+
+        cursor = self._connection().execute(
+            "DELETE FROM cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        )
+        return cursor.rowcount
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class LruCache:
+
+    """
+    Bounded in-process cache with least recently used eviction. Entries
+    older than `ttl_seconds` are treated as missing, which bounds how stale
+    a worker can be after another process changed the underlying data.
+    """
+
+    def __init__(self, max_entries=10_000, ttl_seconds=60):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[1] > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TieredCache:
+
+    """
+    In-process `LruCache` in front of an optional `SqliteCache` shared by
+    the workers on the host. Reads fall through to the shared tier and fill
+    the local one; writes and deletes go to both.
+    """
+
+    def __init__(self, local, shared=None):
+        self.local = local
+        self.shared = shared
+
+    def get(self, key):
+        value = self.local.get(key)
+        if value is None and self.shared is not None:
+            value = self.shared.get(key)
+            if value is not None:
+                self.local.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.local.set(key, value)
+        if self.shared is not None:
+            self.shared.set(key, value)
+
+    def delete(self, key):
+        self.local.delete(key)
+        if self.shared is not None:
+            self.shared.delete(key)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Maintain a local SQLite cache file.")
+    parser.add_argument("path")
+    parser.add_argument("command", choices=["stats", "purge"])
+    parser.add_argument("--ttl-days", type=float, default=30)
+    args = parser.parse_args()
+
+    cache = SqliteCache(args.path, ttl_seconds=args.ttl_days * 24 * 3600)
+    if args.command == "purge":
+        print(f"Removed {cache.purge_expired()} expired entries.")
+    print(f"{len(cache)} entries in {args.path}.")
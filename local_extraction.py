@@ -0,0 +1,186 @@
+import multiprocessing
+import os
+import re
+import zipfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from xml.etree import ElementTree
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # PDFs then always go to LlamaExtract
+    PdfReader = None
+
+LOCAL_EXTRACTION_ENABLED = os.getenv("ATS_LOCAL_EXTRACTION", "1") == "1"
+LOCAL_EXTRACTION_MIN_CONFIDENCE = float(os.getenv("ATS_LOCAL_EXTRACTION_MIN_CONFIDENCE", "0.75"))
+LOCAL_EXTRACTION_WORKERS = int(os.getenv("ATS_LOCAL_EXTRACTION_WORKERS", "2"))
+LOCAL_EXTRACTION_TIMEOUT = float(os.getenv("ATS_LOCAL_EXTRACTION_TIMEOUT", "20"))
+
+# Below this many characters per page a PDF is treated as scanned (no usable
+# text layer).
+MIN_CHARS_PER_PAGE = 200
+
+SECTION_HEADINGS = {
+    "experience": ("experience", "work experience", "professional experience", "employment history",
+                   "work history", "employment", "career history"),
+    "education": ("education", "academic background", "education and training", "qualifications"),
+    "skills": ("skills", "technical skills", "core skills", "key skills", "competencies", "core competencies"),
+}
+_HEADING_OF = {heading: section for section, headings in SECTION_HEADINGS.items() for heading in headings}
+_OTHER_HEADINGS = {"summary", "profile", "objective", "projects", "certifications", "languages",
+                   "interests", "references", "awards", "publications", "contact", "volunteering"}
+
+# Weights of the confidence score; they sum to 1.0.
+CONFIDENCE_WEIGHTS = {"text": 0.2, "experience": 0.3, "education": 0.25, "skills": 0.25}
+
+_WORD_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def extract_docx_text(path):
+
+    """Paragraph text of a DOCX file, read straight from word/document.xml."""
+
+    with zipfile.ZipFile(path) as archive:
+        root = ElementTree.fromstring(archive.read("word/document.xml"))
+    paragraphs = []
+    for paragraph in root.iter(f"{_WORD_NAMESPACE}p"):
+        text = "".join(node.text or "" for node in paragraph.iter(f"{_WORD_NAMESPACE}t"))
+        if text.strip():
+            paragraphs.append(text)
+    return "\n".join(paragraphs), 1
+
+
+def extract_pdf_text(path):
+
+    """Text layer of a PDF file and its page count."""
+
+    if PdfReader is None:
+        return "", 0
+    reader = PdfReader(path)
+    return "\n".join(page.extract_text() or "" for page in reader.pages), len(reader.pages)
+
+
+def _heading(line):
+    normalized = re.sub(r"[^a-z ]", "", line.lower()).strip()
+    if len(normalized) > 40:
+        return None
+    if normalized in _HEADING_OF:
+        return _HEADING_OF[normalized]
+    if normalized in _OTHER_HEADINGS:
+        return "other"
+    return None
+
+
+def split_sections(text):
+
+    """Group lines under the experience/education/skills headings they follow."""
+
+    sections = {"experience": [], "education": [], "skills": []}
+    current = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        heading = _heading(line)
+        if heading is not None:
+            current = heading
+            continue
+        if current in sections:
+            sections[current].append(line)
+    return sections
+
+
+def parse_skills(lines):
+
+    """Individual skills from a skills section split on commas, bullets and separators."""
+
+    skills = []
+    seen = set()
+    for line in lines:
+        line = re.sub(r"^[A-Za-z ]{1,30}:\s*", "", line)
+        for skill in re.split(r"[,;|•·]| - ", line):
+            skill = skill.strip(" -*\t")
+            if skill and len(skill) <= 50 and skill.lower() not in seen:
+                seen.add(skill.lower())
+                skills.append(skill)
+    return skills
+
+
+def extract_resume(path, file_type):
+
+    """
+    Extract `ResumeSchema` fields from a text-based PDF/DOCX without a remote call.
+
+    Returns:
+        tuple[dict, float]: The experience/education/skills fields and a
+        confidence in [0, 1]. Unreadable or scanned files get confidence 0.
+    """
+
+    empty = {"experience": "", "education": "", "skills": []}
+    try:
+        if file_type == "docx":
+            text, pages = extract_docx_text(path)
+        elif file_type == "pdf":
+            text, pages = extract_pdf_text(path)
+        else:
+            return empty, 0.0
+    except Exception:
+        return empty, 0.0
+
+    if not text.strip():
+        return empty, 0.0
+    if file_type == "pdf" and len(text.strip()) < MIN_CHARS_PER_PAGE * pages:
+        return empty, 0.0
+
+    sections = split_sections(text)
+    data = {
+        "experience": "\n".join(sections["experience"]),
+        "education": "\n".join(sections["education"]),
+        "skills": parse_skills(sections["skills"]),
+    }
+    confidence = CONFIDENCE_WEIGHTS["text"]
+    for field in ("experience", "education", "skills"):
+        if data[field]:
+            confidence += CONFIDENCE_WEIGHTS[field]
+    return data, round(confidence, 4)
+
+
+def get_extraction_pool():
+
+    """Process pool for local extraction, created on first use."""
+
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=LOCAL_EXTRACTION_WORKERS, mp_context=multiprocessing.get_context("spawn")
+            )
+    return _pool
+
+
+def extract_resume_locally(path, file_type):
+
+    """
+    Run `extract_resume` in the extraction process pool so PDF parsing does
+    not hold the worker's GIL. Failures and timeouts count as confidence 0.
+    """
+
+    try:
+        return get_extraction_pool().submit(extract_resume, path, file_type).result(timeout=LOCAL_EXTRACTION_TIMEOUT)
+    except Exception:
+        return {"experience": "", "education": "", "skills": []}, 0.0
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Run the local resume extractor on a file.")
+    parser.add_argument("path")
+    args = parser.parse_args()
+
+    data, confidence = extract_resume(args.path, os.path.splitext(args.path)[1].lstrip(".").lower())
+    print(json.dumps({"confidence": confidence, **data}, indent=2))
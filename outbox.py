@@ -0,0 +1,382 @@
+import json
+import os
+import time
+from database_integration import (
+    session, Candidate, Job, OutboxEntry, complete_outbox_entry,
+    get_candidate, get_job, save_candidate, save_job, delete_candidate, delete_job, delete_candidates, list_tenants
+)
+from chroma_utils import (
+    add_to_resume_chroma, add_to_job_chroma, update_resume_in_chroma,
+    delete_resume_from_chroma, delete_resumes_from_chroma, delete_job_from_chroma,
+    get_resume_metadatas, get_job_metadatas,
+    iter_resume_batches, iter_job_batches
+)
+from embedding_utils import generate_embedding, resume_embedding_text, resume_text_from_metadata
+from embedding_versions import registry as embedding_registry
+from tenants import DEFAULT_TENANT, validate_tenant
+
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("ATS_OUTBOX_MAX_ATTEMPTS", "5"))
+# Pending entries younger than this belong to requests still in flight.
+OUTBOX_RETRY_AFTER_SECONDS = float(os.getenv("ATS_OUTBOX_RETRY_AFTER_SECONDS", "60"))
+# Ids journaled within this window are left alone by the reconciliation sweep.
+RECONCILE_GRACE_SECONDS = float(os.getenv("ATS_RECONCILE_GRACE_SECONDS", "600"))
+RECONCILE_BATCH_SIZE = int(os.getenv("ATS_RECONCILE_BATCH_SIZE", "1000"))
+# Candidate fields a merge's outbox entry keeps to undo it.
+MERGE_UNDO_FIELDS = ("name", "location", "experience", "education", "skills", "embedding_text")
+
+
+def record_write(operation, unique_id, tenant=DEFAULT_TENANT, payload=None):
+
+    """
+    Journal a write before its Chroma side is applied. The PostgreSQL side
+    completes the entry in its own transaction (see `complete_outbox_entry`);
+    until then `retry_pending` can finish or undo it.
+    """
+
+    entry = OutboxEntry(
+        tenant_id=tenant,
+        operation=operation,
+        unique_id=unique_id,
+        payload=json.dumps(payload) if payload is not None else None
+    )
+    session.add(entry)
+    session.commit()
+    return entry
+
+
+def record_writes(operation, unique_ids, tenant=DEFAULT_TENANT):
+
+    """Journal the same write for many ids in one transaction (bulk deletes)."""
+
+    entries = [OutboxEntry(tenant_id=tenant, operation=operation, unique_id=unique_id) for unique_id in unique_ids]
+    session.add_all(entries)
+    session.commit()
+    return entries
+
+
+def complete_write(entry):
+
+    complete_outbox_entry(entry)
+    session.commit()
+
+
+def record_merge(entry, unique_id):
+
+    """
+    Turn a journaled resume upload into a merge into the existing candidate
+    `unique_id`, before the candidate's vector is overwritten. The row as it
+    was is kept in the payload, so an interrupted merge is undone by putting
+    the candidate's resume back into Chroma.
+
+    Returns:
+        OutboxEntry: The entry, now journaled under `unique_id`.
+    """
+
+    payload = json.loads(entry.payload) if entry.payload else {}
+    candidate = get_candidate(unique_id, entry.tenant_id)
+    payload["previous"] = (
+        {field: getattr(candidate, field) for field in MERGE_UNDO_FIELDS} if candidate is not None else None
+    )
+    entry.operation = "resume_merge"
+    entry.unique_id = unique_id
+    entry.payload = json.dumps(payload)
+    entry.updated_at = time.time()
+    session.commit()
+    return entry
+
+
+def abort_write(entry):
+
+    """
+    Undo a journaled resume upload that failed: whatever reached Chroma
+    under its id is removed, or a merge is undone. If this fails too, the
+    entry stays pending and the retry sweep finishes it later.
+    """
+
+    if entry.operation != "resume_merge":
+        entry.operation = "resume_abort"
+    entry.updated_at = time.time()
+    session.commit()
+    apply_entry(entry)
+
+
+def _apply_resume_save(entry, payload):
+
+    # Roll forward: an upload whose resume reached Chroma gets its
+    # PostgreSQL row. If Chroma never got it there is nothing to keep.
+    if get_candidate(entry.unique_id, entry.tenant_id):
+        return complete_write(entry)
+    metadata = get_resume_metadatas([entry.unique_id], tenant=entry.tenant_id).get(entry.unique_id)
+    if metadata is None:
+        return complete_write(entry)
+    skills = metadata.get("skills") or ""
+    save_candidate(
+        {
+            **payload,
+            "experience": metadata.get("experience"),
+            "education": metadata.get("education"),
+            "skills": ", ".join(skills) if isinstance(skills, list) else skills,
+            "embedding_text": resume_text_from_metadata(metadata),
+        },
+        entry.unique_id,
+        tenant=entry.tenant_id,
+        outbox_entry=entry
+    )
+
+
+def _apply_resume_abort(entry, payload):
+
+    delete_resume_from_chroma(entry.unique_id, tenant=entry.tenant_id)
+    complete_write(entry)
+
+
+def _apply_resume_merge(entry, payload):
+
+    # Undo: the merge target's resume is rewritten from its row as it was.
+    # A target without a row only had the vector, so the merged resume is
+    # kept and given a row like an upload.
+    previous = payload.pop("previous", None)
+    if previous is None:
+        return _apply_resume_save(entry, payload)
+    _restore_resume_vector(
+        Candidate(unique_id=entry.unique_id, **previous), entry.tenant_id, replace=True
+    )
+    complete_write(entry)
+
+
+def _apply_resume_delete(entry, payload):
+
+    delete_resume_from_chroma(entry.unique_id, tenant=entry.tenant_id)
+    delete_candidate(entry.unique_id, tenant=entry.tenant_id, outbox_entry=entry)
+
+
+def _apply_job_save(entry, payload):
+
+    # A job is fully described by its payload, so both sides can be redone.
+    if get_job(entry.unique_id, entry.tenant_id):
+        return complete_write(entry)
+    if not get_job_metadatas([entry.unique_id], tenant=entry.tenant_id):
+        version = embedding_registry.active_version()
+        add_to_job_chroma(
+            generate_embedding(payload["description"], version=version),
+            {"title": payload["title"], "description": payload["description"]},
+            tenant=entry.tenant_id, text=payload["description"], version=version, unique_id=entry.unique_id
+        )
+    save_job(payload["title"], payload["description"], entry.unique_id, tenant=entry.tenant_id, outbox_entry=entry)
+
+
+def _apply_job_delete(entry, payload):
+
+    delete_job_from_chroma(entry.unique_id, tenant=entry.tenant_id)
+    delete_job(entry.unique_id, tenant=entry.tenant_id, outbox_entry=entry)
+
+
+OPERATIONS = {
+    "resume_save": _apply_resume_save,
+    "resume_abort": _apply_resume_abort,
+    "resume_merge": _apply_resume_merge,
+    "resume_delete": _apply_resume_delete,
+    "job_save": _apply_job_save,
+    "job_delete": _apply_job_delete,
+}
+
+
+def apply_entry(entry):
+
+    """Apply both sides of a journaled write; every operation is idempotent."""
+
+    OPERATIONS[entry.operation](entry, json.loads(entry.payload) if entry.payload else {})
+
+
+def delete_resumes(unique_ids, tenant=DEFAULT_TENANT, batch_size=RECONCILE_BATCH_SIZE):
+
+    """
+    Delete many resumes from both stores. Each batch is journaled as
+    `resume_delete` entries, deleted from Chroma in bulk, then deleted from
+    PostgreSQL in the transaction that completes the entries.
+
+    Returns:
+        int: Number of candidate rows deleted.
+    """
+
+    unique_ids = list(unique_ids)
+    deleted = 0
+    for chunk in _chunks(unique_ids, batch_size):
+        entries = record_writes("resume_delete", chunk, tenant=tenant)
+        delete_resumes_from_chroma(chunk, tenant=tenant)
+        deleted += delete_candidates(chunk, tenant=tenant, outbox_entries=entries)
+    return deleted
+
+
+def retry_pending(limit=RECONCILE_BATCH_SIZE):
+
+    """
+    Re-apply pending entries older than `OUTBOX_RETRY_AFTER_SECONDS`. An
+    entry that keeps failing is marked `failed` after `OUTBOX_MAX_ATTEMPTS`.
+
+    Returns:
+        dict: Counts of applied and failed entries.
+    """
+
+    counts = {"applied": 0, "failed": 0}
+    entries = (
+        session.query(OutboxEntry)
+        .filter(OutboxEntry.status == "pending", OutboxEntry.updated_at < time.time() - OUTBOX_RETRY_AFTER_SECONDS)
+        .order_by(OutboxEntry.id)
+        .limit(limit)
+        .all()
+    )
+    for entry in entries:
+        try:
+            apply_entry(entry)
+            counts["applied"] += 1
+        except Exception as e:
+            session.rollback()
+            entry.attempts += 1
+            entry.last_error = str(e)
+            entry.updated_at = time.time()
+            if entry.attempts >= OUTBOX_MAX_ATTEMPTS:
+                entry.status = "failed"
+            session.commit()
+            counts["failed"] += 1
+    return counts
+
+
+def _journaled_ids(tenant):
+
+    # Ids with a pending write, or any write recent enough that the two
+    # stores may legitimately not have caught up with each other yet.
+    rows = (
+        session.query(OutboxEntry.unique_id)
+        .filter(OutboxEntry.tenant_id == tenant)
+        .filter((OutboxEntry.status == "pending") | (OutboxEntry.updated_at >= time.time() - RECONCILE_GRACE_SECONDS))
+    )
+    return {unique_id for (unique_id,) in rows}
+
+
+def _postgres_ids(model, tenant, batch_size):
+
+    ids = set()
+    last_id = 0
+    while True:
+        rows = (
+            session.query(model.id, model.unique_id)
+            .filter(model.tenant_id == tenant, model.id > last_id)
+            .order_by(model.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return ids
+        ids.update(unique_id for _, unique_id in rows)
+        last_id = rows[-1][0]
+
+
+def _chroma_ids(iter_batches, tenant, batch_size):
+
+    return {
+        unique_id
+        for batch in iter_batches(include=[], batch_size=batch_size, tenant=tenant)
+        for unique_id in batch['ids']
+    }
+
+
+def _chunks(ids, size):
+
+    ids = sorted(ids)
+    for start in range(0, len(ids), size):
+        yield ids[start:start + size]
+
+
+def reconcile(tenant=DEFAULT_TENANT, batch_size=RECONCILE_BATCH_SIZE, dry_run=False):
+
+    """
+    Diff the resume and job id sets of Chroma (active embedding version)
+    and PostgreSQL and repair the drift: vectors without a row are deleted
+    from Chroma, rows without a vector are re-embedded from their stored
+    text. Ids with a recent or pending outbox entry are skipped.
+
+    Returns:
+        dict: Orphan and missing counts per store.
+    """
+
+    report = {}
+    kinds = (
+        ("resumes", Candidate, iter_resume_batches, delete_resume_from_chroma, _restore_resume_vector),
+        ("jobs", Job, iter_job_batches, delete_job_from_chroma, _restore_job_vector),
+    )
+    for kind, model, iter_batches, delete_vector, restore_vector in kinds:
+        chroma_ids = _chroma_ids(iter_batches, tenant, batch_size)
+        postgres_ids = _postgres_ids(model, tenant, batch_size)
+        # Read after both id sets: a write in flight while they were read was
+        # journaled before its Chroma side, so it shows up here.
+        journaled = _journaled_ids(tenant)
+        orphans = chroma_ids - postgres_ids - journaled
+        missing = postgres_ids - chroma_ids - journaled
+        report[kind] = {"chroma_orphans": len(orphans), "missing_vectors": len(missing)}
+        if dry_run:
+            continue
+        for unique_id in orphans:
+            delete_vector(unique_id, tenant=tenant)
+        for chunk in _chunks(missing, batch_size):
+            for row in session.query(model).filter(model.tenant_id == tenant, model.unique_id.in_(chunk)):
+                restore_vector(row, tenant)
+    return report
+
+
+def _restore_resume_vector(candidate, tenant, replace=False):
+
+    text = candidate.embedding_text or resume_embedding_text(
+        candidate.experience or "", candidate.education or "", candidate.skills or ""
+    )
+    version = embedding_registry.active_version()
+    metadata = {
+        "name": candidate.name,
+        "location": candidate.location,
+        "experience": candidate.experience or "",
+        "education": candidate.education or "",
+        "skills": candidate.skills or "",
+    }
+    write = update_resume_in_chroma if replace else add_to_resume_chroma
+    write(
+        embedding=generate_embedding(text, version=version), metadata=metadata,
+        tenant=tenant, text=text, version=version, unique_id=candidate.unique_id
+    )
+
+
+def _restore_job_vector(job, tenant):
+
+    if not job.description:
+        return
+    version = embedding_registry.active_version()
+    add_to_job_chroma(
+        generate_embedding(job.description, version=version),
+        {"title": job.title, "description": job.description},
+        tenant=tenant, text=job.description, version=version, unique_id=job.unique_id
+    )
+
+
+def run_sweep(tenant=None, dry_run=False):
+
+    """Retry pending outbox entries, then reconcile one tenant or all of them."""
+
+    report = {"outbox": {"applied": 0, "failed": 0} if dry_run else retry_pending()}
+    for name in ([validate_tenant(tenant)] if tenant else list_tenants()):
+        report[name] = reconcile(name, dry_run=dry_run)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Repair drift between Chroma and PostgreSQL.")
+    parser.add_argument("--tenant", help="Only this tenant (default: all tenants).")
+    parser.add_argument("--dry-run", action="store_true", help="Only report the drift.")
+    parser.add_argument("--every", type=float, default=0, help="Repeat every N seconds instead of running once.")
+    args = parser.parse_args()
+
+    while True:
+        print(json.dumps(run_sweep(args.tenant, args.dry_run), indent=2))
+        if not args.every:
+            break
+        time.sleep(args.every)
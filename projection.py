@@ -0,0 +1,309 @@
+import os
+import tempfile
+import hashlib
+import threading
+import time
+
+import numpy as np
+
+# First-pass scan in a PCA-reduced space: the snapshot's base rows are
+# projected once per snapshot epoch, each query scores the reduced rows, and
+# the best `k * ATS_PROJECTION_SHORTLIST_FACTOR` are re-ranked exactly.
+PROJECTION_ENABLED = os.getenv("ATS_PROJECTION", "0") == "1"
+SHORTLIST_FACTOR = int(os.getenv("ATS_PROJECTION_SHORTLIST_FACTOR", "10"))
+MIN_SHORTLIST = 100
+FIT_SAMPLE_SIZE = 100_000
+
+_projections = {}
+_reduced_bases = {}
+_lock = threading.Lock()
+
+
+def _normalize(matrix):
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class Projection:
+
+    """
+    PCA projection of unit-length embeddings onto their `dim` principal axes.
+
+    Args:
+        mean (np.ndarray): Mean of the fitted (normalized) embeddings.
+        components (np.ndarray): `dim` x source dimension matrix of principal axes.
+        explained_variance_ratio (np.ndarray): Variance share of each component.
+        embedding_version (str): Embedding version the projection was fitted on.
+        fitted_at (float): Fit time (epoch seconds).
+    """
+
+    def __init__(self, mean, components, explained_variance_ratio, embedding_version=None, fitted_at=None):
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+        self.explained_variance_ratio = np.asarray(explained_variance_ratio, dtype=np.float32)
+        self.embedding_version = embedding_version
+        self.fitted_at = fitted_at if fitted_at is not None else time.time()
+        # Identifies the fit, so cached reduced matrices are not reused across refits.
+        self.fit_id = hashlib.sha1(self.components.tobytes()).hexdigest()[:12]
+
+    @property
+    def dim(self):
+        return self.components.shape[0]
+
+    @property
+    def source_dim(self):
+        return self.components.shape[1]
+
+    def truncated(self, dim):
+
+        """The same projection keeping only the first `dim` components."""
+
+        return Projection(
+            self.mean, self.components[:dim], self.explained_variance_ratio[:dim],
+            embedding_version=self.embedding_version, fitted_at=self.fitted_at
+        )
+
+    def transform(self, matrix, batch_size=65536):
+
+        """
+        Projects embeddings (one vector or a matrix, e.g. a memory-mapped
+        snapshot) in batches.
+
+        Returns:
+            np.ndarray: Unit-length float32 rows in the reduced space.
+        """
+
+        matrix = np.asarray(matrix)
+        if matrix.ndim == 1:
+            matrix = matrix.reshape(1, -1)
+        reduced = np.empty((matrix.shape[0], self.dim), dtype=np.float32)
+        for start in range(0, matrix.shape[0], batch_size):
+            block = _normalize(np.asarray(matrix[start:start + batch_size], dtype=np.float32))
+            reduced[start:start + batch_size] = _normalize((block - self.mean) @ self.components.T)
+        return reduced
+
+    def save(self, path):
+
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                np.savez(
+                    temp_file,
+                    mean=self.mean,
+                    components=self.components,
+                    explained_variance_ratio=self.explained_variance_ratio,
+                    embedding_version=np.array(self.embedding_version or ""),
+                    fitted_at=np.array(self.fitted_at)
+                )
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+
+        with np.load(path) as arrays:
+            return cls(
+                arrays["mean"], arrays["components"], arrays["explained_variance_ratio"],
+                embedding_version=str(arrays["embedding_version"]) or None,
+                fitted_at=float(arrays["fitted_at"])
+            )
+
+
+def fit_projection(embeddings, dim, embedding_version=None, sample_size=FIT_SAMPLE_SIZE, seed=0):
+
+    """
+    Fits a PCA projection on (a random sample of) the given embeddings.
+
+    Args:
+        embeddings (array-like): Embeddings to fit on.
+        dim (int): Number of components to keep.
+        embedding_version (str): Embedding version of `embeddings`, recorded in the projection.
+        sample_size (int): Maximum number of rows the covariance is computed from.
+        seed (int): Sampling seed.
+
+    Returns:
+        Projection: The fitted projection.
+    """
+
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if embeddings.ndim != 2 or embeddings.shape[0] < 2:
+        raise ValueError("At least two embeddings are needed to fit a projection.")
+    if not 0 < dim <= embeddings.shape[1]:
+        raise ValueError(f"Projection dimension must be between 1 and {embeddings.shape[1]}.")
+    if embeddings.shape[0] > sample_size:
+        rows = np.random.default_rng(seed).choice(embeddings.shape[0], size=sample_size, replace=False)
+        embeddings = embeddings[np.sort(rows)]
+
+    sample = _normalize(embeddings).astype(np.float64)
+    mean = sample.mean(axis=0)
+    centered = sample - mean
+    # Eigenvectors of the covariance matrix, largest eigenvalue first.
+    eigenvalues, eigenvectors = np.linalg.eigh(centered.T @ centered / (len(sample) - 1))
+    order = np.argsort(eigenvalues)[::-1]
+    eigenvalues = np.clip(eigenvalues[order], 0, None)
+    ratio = eigenvalues / (eigenvalues.sum() or 1.0)
+    return Projection(mean, eigenvectors[:, order[:dim]].T, ratio[:dim], embedding_version=embedding_version)
+
+
+def load_projection(path):
+
+    """Projection stored at `path`, reloaded when the file is refitted; None if there is none."""
+
+    try:
+        modified = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    cached = _projections.get(path)
+    if cached is not None and cached[0] == modified:
+        return cached[1]
+    projection = Projection.load(path)
+    with _lock:
+        _projections[path] = (modified, projection)
+    return projection
+
+
+def reduced_base(snapshot, projection):
+
+    """Projected base rows of a snapshot, computed once per snapshot epoch and fit."""
+
+    key = (snapshot.epoch, projection.fit_id)
+    cached = _reduced_bases.get(snapshot.path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    reduced = projection.transform(snapshot.base_matrix)
+    with _lock:
+        _reduced_bases[snapshot.path] = (key, reduced)
+    return reduced
+
+
+def first_pass_rows(snapshot, projection, query_embedding, shortlist):
+
+    """
+    Snapshot rows to re-rank exactly: the `shortlist` best live base rows in
+    the reduced space, plus every row appended since the last compaction
+    (those are not projected yet). Dead appended rows may be included; exact
+    scoring drops them.
+
+    Returns:
+        np.ndarray: Combined row numbers.
+    """
+
+    reduced = reduced_base(snapshot, projection)
+    rows = np.zeros(0, dtype=np.int64)
+    live = np.flatnonzero(snapshot.base_live())
+    if live.size:
+        # Replaced or deleted base rows must not take shortlist places.
+        scores = (reduced @ projection.transform(query_embedding)[0])[live]
+        size = min(shortlist, live.size)
+        rows = live[np.argpartition(-scores, size - 1)[:size]].astype(np.int64)
+    return np.concatenate([rows, np.arange(snapshot.base_count, snapshot.row_count, dtype=np.int64)])
+
+
+def projection_report(embeddings, queries, dims=(32, 64, 128), k=10, shortlist_factor=SHORTLIST_FACTOR,
+                      sample_size=FIT_SAMPLE_SIZE):
+
+    """
+    Measures recall@k and latency of the reduced first pass plus exact
+    re-ranking at each dimension, against an exact full-dimension scan.
+
+    Args:
+        embeddings (array-like): The candidate embeddings.
+        queries (array-like): Query vectors.
+        dims (tuple[int]): Projection dimensions to compare.
+        k (int): Results per query.
+        shortlist_factor (int): Shortlist size as a multiple of `k`.
+        sample_size (int): Rows the projection is fitted on.
+
+    Returns:
+        list[dict]: One row per dimension with explained variance, recall and
+        mean latency in milliseconds, next to the exact scan's latency.
+    """
+
+    matrix = _normalize(np.asarray(embeddings, dtype=np.float32))
+    queries = _normalize(np.asarray(queries, dtype=np.float32))
+    k = min(k, matrix.shape[0])
+    shortlist = min(max(k * shortlist_factor, MIN_SHORTLIST), matrix.shape[0])
+
+    truth, exact_latencies = [], []
+    for query in queries:
+        start = time.perf_counter()
+        scores = matrix @ query
+        truth.append(set(np.argpartition(-scores, k - 1)[:k].tolist()))
+        exact_latencies.append((time.perf_counter() - start) * 1000)
+
+    full = fit_projection(matrix, max(dims), sample_size=sample_size)
+    report = []
+    for dim in dims:
+        projection = full.truncated(dim)
+        reduced = projection.transform(matrix)
+        hits, latencies = 0, []
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            candidates = np.argpartition(-(reduced @ projection.transform(query)[0]), shortlist - 1)[:shortlist]
+            scores = matrix[candidates] @ query
+            found = candidates[np.argpartition(-scores, k - 1)[:k]]
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len(expected.intersection(found.tolist()))
+        report.append({
+            "dim": dim,
+            "explained_variance": float(projection.explained_variance_ratio.sum()),
+            "recall": hits / max(k * len(queries), 1),
+            "mean_ms": float(np.mean(latencies)),
+            "exact_mean_ms": float(np.mean(exact_latencies)),
+        })
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Fit, inspect or evaluate the PCA projection used for the first-pass scan.")
+    parser.add_argument("command", choices=["fit", "info", "report"])
+    parser.add_argument("--tenant", default="default")
+    parser.add_argument("--dim", type=int, default=64)
+    parser.add_argument("--dims", type=int, nargs="+", default=[32, 64, 128])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--sample", type=int, default=FIT_SAMPLE_SIZE)
+    args = parser.parse_args()
+
+    from chroma_utils import load_resume_snapshot, resume_projection_path
+    from embedding_versions import registry
+    from tenants import validate_tenant
+
+    tenant = validate_tenant(args.tenant)
+    version = registry.active_version()
+    path = resume_projection_path(tenant, version)
+    if args.command == "info":
+        projection = load_projection(path)
+        if projection is None:
+            print(f"No projection fitted for tenant {tenant}, version {version}.")
+        else:
+            print(
+                f"fit={projection.fit_id}\tversion={projection.embedding_version}\tdim={projection.dim}"
+                f"\texplained_variance={projection.explained_variance_ratio.sum():.3f}"
+                f"\tfitted_at={time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(projection.fitted_at))}"
+            )
+    else:
+        _, embeddings = load_resume_snapshot(tenant, version).live_rows()
+        if args.command == "fit":
+            projection = fit_projection(embeddings, args.dim, embedding_version=version, sample_size=args.sample)
+            projection.save(path)
+            print(
+                f"Fitted projection {projection.fit_id} to {projection.dim} dimensions "
+                f"({projection.explained_variance_ratio.sum():.3f} of the variance) on {len(embeddings)} resumes."
+            )
+        else:
+            sample = np.random.default_rng(0).choice(len(embeddings), size=min(args.queries, len(embeddings)), replace=False)
+            for row in projection_report(embeddings, embeddings[sample], dims=args.dims, k=args.k, sample_size=args.sample):
+                print(
+                    f"dim={row['dim']}\texplained={row['explained_variance']:.3f}\trecall@{args.k}={row['recall']:.3f}"
+                    f"\tmean={row['mean_ms']:.2f}ms\texact={row['exact_mean_ms']:.2f}ms"
+                )
@@ -0,0 +1,169 @@
+import os
+import time
+from database_integration import session, Candidate, Job
+from chroma_utils import (
+    get_resume_metadatas,
+    get_job_collection,
+    invalidate_job_matrix,
+    upsert_resume_batch,
+    delete_resumes_from_chroma,
+    rebuild_resume_snapshot,
+    rebuild_resume_ann_index,
+    RESUME_SNAPSHOT_ENABLED,
+    VECTOR_INDEX_BACKEND
+)
+from embedding_utils import generate_embeddings, resume_text_from_metadata
+from embedding_versions import registry, validate_version
+
+REEMBED_BATCH_SIZE = int(os.getenv("ATS_REEMBED_BATCH_SIZE", "256"))
+# Pause between batches so a running migration leaves CPU/GPU and Chroma
+# capacity for live traffic.
+REEMBED_THROTTLE_SECONDS = float(os.getenv("ATS_REEMBED_THROTTLE_SECONDS", "0.5"))
+
+
+def _iter_rows(model, after_id, batch_size):
+
+    # Keyset pagination on the primary key: stable while rows are added or
+    # deleted, and the last id seen is all that is needed to resume.
+    while True:
+        rows = (
+            session.query(model)
+            .filter(model.id > after_id)
+            .order_by(model.id)
+            .limit(batch_size)
+            .all()
+        )
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1].id
+
+
+def _reembed_candidates(rows, version, source_version):
+
+    written = 0
+    tenants = {}
+    for row in rows:
+        tenants.setdefault(row.tenant_id, []).append(row)
+    for tenant, tenant_rows in tenants.items():
+        metadatas = get_resume_metadatas([row.unique_id for row in tenant_rows], tenant=tenant, version=source_version)
+        # Rows without a stored resume (deleted meanwhile) are skipped.
+        tenant_rows = [row for row in tenant_rows if row.unique_id in metadatas]
+        if not tenant_rows:
+            continue
+        texts = [
+            row.embedding_text or resume_text_from_metadata(metadatas[row.unique_id] or {}) for row in tenant_rows
+        ]
+        upsert_resume_batch(
+            [row.unique_id for row in tenant_rows],
+            [list(map(float, embedding)) for embedding in generate_embeddings(texts, version=version)],
+            [metadatas[row.unique_id] for row in tenant_rows],
+            tenant=tenant,
+            version=version
+        )
+        # A resume deleted while its batch was being embedded is written back
+        # into the new version after the delete; drop whatever the source no
+        # longer has.
+        upserted = [row.unique_id for row in tenant_rows]
+        stored = get_resume_metadatas(upserted, tenant=tenant, version=source_version)
+        resurrected = [unique_id for unique_id in upserted if unique_id not in stored]
+        if resurrected:
+            delete_resumes_from_chroma(resurrected, tenant=tenant)
+        written += len(upserted) - len(resurrected)
+    return written
+
+
+def _reembed_jobs(rows, version, source_version):
+
+    tenants = {}
+    for row in rows:
+        tenants.setdefault(row.tenant_id, []).append(row)
+    for tenant, tenant_rows in tenants.items():
+        embeddings = generate_embeddings([row.description or "" for row in tenant_rows], version=version)
+        get_job_collection(tenant, version).upsert(
+            ids=[row.unique_id for row in tenant_rows],
+            embeddings=[list(map(float, embedding)) for embedding in embeddings],
+            metadatas=[{"title": row.title, "description": row.description} for row in tenant_rows]
+        )
+        invalidate_job_matrix(tenant, version)
+    return len(rows)
+
+
+def reembed(version, model_name, batch_size=REEMBED_BATCH_SIZE, throttle=REEMBED_THROTTLE_SECONDS):
+
+    """
+    Build embedding `version` with `model_name` from every stored candidate
+    and job, while the active version keeps serving reads.
+
+    New uploads are written to the version from the moment it is registered,
+    so only rows that existed before need to be re-embedded. Progress (the
+    last row id per table) is kept in the registry after each batch; running
+    the job again resumes there. When done, the version's ANN index and
+    snapshot are built and it is marked ready for `activate`.
+
+    Returns:
+        dict: The version's progress.
+    """
+
+    validate_version(version)
+    source_version = registry.active_version()
+    if version == source_version:
+        raise ValueError(f"Embedding version {version} is already active")
+    registry.register(version, model_name)
+    progress = registry.version_info(version).get("progress", {})
+
+    for table, model, reembed_rows in (
+        ("candidates", Candidate, _reembed_candidates),
+        ("jobs", Job, _reembed_jobs),
+    ):
+        last_id = progress.get(f"{table}_last_id", 0)
+        done = progress.get(f"{table}_done", 0)
+        if last_id == 0:
+            registry.update_progress(version, **{f"{table}_total": session.query(model).count()})
+        for rows in _iter_rows(model, last_id, batch_size):
+            done += reembed_rows(rows, version, source_version)
+            last_id = rows[-1].id
+            registry.update_progress(version, **{f"{table}_last_id": last_id, f"{table}_done": done})
+            session.expire_all()
+            if throttle:
+                time.sleep(throttle)
+
+    tenants = {tenant for (tenant,) in session.query(Candidate.tenant_id).distinct()}
+    for tenant in sorted(tenants):
+        if RESUME_SNAPSHOT_ENABLED:
+            rebuild_resume_snapshot(tenant, version)
+        if VECTOR_INDEX_BACKEND != "chroma":
+            rebuild_resume_ann_index(tenant, version)
+
+    registry.mark_ready(version)
+    return registry.version_info(version)["progress"]
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Re-embed stored resumes and jobs with a new embedding model.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Build (or resume building) a version.")
+    build.add_argument("version")
+    build.add_argument("model")
+    build.add_argument("--batch-size", type=int, default=REEMBED_BATCH_SIZE)
+    build.add_argument("--throttle", type=float, default=REEMBED_THROTTLE_SECONDS)
+    subparsers.add_parser("status", help="Show all versions and their progress.")
+    activate = subparsers.add_parser("activate", help="Switch reads to a ready version.")
+    activate.add_argument("version")
+    retire = subparsers.add_parser("retire", help="Stop writing to an inactive version.")
+    retire.add_argument("version")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(json.dumps(reembed(args.version, args.model, args.batch_size, args.throttle), indent=2))
+    elif args.command == "status":
+        print(json.dumps(registry.load(), indent=2, sort_keys=True))
+    elif args.command == "activate":
+        registry.activate(args.version)
+        print(f"Reads now use embedding version {args.version}.")
+    else:
+        registry.retire(args.version)
+        print(f"Embedding version {args.version} retired.")
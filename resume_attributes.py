@@ -0,0 +1,127 @@
+import re
+import time
+
+# Ordered levels, so filters are simple range predicates ("senior or above").
+SENIORITY_LEVELS = {"intern": 0, "junior": 1, "mid": 2, "senior": 3, "lead": 4, "executive": 5}
+DEGREE_LEVELS = {"associate": 1, "bachelor": 2, "master": 3, "doctorate": 4}
+
+MAX_YEARS = 50
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_MONTH = r"(?:(jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s+)?"
+_DATE_RANGE = re.compile(
+    _MONTH + r"((?:19|20)\d{2})\s*(?:-|–|—|to)\s*(?:" + _MONTH + r"((?:19|20)\d{2})|(present|current|now|today))",
+    re.IGNORECASE
+)
+_YEARS_PHRASE = re.compile(r"\b(\d{1,2}(?:\.\d)?)\s*\+?\s*(?:years?|yrs?)\b", re.IGNORECASE)
+
+# Checked from the highest level down; the first match wins.
+_SENIORITY_PATTERNS = [
+    ("executive", r"\b(?:cto|ceo|cio|vp|vice president|director|head of)(?!\w)"),
+    ("lead", r"\b(?:lead|principal|staff|architect|team lead|tech lead)(?!\w)"),
+    ("senior", r"\b(?:senior|sr\.?)(?!\w)"),
+    ("mid", r"\b(?:mid[- ]level|middle|intermediate)(?!\w)"),
+    ("junior", r"\b(?:junior|jr\.?|entry[- ]level|graduate)(?!\w)"),
+    ("intern", r"\b(?:intern|internship|trainee)(?!\w)"),
+]
+_DEGREE_PATTERNS = [
+    ("doctorate", r"\b(?:ph\.?\s?d|doctorate|doctor of|dphil)(?!\w)"),
+    ("master", r"\b(?:master'?s?|msc|m\.sc|mba|meng|m\.eng|m\.\s?a\.|m\.\s?s\.|(?:ms|ma)\s+in)(?!\w)"),
+    ("bachelor", r"\b(?:bachelor'?s?|bsc|b\.sc|beng|b\.eng|b\.\s?a\.|b\.\s?s\.|(?:bs|ba)\s+in)(?!\w)"),
+    ("associate", r"\b(?:associate degree|associate of|diploma)(?!\w)"),
+]
+
+
+def _month_index(year, month):
+
+    return int(year) * 12 + (_MONTHS[month[:3].lower()] if month else 1) - 1
+
+
+def years_of_experience(experience):
+
+    """
+    Total years of experience in a free-text experience section: the union
+    of its date ranges ("Jan 2018 - Present", "2015 – 2019"), or an explicit
+    "5+ years" if that is larger.
+
+    Returns:
+        float: Years rounded to one decimal, or None if nothing was found.
+    """
+
+    if not experience:
+        return None
+    now = time.gmtime()
+    current = now.tm_year * 12 + now.tm_mon - 1
+    intervals = []
+    for start_month, start_year, end_month, end_year, ongoing in _DATE_RANGE.findall(experience):
+        start = _month_index(start_year, start_month)
+        end = current if ongoing else _month_index(end_year, end_month) + (0 if end_month else 11)
+        if start <= end <= current:
+            intervals.append((start, end + 1))
+
+    months = 0
+    covered_until = None
+    for start, end in sorted(intervals):
+        if covered_until is not None and start < covered_until:
+            start = covered_until
+        if end > start:
+            months += end - start
+            covered_until = end
+    stated = [float(years) for years in _YEARS_PHRASE.findall(experience) if float(years) <= MAX_YEARS]
+
+    if not intervals and not stated:
+        return None
+    return round(min(max([months / 12] + stated), MAX_YEARS), 1)
+
+
+def _first_level(text, patterns, levels):
+
+    for name, pattern in patterns:
+        if re.search(pattern, text, re.IGNORECASE):
+            return levels[name]
+    return None
+
+
+def seniority_level(experience, years=None):
+
+    """Seniority from job titles in the text, else estimated from the years of experience."""
+
+    level = _first_level(experience or "", _SENIORITY_PATTERNS, SENIORITY_LEVELS)
+    if level is not None or years is None:
+        return level
+    if years < 2:
+        return SENIORITY_LEVELS["junior"]
+    if years < 5:
+        return SENIORITY_LEVELS["mid"]
+    if years < 8:
+        return SENIORITY_LEVELS["senior"]
+    return SENIORITY_LEVELS["lead"]
+
+
+def degree_level(education):
+
+    """Level of the highest degree mentioned in the education section."""
+
+    return _first_level(education or "", _DEGREE_PATTERNS, DEGREE_LEVELS)
+
+
+def derive_attributes(experience, education):
+
+    """
+    Numeric attributes of a resume used by range filters.
+
+    Returns:
+        dict: `years_experience`, `seniority_level`, `degree_level`; None when unknown.
+    """
+
+    experience = experience if isinstance(experience, str) else " ".join(experience or [])
+    education = education if isinstance(education, str) else " ".join(education or [])
+    years = years_of_experience(experience)
+    return {
+        "years_experience": years,
+        "seniority_level": seniority_level(experience, years),
+        "degree_level": degree_level(education),
+    }
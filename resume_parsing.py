@@ -1,8 +1,17 @@
 import io
 import os
+import json
+import hashlib
 import tempfile
-from embedding_utils import generate_embedding
-from chroma_utils import add_to_resume_chroma
+from embedding_utils import generate_embedding, resume_embedding_text, resume_text_from_metadata
+from embedding_versions import registry as embedding_registry
+from chroma_utils import add_to_resume_chroma, update_resume_in_chroma, get_resume_metadatas, PERSIST_DIRECTORY
+from local_cache import SqliteCache
+from dedup import find_near_duplicate, DEDUP_POLICY, IDENTITY_FIELDS
+from resume_attributes import derive_attributes
+from local_extraction import extract_resume_locally, LOCAL_EXTRACTION_ENABLED, LOCAL_EXTRACTION_MIN_CONFIDENCE
+from outbox import record_merge
+from tenants import DEFAULT_TENANT
 from llama_cloud_services import LlamaExtract
 from pydantic import BaseModel, Field
 
@@ -13,29 +22,82 @@ class ResumeSchema(BaseModel):
     education: str = Field(description="Educational background")
     skills: list[str] = Field(description="Technical and soft skills")
 
+# Changing ResumeSchema changes the version, so cached extractions made for
+# an older schema are never reused.
+SCHEMA_VERSION = hashlib.sha256(
+    json.dumps(ResumeSchema.model_json_schema(), sort_keys=True).encode("utf-8")
+).hexdigest()[:12]
+
+EXTRACTION_CACHE_ENABLED = os.getenv("ATS_EXTRACTION_CACHE", "1") == "1"
+extraction_cache = SqliteCache(
+    os.getenv("ATS_EXTRACTION_CACHE_PATH", os.path.join(PERSIST_DIRECTORY, "extraction_cache.sqlite3")),
+    ttl_seconds=float(os.getenv("ATS_EXTRACTION_CACHE_TTL_DAYS", "30")) * 24 * 3600,
+    max_entries=int(os.getenv("ATS_EXTRACTION_CACHE_MAX_ENTRIES", "100000"))
+)
+
 llama_extract = LlamaExtract()
 #agent = llama_extract.create_agent(name="resume_parser", data_schema=ResumeSchema)
 agent = llama_extract.get_agent(name="resume_parser")
 
 
-def parse_resume_with_llm(resume_content, name, location, file_type):
-    
+def extract_resume_data(resume_path, file_type, content_hash=None):
+
+    # Extraction results are cached by file content hash and schema version,
+    # so retries and re-imports of the same file never extract twice.
+    cache_key = f"{content_hash}:{SCHEMA_VERSION}" if content_hash and EXTRACTION_CACHE_ENABLED else None
+    if cache_key:
+        cached = extraction_cache.get(cache_key)
+        if cached:
+            return cached
+
+    extracted_data = None
+    if LOCAL_EXTRACTION_ENABLED:
+        # Text-based files are parsed locally; scanned or unusual
+        # layouts (low confidence) fall back to LlamaExtract.
+        local_data, confidence = extract_resume_locally(resume_path, file_type)
+        if confidence >= LOCAL_EXTRACTION_MIN_CONFIDENCE:
+            extracted_data = ResumeSchema(**local_data).model_dump()
+    if extracted_data is None:
+        extracted_run = agent.extract(resume_path)
+        extracted_data = extracted_run.data  # Access the 'data' attribute
+
+    if cache_key and extracted_data:
+        extraction_cache.set(cache_key, extracted_data)
+    return extracted_data
+
+def parse_resume_with_llm(resume_content, name, location, file_type, tenant=DEFAULT_TENANT, content_hash=None, unique_id=None,
+                          outbox_entry=None):
+
+    # resume_content is either the file's bytes or the path of an upload that
+    # has already been spooled to disk; a path is handed to the extractor as
+    # is and stays owned by the caller, who also passes its content_hash.
+    # unique_id is the id the caller journaled the upload under, if any, and
+    # outbox_entry its entry; a merge re-journals it under the existing
+    # candidate before that candidate's vector is overwritten.
     try:
         if file_type not in ["pdf", "docx"]:
             raise ValueError("Unsupported file type. Only PDF and DOCX files are allowed.")
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_type}") as temp_file:
-            temp_file.write(resume_content)
-            temp_file_path = temp_file.name 
+        if content_hash is None and isinstance(resume_content, bytes):
+            content_hash = hashlib.sha256(resume_content).hexdigest()
+
+        if isinstance(resume_content, (str, os.PathLike)):
+            temp_file_path = os.fspath(resume_content)
+            owns_file = False
+        else:
+            with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file_type}") as temp_file:
+                temp_file.write(resume_content)
+                temp_file_path = temp_file.name 
+            owns_file = True
 
         try:
-            extracted_run = agent.extract(temp_file_path)
-            extracted_data = extracted_run.data  # Access the 'data' attribute
+            extracted_data = extract_resume_data(temp_file_path, file_type, content_hash)
         except Exception as e:
             raise RuntimeError(f"LlamaExtract failed: {str(e)}")
 
         finally:
-            os.remove(temp_file_path)
+            if owns_file:
+                os.remove(temp_file_path)
 
         if not extracted_data:
             raise ValueError("No data extracted from the resume.")
@@ -45,13 +107,12 @@ def parse_resume_with_llm(resume_content, name, location, file_type):
         education = extracted_data.get("education", "")
         skills = extracted_data.get("skills", [])
 
-        combined_text_for_embedding = (
-            f"Experience: {experience} "
-            f"Education: {education} "
-            f"Skills: {skills}"
-        )
+        combined_text_for_embedding = resume_embedding_text(experience, education, skills)
 
-        embedding = generate_embedding(combined_text_for_embedding)
+        # One embedding version per upload: the duplicate check and the write
+        # use the same model even if the active version switches meanwhile.
+        version = embedding_registry.active_version()
+        embedding = generate_embedding(combined_text_for_embedding, version=version)
 
         metadata = {
             "name": name,
@@ -60,10 +121,53 @@ def parse_resume_with_llm(resume_content, name, location, file_type):
             "education": education,
             "skills": skills,
         }
-
-        unique_id = add_to_resume_chroma(embedding, metadata)
+        attributes = derive_attributes(experience, education)
+        # Returned with the result so the caller stores the same fields in
+        # PostgreSQL (candidate row, skill index) as went into Chroma.
+        extracted_fields = {
+            "experience": experience,
+            "education": education,
+            "skills": skills,
+            "embedding_text": combined_text_for_embedding,
+        }
+        # Chroma metadata cannot hold None, so unknown attributes are left out.
+        metadata.update({field: value for field, value in attributes.items() if value is not None})
+
+        duplicate_of = None
+        if DEDUP_POLICY != "allow":
+            duplicate_of = find_near_duplicate(
+                embedding, combined_text_for_embedding, tenant=tenant, text_of=resume_text_from_metadata,
+                version=version
+            )
+
+        if duplicate_of and DEDUP_POLICY == "reject":
+            return {"error": "Resume is a duplicate of an existing candidate.", "duplicate_of": duplicate_of}, None
+        if duplicate_of:
+            existing = get_resume_metadatas([duplicate_of], tenant=tenant, version=version).get(duplicate_of) or {}
+            metadata.update({field: existing[field] for field in IDENTITY_FIELDS if existing.get(field)})
+            if outbox_entry is not None:
+                record_merge(outbox_entry, duplicate_of)
+            update_resume_in_chroma(
+                duplicate_of, embedding, metadata, tenant=tenant, text=combined_text_for_embedding, version=version
+            )
+            return {
+                "message": "Resume merged into existing candidate",
+                "unique_id": duplicate_of,
+                "duplicate_of": duplicate_of,
+                **extracted_fields,
+                **attributes
+            }, embedding
+
+        unique_id = add_to_resume_chroma(
+            embedding, metadata, tenant=tenant, text=combined_text_for_embedding, version=version, unique_id=unique_id
+        )
         
-        return {"message": "Resume parsed successfully", "unique_id": unique_id}, embedding
+        return {
+            "message": "Resume parsed successfully",
+            "unique_id": unique_id,
+            **extracted_fields,
+            **attributes
+        }, embedding
     except Exception as e:
         return {"error": f"Failed to parse resume: {str(e)}"}, None
     
@@ -0,0 +1,199 @@
+import gzip
+import json
+import os
+import time
+
+import numpy as np
+import orjson
+from fastapi.encoders import jsonable_encoder
+from starlette.responses import Response
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Large match/search bodies are compressed when the client accepts it
+# (brotli if installed, else gzip); small ones are not worth the CPU.
+COMPRESSION_ENABLED = os.getenv("ATS_RESPONSE_COMPRESSION", "0") == "1"
+COMPRESS_MIN_BYTES = int(os.getenv("ATS_RESPONSE_COMPRESS_MIN_BYTES", "4096"))
+GZIP_LEVEL = int(os.getenv("ATS_RESPONSE_GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.getenv("ATS_RESPONSE_BROTLI_QUALITY", "4"))
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value):
+
+    # Types orjson/msgpack do not handle themselves, e.g. NumPy scalars for
+    # msgpack or non-contiguous arrays.
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Type is not serializable: {type(value).__name__}")
+
+
+def dumps_json(content):
+
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+def dumps_msgpack(content):
+
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed; install it to serve MessagePack responses.")
+    return msgpack.packb(content, default=_default, use_bin_type=True)
+
+
+class NumpyJSONResponse(Response):
+
+    """JSON response rendered by orjson, with NumPy arrays and scalars serialized natively."""
+
+    media_type = "application/json"
+
+    def render(self, content):
+        return dumps_json(content)
+
+
+def _accepts_msgpack(accept):
+
+    return msgpack is not None and any(media_type in accept for media_type in MSGPACK_MEDIA_TYPES)
+
+
+def _accepted_encodings(accept_encoding):
+
+    encodings = set()
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+def compress(body, accept_encoding):
+
+    """
+    Compresses `body` with the best encoding the client accepts.
+
+    Returns:
+        tuple: `(body, content_encoding)`; the encoding is None if the body was left as is.
+    """
+
+    if not COMPRESSION_ENABLED or len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    encodings = _accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in encodings:
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if "gzip" in encodings:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+    return body, None
+
+
+def negotiated_response(request, content, status_code=200):
+
+    """
+    Serializes a match/search result without FastAPI's `jsonable_encoder`:
+    MessagePack for clients sending `Accept: application/msgpack` (when
+    msgpack is installed), orjson otherwise, compressed for large bodies.
+    """
+
+    if _accepts_msgpack(request.headers.get("accept", "")):
+        body, media_type = dumps_msgpack(content), MSGPACK_MEDIA_TYPES[0]
+    else:
+        body, media_type = dumps_json(content), NumpyJSONResponse.media_type
+    body, encoding = compress(body, request.headers.get("accept-encoding", ""))
+
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, status_code=status_code, media_type=media_type, headers=headers)
+
+
+def sample_match_response(jobs=1000, candidates=10, dim=0, seed=0):
+
+    """A `/match-candidates/` shaped payload with NumPy scores, for benchmarks."""
+
+    rng = np.random.default_rng(seed)
+    return {
+        "results": [
+            {
+                "job_id": f"job-{job}",
+                "job_title": f"Backend Engineer {job}",
+                "job_description": "Build and operate Python services on PostgreSQL and Kafka. " * 4,
+                "matched_candidates": [
+                    {
+                        "candidate_id": f"resume-{job}-{candidate}",
+                        "score": np.float32(rng.random()),
+                        "metadata": {
+                            "name": f"Candidate {candidate}",
+                            "location": "Baku",
+                            "experience": "Senior Software Engineer, Jan 2018 - Present. " * 3,
+                            "education": "MSc Computer Science",
+                            "skills": "python, sql, kafka, docker",
+                            "years_experience": 7.5,
+                            **({"embedding": rng.random(dim, dtype=np.float32)} if dim else {}),
+                        },
+                    }
+                    for candidate in range(candidates)
+                ],
+            }
+            for job in range(jobs)
+        ]
+    }
+
+
+def benchmark(content, repeat=5):
+
+    """
+    Times the serializers on `content`: FastAPI's default path
+    (`jsonable_encoder` + `json.dumps`) against orjson and MessagePack, and
+    the compressed sizes.
+
+    Returns:
+        list[dict]: One row per serializer with the best time in milliseconds and the body size in bytes.
+    """
+
+    def default_json(payload):
+        return json.dumps(jsonable_encoder(payload, custom_encoder={np.generic: lambda value: value.item()})).encode("utf-8")
+
+    serializers = [("jsonable_encoder+json", default_json), ("orjson", dumps_json)]
+    if msgpack is not None:
+        serializers.append(("msgpack", dumps_msgpack))
+
+    report = []
+    for name, serializer in serializers:
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = serializer(content)
+            timings.append((time.perf_counter() - start) * 1000)
+        row = {"serializer": name, "ms": min(timings), "bytes": len(body)}
+        row["gzip_bytes"] = len(gzip.compress(body, compresslevel=GZIP_LEVEL))
+        if brotli is not None:
+            row["brotli_bytes"] = len(brotli.compress(body, quality=BROTLI_QUALITY))
+        report.append(row)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark response serialization on a synthetic match response.")
+    parser.add_argument("--jobs", type=int, default=1000)
+    parser.add_argument("--candidates", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    for row in benchmark(sample_match_response(args.jobs, args.candidates), repeat=args.repeat):
+        sizes = "\t".join(f"{key}={value}" for key, value in row.items() if key.endswith("bytes"))
+        print(f"{row['serializer']}\t{row['ms']:.1f}ms\t{sizes}")
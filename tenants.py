@@ -0,0 +1,36 @@
+import re
+
+DEFAULT_TENANT = "default"
+
+# Tenant ids become part of Chroma collection names and directory names, so
+# they are limited to a short, lowercase, filesystem-safe alphabet (short
+# enough that version and shard suffixes fit Chroma's 63 character limit).
+TENANT_ID_PATTERN = re.compile(r"^[a-z0-9](?:[a-z0-9_-]{0,22}[a-z0-9])?$")
+
+
+def validate_tenant(tenant):
+
+    """
+    Check a tenant id and return it unchanged.
+
+    Raises:
+        ValueError: If the id is not 1-24 characters of [a-z0-9_-] starting
+            and ending with a letter or digit.
+    """
+
+    if not isinstance(tenant, str) or not TENANT_ID_PATTERN.match(tenant):
+        raise ValueError(f"Invalid tenant id: {tenant!r}")
+    return tenant
+
+
+def tenant_collection_name(name, tenant):
+
+    """
+    Name of a per-tenant Chroma collection. The default tenant keeps the
+    original collection names so existing deployments need no migration.
+    """
+
+    validate_tenant(tenant)
+    if tenant == DEFAULT_TENANT:
+        return name
+    return f"{name}__{tenant}"
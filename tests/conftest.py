@@ -0,0 +1,32 @@
+import pytest
+from contextlib import ExitStack
+from unittest.mock import patch
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database_integration import Base
+
+
+@pytest.fixture
+def make_session():
+    """Factory of sessions on new SQLite databases with the full schema."""
+    def make_session(path):
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(engine)
+        return sessionmaker(bind=engine)()
+    return make_session
+
+
+@pytest.fixture
+def session_modules():
+    """Modules besides database_integration whose session db_session replaces; override it per test module."""
+    return []
+
+
+@pytest.fixture
+def db_session(tmp_path, make_session, session_modules):
+    """Session on an empty database used by database_integration and the session_modules."""
+    db_session = make_session(tmp_path / "ats.db")
+    with ExitStack() as stack:
+        for module in ["database_integration", *session_modules]:
+            stack.enter_context(patch(f"{module}.session", db_session))
+        yield db_session
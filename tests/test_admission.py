@@ -0,0 +1,108 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from unittest.mock import patch
+from admission import AdmissionLimiter, AdmissionMiddleware, Rejected, parse_limits, limiter_for
+
+
+def test_parse_limits():
+    """Test parsing limit overrides, with the queue timeout optional."""
+    assert parse_limits("/upload-resume/=4:8:10, /match-candidates/=2:0") == {
+        "/upload-resume/": (4, 8, 10.0),
+        "/match-candidates/": (2, 0, 5.0),
+    }
+    assert parse_limits("") == {}
+    with pytest.raises(ValueError):
+        parse_limits("/upload-resume/=0:8")
+    with pytest.raises(ValueError):
+        parse_limits("upload-resume=4:8")
+
+
+def test_limiter_queues_then_rejects_when_full():
+    """Test that requests beyond the limit wait in order, and are rejected with 429 once the queue is full."""
+
+    async def scenario():
+        limiter = AdmissionLimiter(max_concurrent=1, max_queued=1, queue_timeout=1.0)
+        await limiter.acquire()
+        waiting = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.queued == 1
+
+        with pytest.raises(Rejected) as rejected:
+            await limiter.acquire()
+        assert rejected.value.status_code == 429
+
+        limiter.release()
+        await waiting
+        assert limiter.active == 1 and limiter.queued == 0
+        limiter.release()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 0
+    assert stats["admitted"] == 2
+    assert stats["queued_total"] == 1
+    assert stats["rejected"] == 1
+
+
+def test_limiter_times_out_waiting_requests():
+    """Test that a request waiting longer than the queue timeout is rejected with 503."""
+
+    async def scenario():
+        limiter = AdmissionLimiter(max_concurrent=1, max_queued=4, queue_timeout=0.01)
+        await limiter.acquire()
+        with pytest.raises(Rejected) as rejected:
+            await limiter.acquire()
+        assert rejected.value.status_code == 503
+        limiter.release()
+        await limiter.acquire()
+        return limiter.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["timed_out"] == 1
+    assert stats["queued"] == 0
+    assert stats["active"] == 1
+
+
+def test_limiter_for_matches_longest_prefix():
+    """Test that path parameters fall under their endpoint's limit and unlisted endpoints are unlimited."""
+    limiters = {"/match-jobs/": AdmissionLimiter(1, 1, 1.0), "/match-candidates/": AdmissionLimiter(1, 1, 1.0)}
+
+    with patch('admission.limiters', limiters):
+        assert limiter_for("/match-jobs/r-1") is limiters["/match-jobs/"]
+        assert limiter_for("/match-candidates/") is limiters["/match-candidates/"]
+        assert limiter_for("/get-resume-data/") is None
+
+
+def test_middleware_sheds_saturated_endpoint_only():
+    """Test that a saturated endpoint answers 429 with Retry-After while other endpoints are served."""
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, enabled=True)
+
+    @app.get("/match-candidates/")
+    def match():
+        return {"ok": True}
+
+    @app.get("/get-resume-data/")
+    def read():
+        return {"ok": True}
+
+    saturated = AdmissionLimiter(max_concurrent=1, max_queued=0, queue_timeout=1.0)
+    saturated.active = 1
+
+    with patch('admission.limiters', {"/match-candidates/": saturated}):
+        client = TestClient(app)
+        response = client.get("/match-candidates/")
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "2"
+        assert client.get("/get-resume-data/").status_code == 200
+
+        saturated.active = 0
+        assert client.get("/match-candidates/").status_code == 200
+        assert saturated.active == 0
+        assert saturated.rejected == 1
+
+
+if __name__ == "__main__":
+    pytest.main()
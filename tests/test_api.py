@@ -1,8 +1,16 @@
 import pytest
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import tracemalloc
+from fastapi import HTTPException, UploadFile
 from fastapi.testclient import TestClient
 from unittest.mock import patch, MagicMock
 import numpy as np
-from api import app
+from database_integration import find_candidate_ids
+from api import app, spool_upload, run_off_loop
 
 
 @pytest.fixture
@@ -43,6 +51,293 @@ def test_upload_resume_success(mock_save_candidate, mock_parse_resume, client):
     mock_parse_resume.assert_called_once()
 
 
+@patch('api.parse_resume_with_llm')
+@patch('api.find_candidate_by_hash')
+def test_upload_resume_exact_duplicate_skips_extraction(mock_find, mock_parse_resume, client):
+    """Test that re-uploading the same file returns the existing candidate without extraction."""
+    mock_find.return_value = MagicMock(unique_id="existing-id")
+
+    response = client.post(
+        "/upload-resume/",
+        params={"name": "John Doe", "location": "New York"},
+        files={"file": ("test.pdf", b"%PDF-1.4 same bytes", "application/pdf")}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["parsed_data"]["unique_id"] == "existing-id"
+    mock_parse_resume.assert_not_called()
+
+
+@patch('api.parse_resume_with_llm')
+@patch('api.find_candidate_by_hash')
+@patch('api.record_write')
+def test_upload_resume_exact_duplicate_rejected(mock_record_write, mock_find, mock_parse_resume, client):
+    """Test that under the reject policy an exact re-upload answers 409 like a near duplicate."""
+    mock_find.return_value = MagicMock(unique_id="existing-id")
+
+    with patch('api.DEDUP_POLICY', 'reject'):
+        response = client.post(
+            "/upload-resume/",
+            params={"name": "John Doe", "location": "New York"},
+            files={"file": ("test.pdf", b"%PDF-1.4 same bytes", "application/pdf")}
+        )
+
+    assert response.status_code == 409
+    assert "existing-id" in response.json()["message"]
+    mock_parse_resume.assert_not_called()
+    mock_record_write.assert_not_called()
+
+
+@patch('api.parse_resume_with_llm')
+@patch('api.find_candidate_by_hash', return_value=None)
+@patch('api.save_candidate')
+def test_upload_resume_near_duplicate_rejected(mock_save_candidate, mock_find, mock_parse_resume, client):
+    """Test that a rejected near-duplicate answers 409 and stores nothing."""
+    mock_parse_resume.return_value = ({"error": "duplicate", "duplicate_of": "existing-id"}, None)
+
+    response = client.post(
+        "/upload-resume/",
+        params={"name": "John Doe", "location": "New York"},
+        files={"file": ("test.pdf", b"%PDF-1.4 new bytes", "application/pdf")}
+    )
+
+    assert response.status_code == 409
+    mock_save_candidate.assert_not_called()
+
+
+@patch('api.parse_resume_with_llm')
+@patch('api.find_candidate_by_hash', return_value=None)
+@patch('api.save_candidate')
+@patch('api.update_candidate')
+def test_upload_resume_near_duplicate_merged(mock_update_candidate, mock_save_candidate, mock_find, mock_parse_resume, client):
+    """Test that a merged near-duplicate updates the existing candidate row."""
+    mock_parse_resume.return_value = ({"unique_id": "existing-id", "duplicate_of": "existing-id"}, [0.1])
+
+    response = client.post(
+        "/upload-resume/",
+        params={"name": "John Doe", "location": "New York"},
+        files={"file": ("test.pdf", b"%PDF-1.4 new bytes", "application/pdf")}
+    )
+
+    assert response.status_code == 200
+    mock_save_candidate.assert_not_called()
+    assert mock_update_candidate.call_args.args[1] == "existing-id"
+    assert len(mock_update_candidate.call_args.args[0]["content_hash"]) == 64
+    assert "name" not in mock_update_candidate.call_args.args[0]
+    assert "location" not in mock_update_candidate.call_args.args[0]
+
+
+@patch('api.parse_resume_with_llm')
+@patch('api.find_candidate_by_hash', return_value=None)
+@patch('api.save_candidate')
+@patch('api.update_candidate', return_value=False)
+@patch('api.record_write')
+def test_upload_resume_merge_into_deleted_candidate_saves_row(mock_record_write, mock_update_candidate,
+                                                             mock_save_candidate, mock_find, mock_parse_resume, client):
+    """Test that a merge whose target row is gone stores the resume as a row and completes the journal entry."""
+    mock_parse_resume.return_value = ({"unique_id": "existing-id", "duplicate_of": "existing-id"}, [0.1])
+
+    response = client.post(
+        "/upload-resume/",
+        params={"name": "John Doe", "location": "New York"},
+        files={"file": ("test.pdf", b"%PDF-1.4 new bytes", "application/pdf")}
+    )
+
+    assert response.status_code == 200
+    mock_update_candidate.assert_called_once()
+    assert mock_save_candidate.call_args.args[1] == "existing-id"
+    assert mock_save_candidate.call_args.kwargs["outbox_entry"] is mock_record_write.return_value
+
+
+@patch('api.parse_resume_with_llm')
+@patch('api.find_candidate_by_hash', return_value=None)
+@patch('api.save_candidate')
+@patch('api.record_write')
+def test_upload_resume_is_journaled(mock_record_write, mock_save_candidate, mock_find, mock_parse_resume, client):
+    """Test that the upload is journaled under the id it is stored with, and completed with the row."""
+    mock_parse_resume.side_effect = lambda *args, **kwargs: ({"unique_id": kwargs["unique_id"]}, [0.1])
+
+    response = client.post(
+        "/upload-resume/",
+        params={"name": "John Doe", "location": "New York"},
+        files={"file": ("test.pdf", b"%PDF-1.4 new bytes", "application/pdf")}
+    )
+
+    assert response.status_code == 200
+    operation, unique_id = mock_record_write.call_args.args
+    assert operation == "resume_save"
+    assert mock_parse_resume.call_args.kwargs["unique_id"] == unique_id
+    assert mock_save_candidate.call_args.args[1] == unique_id
+    assert mock_save_candidate.call_args.kwargs["outbox_entry"] is mock_record_write.return_value
+
+
+@patch('api.parse_resume_with_llm')
+@patch('api.find_candidate_by_hash', return_value=None)
+@patch('api.save_candidate')
+@patch('api.record_write')
+@patch('api.abort_write')
+def test_upload_resume_failure_is_rolled_back(mock_abort_write, mock_record_write, mock_save_candidate, mock_find,
+                                              mock_parse_resume, client):
+    """Test that a failed parse undoes the journaled upload and stores no row."""
+    mock_parse_resume.return_value = ({"error": "Failed to parse resume: Chroma unavailable"}, None)
+
+    response = client.post(
+        "/upload-resume/",
+        params={"name": "John Doe", "location": "New York"},
+        files={"file": ("test.pdf", b"%PDF-1.4 new bytes", "application/pdf")}
+    )
+
+    assert response.status_code == 500
+    mock_abort_write.assert_called_once_with(mock_record_write.return_value)
+    mock_save_candidate.assert_not_called()
+
+
+def test_run_off_loop_releases_the_worker_threads_session():
+    """Test that thread-pool work runs off the calling thread and closes that thread's session."""
+    released = []
+    with patch('api.release_session', side_effect=lambda: released.append(threading.get_ident())):
+        worker = asyncio.run(run_off_loop(threading.get_ident))
+
+    assert worker != threading.get_ident()
+    assert released == [worker]
+
+
+def test_cheap_read_served_while_search_is_embedding():
+    """Test that a record read completes while a search on the same worker is blocked in query embedding."""
+    started, release = threading.Event(), threading.Event()
+    read = {}
+
+    def slow_embedding(*args, **kwargs):
+        started.set()
+        release.wait(10)
+        return np.ones(3)
+
+    with patch('api.generate_query_embedding', side_effect=slow_embedding), \
+         patch('api.calculate_ats_score', return_value=[]), \
+         patch('api.fetch_candidate_records', return_value={"r1": {"name": "John"}}), \
+         TestClient(app) as client:
+        search = threading.Thread(target=lambda: client.get("/search-candidates/", params={"query": "python"}))
+        search.start()
+        try:
+            assert started.wait(10)
+            reader = threading.Thread(
+                target=lambda: read.update(response=client.get("/get-resume-data/", params={"unique_id": "r1"}))
+            )
+            reader.start()
+            reader.join(5)
+            assert not release.is_set() and "response" in read
+        finally:
+            release.set()
+            search.join(10)
+
+    assert read["response"].json() == {"name": "John"}
+
+
+def _upload(data, size=None):
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    spooled.write(data)
+    spooled.seek(0)
+    return UploadFile(file=spooled, size=size, filename="resume.pdf")
+
+
+def test_spool_upload_streams_with_bounded_memory(tmp_path, monkeypatch):
+    """Test that a 4 MB upload is hashed and spooled to disk holding only one chunk at a time."""
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    data = os.urandom(4 * 1024 * 1024)
+    upload = _upload(data)
+
+    tracemalloc.start()
+    try:
+        path, digest, size = asyncio.run(spool_upload(upload, suffix=".pdf"))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert peak < 512 * 1024
+    assert size == len(data)
+    assert digest == hashlib.sha256(data).hexdigest()
+    with open(path, "rb") as spooled:
+        assert spooled.read() == data
+    os.remove(path)
+
+
+def test_spool_upload_rejects_declared_oversize_without_reading():
+    """Test that an upload whose declared size is too large is rejected before it is read."""
+    upload = MagicMock(size=6 * 1024 * 1024)
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(spool_upload(upload, suffix=".pdf"))
+
+    assert error.value.status_code == 400
+    upload.read.assert_not_called()
+
+
+def test_spool_upload_rejects_oversize_stream_and_cleans_up(tmp_path, monkeypatch):
+    """Test that an undeclared oversize upload stops at the limit and leaves no spool file."""
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    upload = _upload(b"x" * 1000)
+
+    with pytest.raises(HTTPException):
+        asyncio.run(spool_upload(upload, suffix=".pdf", max_size=100))
+
+    assert os.listdir(tmp_path) == []
+
+
+@patch('api.parse_resume_with_llm')
+@patch('api.find_candidate_by_hash', return_value=None)
+@patch('api.save_candidate')
+def test_upload_resume_hands_spooled_path_to_parser(mock_save_candidate, mock_find, mock_parse_resume, client):
+    """Test that the parser receives the spooled file path, which is removed afterwards."""
+    seen = {}
+
+    def parse(path, *args, **kwargs):
+        with open(path, "rb") as spooled:
+            seen["content"] = spooled.read()
+        seen["path"] = path
+        return {"unique_id": "new-id"}, [0.1]
+
+    mock_parse_resume.side_effect = parse
+
+    response = client.post(
+        "/upload-resume/",
+        params={"name": "John Doe", "location": "New York"},
+        files={"file": ("test.pdf", b"%PDF-1.4 streamed", "application/pdf")}
+    )
+
+    assert response.status_code == 200
+    assert seen["content"] == b"%PDF-1.4 streamed"
+    assert not os.path.exists(seen["path"])
+    assert mock_find.call_args.args[0] == hashlib.sha256(b"%PDF-1.4 streamed").hexdigest()
+
+
+@pytest.mark.parametrize("session_modules", [["outbox"]])
+def test_upload_resume_indexes_extracted_skills(db_session, client):
+    """Test that an uploaded resume is stored with its extracted skills and found by the skill filter."""
+    extracted = MagicMock(data={
+        "experience": "5 years in software development",
+        "education": "BSc Computer Science",
+        "skills": ["Python", "SQL"]
+    })
+    with patch('resume_parsing.EXTRACTION_CACHE_ENABLED', False), \
+         patch('resume_parsing.LOCAL_EXTRACTION_ENABLED', False), \
+         patch('resume_parsing.agent') as mock_agent, \
+         patch('resume_parsing.generate_embedding', return_value=[0.1, 0.2, 0.3]), \
+         patch('resume_parsing.find_near_duplicate', return_value=None), \
+         patch('resume_parsing.add_to_resume_chroma', side_effect=lambda *args, **kwargs: kwargs["unique_id"]):
+        mock_agent.extract.return_value = extracted
+
+        response = client.post(
+            "/upload-resume/",
+            params={"name": "John Doe", "location": "New York"},
+            files={"file": ("test.pdf", b"%PDF-1.4 skills", "application/pdf")}
+        )
+
+        assert response.status_code == 200
+        unique_id = response.json()["parsed_data"]["unique_id"]
+        assert find_candidate_ids(skills=["python"]) == [unique_id]
+        assert find_candidate_ids(skills=["python", "java"]) == []
+
+
 def test_upload_resume_missing_name(client):
     """Test resume upload with missing name."""
     pdf_content = b"%PDF-1.4 test pdf content"
@@ -147,7 +442,7 @@ def test_delete_resume_success(mock_delete_candidate, mock_delete_from_chroma, c
 
     assert response.status_code == 200
     assert response.json()["message"] == "Resume deleted successfully"
-    mock_delete_from_chroma.assert_called_once_with("test-id")
+    mock_delete_from_chroma.assert_called_once_with("test-id", tenant="default")
 
 
 @patch('api.delete_job_from_chroma')
@@ -160,7 +455,198 @@ def test_delete_job_success(mock_delete_job, mock_delete_from_chroma, client):
 
     assert response.status_code == 200
     assert response.json()["message"] == "Job deleted successfully"
-    mock_delete_from_chroma.assert_called_once_with("test-id")
+    mock_delete_from_chroma.assert_called_once_with("test-id", tenant="default")
+
+
+@patch('api.release_session')
+@patch('api.bulk_delete', return_value=2)
+def test_delete_resumes_by_filters(mock_bulk_delete, mock_release_session, client):
+    """Test bulk deletion by id list and age within the tenant, run on the thread pool."""
+    response = client.delete(
+        "/delete-resumes/",
+        params={"unique_ids": ["r1", "r2"], "older_than_days": 30},
+        headers={"X-Tenant-ID": "acme"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["deleted"] == 2
+    mock_bulk_delete.assert_called_once_with("acme", unique_ids=["r1", "r2"], older_than_days=30.0, location=None)
+    mock_release_session.assert_called_once()
+
+
+@patch('api.bulk_delete')
+def test_delete_resumes_requires_a_filter(mock_bulk_delete, client):
+    """Test that deleting every resume of a tenant must be asked for explicitly."""
+    response = client.delete("/delete-resumes/")
+
+    assert response.status_code == 400
+    mock_bulk_delete.assert_not_called()
+
+
+@patch('api.get_all_jobs_from_chroma')
+def test_match_candidates_scoped_to_tenant_header(mock_get_jobs, client):
+    """Test that the X-Tenant-ID header selects the tenant for every lookup."""
+    mock_get_jobs.return_value = (["job1"], [[0.1, 0.2]], [{"title": "Engineer"}])
+
+    with patch('api.calculate_ats_score') as mock_calculate:
+        mock_calculate.return_value = []
+
+        response = client.get("/match-candidates/", headers={"X-Tenant-ID": "acme"})
+
+        assert response.status_code == 200
+        mock_get_jobs.assert_called_once_with(tenant="acme", version="v1")
+        assert mock_calculate.call_args.kwargs == {
+            "tenant": "acme", "version": "v1", "skills": None, "location": None, "near": None,
+            "attributes": None
+        }
+
+
+@patch('api.fetch_candidate_records')
+def test_get_resumes_data_batch(mock_fetch, client):
+    """Test that many resumes are returned by one call, with unknown ids listed as missing."""
+    mock_fetch.return_value = {"r-1": {"name": "Ann"}}
+
+    response = client.get("/get-resumes-data/", params={"unique_ids": ["r-1", "r-2"]}, headers={"X-Tenant-ID": "acme"})
+
+    assert response.status_code == 200
+    assert response.json() == {"resumes": {"r-1": {"name": "Ann"}}, "missing": ["r-2"]}
+    mock_fetch.assert_called_once_with(["r-1", "r-2"], tenant="acme")
+
+
+@patch('api.fetch_job_records')
+def test_get_job_data_not_found(mock_fetch, client):
+    """Test that an unknown job id answers 404."""
+    mock_fetch.return_value = {}
+
+    response = client.get("/get-job-data/", params={"unique_id": "missing"})
+
+    assert response.status_code == 404
+
+
+@patch('api.generate_query_embedding', return_value=np.array([0.1, 0.2]))
+@patch('api.calculate_ats_score')
+def test_search_candidates_paginates_and_projects_fields(mock_calculate, mock_embed, client):
+    """Test free-text search returns the requested page with only the requested metadata fields."""
+    mock_calculate.return_value = [
+        {"candidate_id": f"r-{i}", "score": 1.0 - i / 10, "metadata": {"name": f"N{i}", "skills": "Go"}}
+        for i in range(4)
+    ]
+
+    response = client.get(
+        "/search-candidates/",
+        params={"query": "backend engineer, Go", "k": 2, "offset": 2, "fields": ["name"], "location": "Baku"},
+        headers={"X-Tenant-ID": "acme"}
+    )
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [hit["candidate_id"] for hit in body["results"]] == ["r-2", "r-3"]
+    assert body["results"][0]["metadata"] == {"name": "N2"}
+    assert body["next_offset"] == 4
+    mock_embed.assert_called_once_with("backend engineer, Go", version="v1")
+    assert mock_calculate.call_args.kwargs == {
+        "tenant": "acme", "version": "v1", "skills": None, "location": "Baku", "k": 4, "near": None, "attributes": None
+    }
+
+
+def test_search_candidates_rejects_empty_query_and_deep_pages(client):
+    """Test that blank queries and pages past the search depth are rejected."""
+    assert client.get("/search-candidates/", params={"query": "  "}).status_code == 400
+    assert client.get("/search-candidates/", params={"query": "go", "offset": 995, "k": 10}).status_code == 400
+
+
+@patch('api.find_similar_candidates')
+def test_similar_candidates(mock_similar, client):
+    """Test single and multi-seed similar candidate lookups, and 404 for unknown seeds."""
+    mock_similar.return_value = [{"candidate_id": "r-2", "score": 0.8, "metadata": {"name": "Bob"}}]
+
+    response = client.get("/similar-candidates/r-1", params={"k": 3}, headers={"X-Tenant-ID": "acme"})
+    assert response.status_code == 200
+    assert response.json()["similar_candidates"][0]["candidate_id"] == "r-2"
+    mock_similar.assert_called_with(["r-1"], k=3, tenant="acme", version="v1")
+
+    response = client.get("/similar-candidates/", params={"resume_ids": ["r-1", "r-3"]})
+    assert response.status_code == 200
+    mock_similar.assert_called_with(["r-1", "r-3"], k=10, tenant="default", version="v1")
+
+    mock_similar.return_value = None
+    assert client.get("/similar-candidates/missing").status_code == 404
+
+
+@patch('api.get_all_jobs_from_chroma', return_value=(["job1"], [[0.1, 0.2]], [{"title": "Engineer"}]))
+@patch('api.calculate_ats_score', return_value=[])
+def test_match_candidates_near_place(mock_calculate, mock_get_jobs, client):
+    """Test that a gazetteer place and radius become a coordinate filter, and unknown places are rejected."""
+    response = client.get("/match-candidates/", params={"near": "Bakı", "radius_km": 25})
+
+    assert response.status_code == 200
+    assert mock_calculate.call_args.kwargs["near"] == (40.4093, 49.8671, 25.0)
+    assert client.get("/match-candidates/", params={"near": "Atlantis"}).status_code == 400
+
+
+@patch('api.get_all_jobs_from_chroma', return_value=(["job1"], [[0.1, 0.2]], [{"title": "Engineer"}]))
+@patch('api.calculate_ats_score', return_value=[])
+def test_match_candidates_attribute_filters(mock_calculate, mock_get_jobs, client):
+    """Test that experience/seniority/degree parameters become attribute predicates, and unknown names are rejected."""
+    response = client.get("/match-candidates/", params={"min_years": 5, "seniority": "senior", "degree": "master"})
+
+    assert response.status_code == 200
+    assert mock_calculate.call_args.kwargs["attributes"] == {"min_years": 5.0, "min_seniority": 3, "min_degree": 3}
+    assert client.get("/match-candidates/", params={"seniority": "wizard"}).status_code == 400
+    assert client.get("/match-candidates/", params={"degree": "phd"}).status_code == 400
+
+
+@patch('api.rank_jobs_for_resume')
+def test_match_jobs(mock_rank, client):
+    """Test ranking jobs for a resume, and 404 for an unknown resume."""
+    mock_rank.return_value = [{"job_id": "job1", "job_title": "Dev", "score": 0.9}]
+
+    response = client.get("/match-jobs/r-1", params={"k": 5}, headers={"X-Tenant-ID": "acme"})
+
+    assert response.status_code == 200
+    assert response.json()["matched_jobs"][0]["job_id"] == "job1"
+    mock_rank.assert_called_once_with("r-1", k=5, tenant="acme", version="v1")
+
+    mock_rank.return_value = None
+    assert client.get("/match-jobs/missing").status_code == 404
+
+
+@patch('api.rank_jobs_for_resume')
+def test_match_jobs_serializes_numpy_and_compresses(mock_rank, client):
+    """Test that NumPy scores are serialized directly and large bodies are gzipped for clients accepting it."""
+    mock_rank.return_value = [
+        {"job_id": f"job{i}", "job_title": "Backend Engineer " * 10, "score": np.float32(0.5)} for i in range(50)
+    ]
+
+    with patch('serialization.COMPRESSION_ENABLED', True):
+        response = client.get("/match-jobs/r-1", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"] == "application/json"
+    assert response.json()["matched_jobs"][0]["score"] == 0.5
+
+
+def test_admission_stats(client):
+    """Test that the limiter counters are exposed per limited endpoint."""
+    response = client.get("/admission-stats/")
+
+    assert response.status_code == 200
+    stats = response.json()
+    assert "/upload-resume/" in stats
+    assert set(stats["/match-candidates/"]) >= {"active", "queued", "rejected", "timed_out"}
+    assert "/get-resume-data/" not in stats
+
+
+@patch('api.delete_resume_from_chroma')
+def test_invalid_tenant_header_rejected(mock_delete_from_chroma, client):
+    """Test that an invalid tenant id is rejected before touching any store."""
+    response = client.delete(
+        "/delete-resume/", params={"unique_id": "test-id"}, headers={"X-Tenant-ID": "../acme"}
+    )
+
+    assert response.status_code == 400
+    mock_delete_from_chroma.assert_not_called()
 
 
 def test_validation_error_handling(client):
@@ -0,0 +1,96 @@
+import time
+import numpy as np
+import pytest
+from unittest.mock import patch
+from database_integration import Candidate
+from archive import archive_candidates, search_archive, rehydrate, read_segment, _segments
+
+OLD = time.time() - 1000 * 24 * 3600
+VECTORS = {"python": [1.0, 0.0, 0.0], "go": [0.0, 1.0, 0.0], "java": [0.0, 0.0, 1.0]}
+
+
+@pytest.fixture
+def session_modules():
+    """The archive writes through the outbox, which shares db_session with the database helpers."""
+    return ["outbox"]
+
+
+@pytest.fixture
+def archive_directory(tmp_path):
+    """Empty archive directory."""
+    with patch('archive.ARCHIVE_DIRECTORY', str(tmp_path / "archive")):
+        yield tmp_path / "archive"
+
+
+@pytest.fixture
+def hot_store(db_session):
+    """Two stale candidates and one recent one, with their vectors in a mocked Chroma."""
+    db_session.add_all([
+        Candidate(tenant_id="acme", unique_id="r-python", name="Ann", skills="Python",
+                  embedding_text="python", created_at=OLD, updated_at=OLD),
+        Candidate(tenant_id="acme", unique_id="r-go", name="Bob", skills="Go",
+                  embedding_text="go", created_at=OLD, updated_at=OLD),
+        Candidate(tenant_id="acme", unique_id="r-java", name="Cem", skills="Java", embedding_text="java"),
+    ])
+    db_session.commit()
+    vectors = {"r-python": VECTORS["python"], "r-go": VECTORS["go"], "r-java": VECTORS["java"]}
+
+    def records(unique_ids, tenant, version):
+        return {
+            'ids': list(unique_ids),
+            'embeddings': [vectors[i] for i in unique_ids],
+            'metadatas': [{"name": i} for i in unique_ids],
+        }
+
+    with patch('archive.get_resume_records', side_effect=records), \
+         patch('outbox.delete_resumes_from_chroma') as mock_delete, \
+         patch('archive.generate_embeddings',
+               side_effect=lambda texts, version: np.array([VECTORS[text] for text in texts])):
+        yield mock_delete
+
+
+def test_archive_moves_only_inactive_candidates(db_session, archive_directory, hot_store):
+    """Test that stale candidates are written to a compressed segment and removed from both stores."""
+    assert archive_candidates("acme", inactive_days=365) == 2
+
+    assert {c.unique_id for c in db_session.query(Candidate)} == {"r-java"}
+    assert sorted(hot_store.call_args.args[0]) == ["r-go", "r-python"]
+
+    [segment] = _segments("acme")
+    unique_ids, embeddings, rows = read_segment(segment)
+    assert sorted(unique_ids) == ["r-go", "r-python"]
+    assert embeddings.dtype == np.float32
+    assert rows[unique_ids.index("r-go")]["candidate"]["skills"] == "Go"
+    assert rows[0]["embedding_version"] == "v1"
+
+
+def test_search_archive_in_batch(db_session, archive_directory, hot_store):
+    """Test that several queries are answered in one pass over the archive."""
+    archive_candidates("acme", inactive_days=365)
+
+    results = search_archive(["go", "python"], tenant="acme", k=1)
+
+    assert [match["candidate_id"] for match in results[0]] == ["r-go"]
+    assert [match["candidate_id"] for match in results[1]] == ["r-python"]
+    assert results[0][0]["score"] == pytest.approx(1.0)
+    assert search_archive(["go"], tenant="other") == [[]]
+
+
+def test_rehydrate_restores_candidate(db_session, archive_directory, hot_store):
+    """Test that an archived candidate is written back to Chroma and PostgreSQL once."""
+    archive_candidates("acme", inactive_days=365)
+
+    with patch('archive.add_to_resume_chroma') as mock_add:
+        assert rehydrate(["r-go", "unknown"], tenant="acme") == ["r-go"]
+        assert rehydrate(["r-go"], tenant="acme") == []
+
+    mock_add.assert_called_once()
+    assert mock_add.call_args.args[0] == pytest.approx(VECTORS["go"])
+    assert mock_add.call_args.kwargs["unique_id"] == "r-go"
+    candidate = db_session.query(Candidate).filter_by(unique_id="r-go").one()
+    assert candidate.name == "Bob"
+    assert candidate.updated_at > OLD
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -1,11 +1,17 @@
 import pytest
 from unittest.mock import patch, MagicMock
+import sqlite3
 import uuid
 from chroma_utils import (
     add_to_resume_chroma, add_to_job_chroma,
     search_resume_chroma, get_all_jobs_from_chroma,
-    delete_resume_from_chroma, delete_job_from_chroma
+    delete_resume_from_chroma, delete_job_from_chroma,
+    resume_shard_index, reshard_resume_collection,
+    _merge_shard_results, _get_resumes, get_job_collection,
+    update_resume_in_chroma, delete_resumes_from_chroma, drop_version_collections, load_job_matrix,
+    version_segment_directories
 )
+from embedding_versions import EmbeddingRegistry
 
 
 def test_add_to_resume_chroma():
@@ -184,6 +190,371 @@ def test_add_to_job_chroma_multiple_calls_unique_ids():
         uuid.UUID(id2)
 
 
+def test_search_resume_uses_ann_index_when_configured():
+    """Test that searches go through the local ANN index and keep Chroma's result shape."""
+    index = MagicMock()
+    index.query.return_value = (['candidate2', 'candidate1'], [0.1, 0.3])
+
+    with patch('chroma_utils.VECTOR_INDEX_BACKEND', 'hnsw'), \
+         patch.dict('chroma_utils._resume_ann_indexes', {('default', 'v1'): index}), \
+         patch('chroma_utils.resume_collection') as mock_collection:
+        mock_collection.get.return_value = {
+            'ids': ['candidate1', 'candidate2'],
+            'embeddings': [[0.1, 0.2], [0.3, 0.4]],
+            'metadatas': [{'name': 'John'}, {'name': 'Jane'}]
+        }
+
+        result = search_resume_chroma([0.3, 0.4], k=2)
+
+        index.query.assert_called_once_with([0.3, 0.4], 2)
+        mock_collection.query.assert_not_called()
+        assert result['ids'] == [['candidate2', 'candidate1']]
+        assert result['embeddings'] == [[[0.3, 0.4], [0.1, 0.2]]]
+        assert result['metadatas'] == [[{'name': 'Jane'}, {'name': 'John'}]]
+        assert result['distances'] == [[0.1, 0.3]]
+
+
+def test_add_and_delete_resume_update_ann_index_when_configured():
+    """Test that resume writes are mirrored into the local ANN index."""
+    index = MagicMock()
+
+    with patch('chroma_utils.VECTOR_INDEX_BACKEND', 'hnsw'), \
+         patch.dict('chroma_utils._resume_ann_indexes', {('default', 'v1'): index}), \
+         patch('chroma_utils.resume_collection'):
+        unique_id = add_to_resume_chroma([0.1, 0.2], {"name": "John"})
+        delete_resume_from_chroma(unique_id)
+
+        index.add.assert_called_once_with([unique_id], [[0.1, 0.2]])
+        index.delete.assert_called_once_with([unique_id])
+
+
+def test_get_resume_ann_index_builds_empty_index_from_collection():
+    """Test that enabling the ANN backend on an existing deployment builds the index first."""
+    index = MagicMock()
+    index.__len__.return_value = 0
+
+    with patch('chroma_utils.VECTOR_INDEX_BACKEND', 'hnsw'), \
+         patch.dict('chroma_utils._resume_ann_indexes', {}, clear=True), \
+         patch.dict('chroma_utils.VECTOR_INDEX_BACKENDS', {'hnsw': MagicMock(return_value=index)}), \
+         patch('chroma_utils.resume_collection') as mock_collection:
+        mock_collection.count.return_value = 2
+        mock_collection.get.side_effect = [
+            {'ids': ['r1', 'r2'], 'embeddings': [[0.1], [0.2]]},
+            {'ids': [], 'embeddings': []}
+        ]
+
+        from chroma_utils import get_resume_ann_index
+        assert get_resume_ann_index() is index
+
+        index.bulk_load.assert_called_once()
+        batches, kwargs = index.bulk_load.call_args.args[0], index.bulk_load.call_args.kwargs
+        assert kwargs == {'only_if_empty': True}
+        assert list(batches) == [(['r1', 'r2'], [[0.1], [0.2]])]
+
+
+def test_update_resume_in_chroma_upserts_owning_shard_and_index():
+    """Test that merging a duplicate replaces the stored vector everywhere it is mirrored."""
+    shards = _shard_mocks(2)
+    index = MagicMock()
+
+    with patch('chroma_utils.RESUME_SHARD_COUNT', 2), \
+         patch('chroma_utils.VECTOR_INDEX_BACKEND', 'hnsw'), \
+         patch.dict('chroma_utils._resume_ann_indexes', {('default', 'v1'): index}), \
+         patch.dict('chroma_utils._resume_shard_collections', {('default', 'v1'): shards}):
+        update_resume_in_chroma("existing-id", [0.3], {"name": "John"})
+
+        owner = shards[resume_shard_index("existing-id")]
+        owner.upsert.assert_called_once_with(ids=["existing-id"], embeddings=[[0.3]], metadatas=[{"name": "John"}])
+        index.add.assert_called_once_with(["existing-id"], [[0.3]])
+
+
+def _shard_mocks(count):
+    return [MagicMock(name=f"shard-{i}") for i in range(count)]
+
+
+def test_resume_shard_index_is_stable_and_in_range():
+    """Test that shard routing is deterministic and covers every shard."""
+    with patch('chroma_utils.RESUME_SHARD_COUNT', 4):
+        ids = [str(uuid.uuid4()) for _ in range(200)]
+        shards = [resume_shard_index(unique_id) for unique_id in ids]
+
+        assert shards == [resume_shard_index(unique_id) for unique_id in ids]
+        assert set(shards) == {0, 1, 2, 3}
+
+
+def test_add_and_delete_resume_routed_to_owning_shard():
+    """Test that writes go only to the shard that owns the id."""
+    shards = _shard_mocks(3)
+
+    with patch('chroma_utils.RESUME_SHARD_COUNT', 3), \
+         patch.dict('chroma_utils._resume_shard_collections', {('default', 'v1'): shards}):
+        unique_id = add_to_resume_chroma([0.1, 0.2], {"name": "John"})
+        delete_resume_from_chroma(unique_id)
+
+        owner = shards[resume_shard_index(unique_id)]
+        owner.add.assert_called_once()
+        owner.delete.assert_called_once_with(ids=[unique_id])
+        for shard in shards:
+            if shard is not owner:
+                shard.add.assert_not_called()
+                shard.delete.assert_not_called()
+
+
+def test_merge_shard_results_returns_global_top_k():
+    """Test that per-shard results are merged by distance into one top-k."""
+    shard_a = {
+        'ids': [['a1', 'a2', 'a3']],
+        'distances': [[0.1, 0.5, 0.9]],
+        'embeddings': [[[1.0], [2.0], [3.0]]],
+        'metadatas': [[{'name': 'a1'}, {'name': 'a2'}, {'name': 'a3'}]]
+    }
+    shard_b = {
+        'ids': [['b1', 'b2']],
+        'distances': [[0.2, 0.3]],
+        'embeddings': [[[4.0], [5.0]]],
+        'metadatas': [[{'name': 'b1'}, {'name': 'b2'}]]
+    }
+    empty = {'ids': [[]], 'distances': [[]], 'embeddings': [[]], 'metadatas': [[]]}
+
+    result = _merge_shard_results([shard_a, empty, shard_b], k=3)
+
+    assert result['ids'] == [['a1', 'b1', 'b2']]
+    assert result['distances'] == [[0.1, 0.2, 0.3]]
+    assert result['embeddings'] == [[[1.0], [4.0], [5.0]]]
+    assert result['metadatas'] == [[{'name': 'a1'}, {'name': 'b1'}, {'name': 'b2'}]]
+
+
+def test_search_resume_fans_out_across_shards():
+    """Test that a sharded search queries every shard and merges the hits."""
+    shards = _shard_mocks(2)
+    shards[0].query.return_value = {
+        'ids': [['x']], 'distances': [[0.4]], 'embeddings': [[[0.1]]], 'metadatas': [[{'name': 'x'}]]
+    }
+    shards[1].query.return_value = {
+        'ids': [['y']], 'distances': [[0.2]], 'embeddings': [[[0.2]]], 'metadatas': [[{'name': 'y'}]]
+    }
+
+    with patch('chroma_utils.RESUME_SHARD_COUNT', 2), \
+         patch.dict('chroma_utils._resume_shard_collections', {('default', 'v1'): shards}):
+        result = search_resume_chroma([0.5], k=2)
+
+        for shard in shards:
+            shard.query.assert_called_once()
+            assert shard.query.call_args.kwargs["n_results"] == 2
+            assert "distances" in shard.query.call_args.kwargs["include"]
+        assert result['ids'] == [['y', 'x']]
+
+
+def test_get_resumes_groups_ids_by_shard():
+    """Test that a lookup spread over several shards asks each owner once."""
+    shards = _shard_mocks(3)
+    def shard_get(ids, include):
+        return {
+            'ids': list(ids),
+            'metadatas': [{'name': unique_id} for unique_id in ids]
+        }
+
+    for shard in shards:
+        shard.get.side_effect = shard_get
+
+    with patch('chroma_utils.RESUME_SHARD_COUNT', 3), \
+         patch.dict('chroma_utils._resume_shard_collections', {('default', 'v1'): shards}):
+        ids = [str(uuid.uuid4()) for _ in range(30)]
+        result = _get_resumes(ids, include=["metadatas"])
+
+        assert sorted(result['ids']) == sorted(ids)
+        assert all(metadata['name'] == unique_id for unique_id, metadata in zip(result['ids'], result['metadatas']))
+        for index, shard in enumerate(shards):
+            owned = [unique_id for unique_id in ids if resume_shard_index(unique_id) == index]
+            if owned:
+                shard.get.assert_called_once_with(ids=owned, include=["metadatas"])
+            else:
+                shard.get.assert_not_called()
+
+
+def test_reshard_resume_collection_moves_batches_into_shards():
+    """Test that resharding copies every resume to its shard and empties the legacy collection."""
+    shards = _shard_mocks(2)
+    legacy_batch = {
+        'ids': ['r1', 'r2', 'r3'],
+        'embeddings': [[0.1], [0.2], [0.3]],
+        'metadatas': [{'name': 'r1'}, {'name': 'r2'}, {'name': 'r3'}]
+    }
+
+    with patch('chroma_utils.RESUME_SHARD_COUNT', 2), \
+         patch.dict('chroma_utils._resume_shard_collections', {('default', 'v1'): shards}), \
+         patch('chroma_utils.resume_collection') as mock_collection:
+        mock_collection.get.side_effect = [legacy_batch, {'ids': [], 'embeddings': [], 'metadatas': []}]
+
+        moved = reshard_resume_collection()
+
+        assert moved == 3
+        mock_collection.delete.assert_called_once_with(ids=['r1', 'r2', 'r3'])
+        upserted = []
+        for index, shard in enumerate(shards):
+            for call in shard.upsert.call_args_list:
+                assert all(resume_shard_index(unique_id) == index for unique_id in call.kwargs['ids'])
+                upserted.extend(call.kwargs['ids'])
+        assert sorted(upserted) == ['r1', 'r2', 'r3']
+
+
+def test_tenant_writes_and_searches_use_tenant_collections():
+    """Test that a non-default tenant only touches its own collections."""
+    tenant_resumes = MagicMock(name="resume_collection__acme")
+    tenant_jobs = MagicMock(name="job_collection__acme")
+    tenant_resumes.query.return_value = {'ids': [['r1']], 'embeddings': [[[0.1]]], 'metadatas': [[{}]]}
+
+    with patch('chroma_utils.client') as mock_client, \
+         patch.dict('chroma_utils._resume_shard_collections', {}, clear=True), \
+         patch.dict('chroma_utils._job_collections', {}, clear=True), \
+         patch('chroma_utils.resume_collection') as default_resumes, \
+         patch('chroma_utils.job_collection') as default_jobs:
+        mock_client.get_or_create_collection.side_effect = (
+            lambda name, embedding_function: {"resume_collection__acme": tenant_resumes,
+                                              "job_collection__acme": tenant_jobs}[name]
+        )
+
+        add_to_resume_chroma([0.1], {"name": "John"}, tenant="acme")
+        add_to_job_chroma([0.2], {"title": "Engineer"}, tenant="acme")
+        result = search_resume_chroma([0.1], k=1, tenant="acme")
+
+        tenant_resumes.add.assert_called_once()
+        tenant_jobs.add.assert_called_once()
+        assert result['ids'] == [['r1']]
+        assert get_job_collection("acme") is tenant_jobs
+        assert mock_client.get_or_create_collection.call_count == 2
+        default_resumes.add.assert_not_called()
+        default_resumes.query.assert_not_called()
+        default_jobs.add.assert_not_called()
+
+
+def test_writes_are_mirrored_to_version_being_built(tmp_path):
+    """Test that new resumes are also embedded into a version being built, and reads stay on v1."""
+    registry = EmbeddingRegistry(str(tmp_path / "embedding_versions.json"))
+    registry.register("v2", "model-b")
+    new_resumes = MagicMock(name="resume_collection__v2")
+    new_resumes.query.return_value = {'ids': [[]], 'embeddings': [[]], 'metadatas': [[]]}
+
+    with patch('chroma_utils.embedding_registry', registry), \
+         patch('chroma_utils.client') as mock_client, \
+         patch.dict('chroma_utils._resume_shard_collections', {}, clear=True), \
+         patch('chroma_utils.generate_embedding', return_value=[0.9]) as mock_embed, \
+         patch('chroma_utils.resume_collection') as active_resumes:
+        mock_client.get_or_create_collection.side_effect = (
+            lambda name, embedding_function: {"resume_collection__v2": new_resumes}[name]
+        )
+        active_resumes.query.return_value = {'ids': [['r1']], 'embeddings': [[[0.1]]], 'metadatas': [[{}]]}
+
+        unique_id = add_to_resume_chroma([0.1], {"name": "John"}, text="Experience: Python")
+        result = search_resume_chroma([0.1], k=1)
+
+        mock_embed.assert_called_once_with("Experience: Python", version="v2")
+        assert active_resumes.add.call_args.kwargs["embeddings"] == [[0.1]]
+        assert new_resumes.add.call_args.kwargs == {'ids': [unique_id], 'embeddings': [[0.9]], 'metadatas': [{"name": "John"}]}
+        assert result['ids'] == [['r1']]
+        new_resumes.query.assert_not_called()
+
+        delete_resume_from_chroma(unique_id)
+        active_resumes.delete.assert_called_once_with(ids=[unique_id])
+        new_resumes.delete.assert_called_once_with(ids=[unique_id])
+
+
+def test_bulk_delete_groups_ids_by_shard():
+    """Test that a bulk delete sends one delete per shard and one write to the ANN index."""
+    shards = [MagicMock(), MagicMock()]
+    index = MagicMock()
+    ids = [f"r{i}" for i in range(6)]
+
+    with patch('chroma_utils.RESUME_SHARD_COUNT', 2), \
+         patch('chroma_utils.VECTOR_INDEX_BACKEND', 'hnsw'), \
+         patch.dict('chroma_utils._resume_ann_indexes', {('default', 'v1'): index}), \
+         patch.dict('chroma_utils._resume_shard_collections', {('default', 'v1'): shards}):
+        delete_resumes_from_chroma(ids)
+
+        deleted = [call.kwargs['ids'] for shard in shards for call in shard.delete.call_args_list]
+        assert sorted(sum(deleted, [])) == ids
+        assert all(shard.delete.call_count == 1 for shard in shards)
+        index.delete.assert_called_once_with(ids)
+
+
+def test_drop_version_collections(tmp_path):
+    """Test that dropping a retired version removes its collections and cached handles."""
+    registry = EmbeddingRegistry(str(tmp_path / "embedding_versions.json"))
+    registry.register("v2", "model-b")
+    registry.mark_ready("v2")
+    registry.activate("v2")
+
+    with patch('chroma_utils.embedding_registry', registry), \
+         patch('chroma_utils.client') as mock_client, \
+         patch('chroma_utils.PERSIST_DIRECTORY', str(tmp_path)), \
+         patch('chroma_utils.ANN_INDEX_DIRECTORY', str(tmp_path / "resume_ann_index")), \
+         patch('chroma_utils.RESUME_SNAPSHOT_PATH', str(tmp_path / "resume_snapshot.bin")), \
+         patch.dict('chroma_utils._resume_shard_collections', {('acme', 'v1'): [MagicMock()]}):
+        mock_client.list_collections.return_value = [
+            "resume_collection", "job_collection", "resume_collection__acme", "resume_collection__v2"
+        ]
+
+        dropped = drop_version_collections("v1", ["default", "acme"])
+
+        assert sorted(dropped) == ["job_collection", "resume_collection", "resume_collection__acme"]
+        from chroma_utils import _resume_shard_collections
+        assert ('acme', 'v1') not in _resume_shard_collections
+        with pytest.raises(ValueError):
+            drop_version_collections("v2", ["default"])
+
+
+def test_version_segment_directories(tmp_path):
+    """Test that only the vector segment directories of the version's collections are returned."""
+    database = tmp_path / "chroma.sqlite3"
+    connection = sqlite3.connect(database)
+    connection.execute("CREATE TABLE collections (id TEXT, name TEXT)")
+    connection.execute("CREATE TABLE segments (id TEXT, scope TEXT, collection TEXT)")
+    connection.executemany("INSERT INTO collections VALUES (?, ?)", [
+        ("c1", "resume_collection"), ("c2", "resume_collection__v2"), ("c3", "job_collection__acme"),
+    ])
+    connection.executemany("INSERT INTO segments VALUES (?, ?, ?)", [
+        ("s1", "VECTOR", "c1"), ("s1m", "METADATA", "c1"), ("s2", "VECTOR", "c2"), ("s3", "VECTOR", "c3"),
+    ])
+    connection.commit()
+    connection.close()
+    for name in ("s1", "s2", "s3", "archive"):
+        (tmp_path / name).mkdir()
+
+    with patch('chroma_utils.PERSIST_DIRECTORY', str(tmp_path)), \
+         patch('chroma_utils.CHROMA_SQLITE_PATH', str(database)):
+        directories = version_segment_directories("v1", ["default", "acme"])
+
+    assert sorted(directories) == [str(tmp_path / "s1"), str(tmp_path / "s3")]
+
+
+def test_job_matrix_is_cached_and_kept_current_by_writes():
+    """Test that the job matrix is loaded once and updated in place by job adds and deletes."""
+    with patch('chroma_utils.job_collection') as mock_collection, \
+         patch.dict('chroma_utils._job_matrices', {}, clear=True):
+        mock_collection.get.side_effect = [
+            {'ids': ['job1'], 'embeddings': [[3.0, 4.0]], 'metadatas': [{'title': 'Dev'}]},
+            {'ids': [], 'embeddings': [], 'metadatas': []},
+        ]
+
+        jobs = load_job_matrix()
+        assert jobs["ids"] == ['job1']
+        assert jobs["matrix"][0].tolist() == pytest.approx([0.6, 0.8])
+
+        add_to_job_chroma([0.0, 2.0], {'title': 'Ops'}, unique_id='job2')
+        delete_job_from_chroma('job1')
+        jobs = load_job_matrix()
+
+        assert jobs["ids"] == ['job2']
+        assert jobs["matrix"].tolist() == [[0.0, 1.0]]
+        assert mock_collection.get.call_count == 2
+
+
+def test_invalid_tenant_is_rejected():
+    """Test that tenant ids that are unsafe as collection names are refused."""
+    with pytest.raises(ValueError):
+        get_job_collection("../other")
+
+
 def test_chroma_utils_imports():
     """Test that all required functions are available."""
     # This test ensures that the functions exist and can be imported
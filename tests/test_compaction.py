@@ -0,0 +1,117 @@
+import pytest
+from unittest.mock import patch, MagicMock
+from database_integration import Candidate, OutboxEntry
+from embedding_versions import EmbeddingRegistry
+from compaction import bulk_delete, compact, measure
+
+
+@pytest.fixture
+def session_modules():
+    """The outbox shares db_session with the database helpers."""
+    return ["outbox"]
+
+
+def test_bulk_delete_by_age_and_location(db_session):
+    """Test that only the tenant's resumes matching every filter are deleted from both stores."""
+    db_session.add_all([
+        Candidate(tenant_id="acme", unique_id="old-baku", location="Baku", created_at=1000.0),
+        Candidate(tenant_id="acme", unique_id="old-paris", location="Paris", created_at=1000.0),
+        Candidate(tenant_id="acme", unique_id="new-baku", location="Baku"),
+        Candidate(tenant_id="acme", unique_id="legacy-baku", location="Baku", created_at=None),
+        Candidate(tenant_id="other", unique_id="other-baku", location="Baku", created_at=1000.0),
+    ])
+    db_session.commit()
+
+    with patch('outbox.delete_resumes_from_chroma') as mock_delete:
+        deleted = bulk_delete("acme", older_than_days=30, location="Baku")
+
+    assert deleted == 1
+    mock_delete.assert_called_once_with(["old-baku"], tenant="acme")
+    remaining = {candidate.unique_id for candidate in db_session.query(Candidate)}
+    assert remaining == {"old-paris", "new-baku", "legacy-baku", "other-baku"}
+    assert [entry.status for entry in db_session.query(OutboxEntry)] == ["done"]
+
+
+def test_bulk_delete_by_ids_stays_in_tenant(db_session):
+    """Test that ids of another tenant are not deleted."""
+    db_session.add_all([
+        Candidate(tenant_id="acme", unique_id="r1"),
+        Candidate(tenant_id="other", unique_id="r2"),
+    ])
+    db_session.commit()
+
+    with patch('outbox.delete_resumes_from_chroma'):
+        assert bulk_delete("acme", unique_ids=["r1", "r2"]) == 1
+
+    assert db_session.query(Candidate).filter_by(unique_id="r2").count() == 1
+
+
+def test_compact_copies_into_new_version_and_swaps(db_session, tmp_path):
+    """Test that compaction copies every tenant into a fresh version, activates it and drops the old one."""
+    db_session.add(Candidate(tenant_id="acme", unique_id="r1"))
+    db_session.commit()
+    registry = EmbeddingRegistry(str(tmp_path / "embedding_versions.json"))
+    source_batches = {
+        ("default", "v1"): [],
+        ("acme", "v1"): [{'ids': ["r1", "r2"], 'embeddings': [[0.1], [0.2]], 'metadatas': [{}, {}]}],
+    }
+    copied = {}
+    jobs = MagicMock()
+    jobs_source = [{'ids': ["j1"], 'embeddings': [[0.3]], 'metadatas': [{"title": "Engineer"}]}]
+
+    def iter_resumes(include, batch_size, tenant, version):
+        if version == "v1":
+            return iter(source_batches[(tenant, version)])
+        return iter([{'ids': copied.get(tenant, [])}])
+
+    def upsert(ids, embeddings, metadatas, tenant, version):
+        copied.setdefault(tenant, []).extend(ids)
+
+    with patch('compaction.registry', registry), \
+         patch('compaction.measure', return_value={"resumes": 2}), \
+         patch('compaction.iter_resume_batches', side_effect=iter_resumes), \
+         patch('compaction.iter_job_batches', side_effect=lambda include, batch_size, tenant, version:
+               iter(jobs_source if tenant == "acme" else [])), \
+         patch('compaction.upsert_resume_batch', side_effect=upsert), \
+         patch('compaction.get_job_collection', return_value=jobs), \
+         patch('compaction.delete_resumes_from_chroma') as mock_delete, \
+         patch('compaction.rebuild_resume_snapshot'), \
+         patch('compaction.drop_version_collections', return_value=["resume_collection"]) as mock_drop:
+        report = compact(drain_seconds=0)
+
+    assert copied == {"acme": ["r1", "r2"]}
+    jobs.upsert.assert_called_once_with(ids=["j1"], embeddings=[[0.3]], metadatas=[{"title": "Engineer"}])
+    mock_delete.assert_not_called()
+    assert registry.active_version() == "v2"
+    assert registry.model_for("v2") == registry.model_for("v1")
+    assert registry.version_info("v1")["status"] == "retired"
+    mock_drop.assert_called_once_with("v1", ["acme", "default"])
+    assert report["version"] == "v2"
+    assert report["before"] == {"resumes": 2}
+    assert report["dropped_collections"] == ["resume_collection"]
+
+
+def test_measure_counts_only_the_version_segments(tmp_path):
+    """Test that the disk size covers the version's segments and reports Chroma's SQLite file apart."""
+    segment = tmp_path / "segment"
+    segment.mkdir()
+    (segment / "data_level0.bin").write_bytes(b"x" * 100)
+    (tmp_path / "archive").mkdir()
+    (tmp_path / "archive" / "segment.npz").write_bytes(b"x" * 1000)
+    (tmp_path / "chroma.sqlite3").write_bytes(b"x" * 10)
+
+    with patch('compaction.version_segment_directories', return_value=[str(segment)]) as mock_segments, \
+         patch('compaction.CHROMA_SQLITE_PATH', str(tmp_path / "chroma.sqlite3")), \
+         patch('compaction.count_resumes', return_value=3), \
+         patch('compaction.iter_resume_batches', return_value=iter([])):
+        stats = measure(["default"], "v1")
+
+    mock_segments.assert_called_once_with("v1", ["default"])
+    assert stats["disk_bytes"] == 100
+    assert stats["chroma_sqlite_bytes"] == 10
+    assert "VACUUM" in stats["note"]
+    assert stats["resumes"] == 3
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,101 @@
+import json
+import numpy as np
+import pytest
+from unittest.mock import patch
+from database_integration import Candidate, Job
+from corpus_io import export_corpus, import_corpus
+import pyarrow.parquet as pq
+
+VECTORS = {"r-1": [1.0, 0.0, 0.0], "r-2": [0.0, 1.0, 0.0], "j-1": [0.0, 0.0, 1.0]}
+
+
+def records(unique_ids, tenant, version):
+    stored = [unique_id for unique_id in unique_ids if unique_id in VECTORS]
+    return {
+        'ids': stored,
+        'embeddings': [VECTORS[unique_id] for unique_id in stored],
+        'metadatas': [{"name": unique_id} for unique_id in stored],
+    }
+
+
+@pytest.fixture
+def session_modules():
+    """corpus_io reads and writes through db_session."""
+    return ["corpus_io"]
+
+
+@pytest.fixture
+def source(db_session):
+    """Database with two candidates (one without a vector in Chroma) and a job."""
+    db_session.add_all([
+        Candidate(tenant_id="acme", unique_id="r-1", name="Ann", skills="Python", embedding_text="python"),
+        Candidate(tenant_id="acme", unique_id="r-2", name="Bob", skills="Go", created_at=1.0, updated_at=2.0),
+        Candidate(tenant_id="acme", unique_id="r-3", name="Cem", skills="Java", embedding_text="java"),
+        Job(tenant_id="acme", unique_id="j-1", title="Dev", description="Build things"),
+    ])
+    db_session.commit()
+    with patch('corpus_io.get_resume_records', side_effect=records), \
+         patch('corpus_io.get_job_records', side_effect=records):
+        yield db_session
+
+
+def test_export_writes_parquet_and_manifest(tmp_path, source):
+    """Test that export streams rows, vectors and metadata into Parquet files."""
+    manifest = export_corpus(str(tmp_path / "dump"), tenants=["acme"], batch_size=2)
+
+    assert manifest["resumes"] == 3 and manifest["jobs"] == 1
+    assert json.loads((tmp_path / "dump" / "manifest.json").read_text())["embedding_version"] == "v1"
+
+    table = pq.read_table(tmp_path / "dump" / "resumes.parquet").to_pylist()
+    rows = {row["unique_id"]: row for row in table}
+    assert rows["r-1"]["embedding"] == [1.0, 0.0, 0.0]
+    assert json.loads(rows["r-1"]["metadata"]) == {"name": "r-1"}
+    assert rows["r-3"]["embedding"] is None
+    assert rows["r-2"]["updated_at"] == 2.0
+
+
+def test_import_round_trip_is_idempotent(tmp_path, make_session, source):
+    """Test that an import reuses exported vectors, embeds the missing ones and can be re-run."""
+    export_corpus(str(tmp_path / "dump"), tenants=["acme"])
+    target = make_session(tmp_path / "target.db")
+
+    with patch('corpus_io.session', target), patch('database_integration.session', target), \
+         patch('corpus_io.upsert_resume_batch') as mock_upsert, \
+         patch('corpus_io.get_job_collection') as mock_jobs, \
+         patch('corpus_io.generate_embeddings', return_value=np.array([[0.5, 0.5, 0.0]])) as mock_embed, \
+         patch('corpus_io.rebuild_resume_snapshot'), patch('corpus_io.rebuild_resume_ann_index'):
+        assert import_corpus(str(tmp_path / "dump")) == {"resumes": 3, "jobs": 1}
+        assert import_corpus(str(tmp_path / "dump")) == {"resumes": 0, "jobs": 0}
+
+    mock_embed.assert_called_with(["java"], version="v1")
+    unique_ids, embeddings, metadatas = mock_upsert.call_args_list[0].args
+    assert unique_ids == ["r-1", "r-2", "r-3"]
+    assert embeddings[0] == [1.0, 0.0, 0.0] and embeddings[2] == [0.5, 0.5, 0.0]
+    assert metadatas[2]["skills"] == "Java"
+    assert mock_jobs.return_value.upsert.call_args.kwargs["ids"] == ["j-1"]
+
+    assert {c.unique_id for c in target.query(Candidate).filter_by(tenant_id="acme")} == {"r-1", "r-2", "r-3"}
+    assert target.query(Candidate).filter_by(unique_id="r-2").one().created_at == 1.0
+    assert target.query(Job).filter_by(unique_id="j-1").one().title == "Dev"
+
+
+def test_import_reembeds_when_model_changed(tmp_path, make_session, source):
+    """Test that exported vectors are ignored when the active model differs."""
+    export_corpus(str(tmp_path / "dump"), tenants=["acme"])
+    manifest_path = tmp_path / "dump" / "manifest.json"
+    manifest = json.loads(manifest_path.read_text())
+    manifest_path.write_text(json.dumps({**manifest, "embedding_model": "other-model"}))
+    target = make_session(tmp_path / "target.db")
+
+    with patch('corpus_io.session', target), patch('database_integration.session', target), \
+         patch('corpus_io.upsert_resume_batch'), patch('corpus_io.get_job_collection'), \
+         patch('corpus_io.generate_embeddings',
+               side_effect=lambda texts, version: np.zeros((len(texts), 3))) as mock_embed, \
+         patch('corpus_io.rebuild_resume_snapshot'), patch('corpus_io.rebuild_resume_ann_index'):
+        import_corpus(str(tmp_path / "dump"))
+
+    assert len(mock_embed.call_args_list[0].args[0]) == 3
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -1,8 +1,11 @@
 import pytest
 from unittest.mock import patch, MagicMock, Mock
+from sqlalchemy import create_engine, inspect, text
 from database_integration import (
-    save_candidate, save_job, delete_candidate, delete_job,
-    Candidate, Job, session
+    save_candidate, update_candidate, save_job, delete_candidate, delete_candidates, delete_job,
+    find_candidate_ids, backfill_candidate_skills, backfill_candidate_locations, normalize_skills, fetch_candidate_records, fetch_job_records,
+    backfill_candidate_attributes, iter_candidate_attributes, record_cache, candidate_generations,
+    Candidate, CandidateSkill, Job, session, migrate_schema
 )
 
 
@@ -175,5 +178,157 @@ def test_save_job_with_special_characters():
         mock_session.commit.assert_called_once()
 
 
+def test_delete_candidate_filters_by_tenant():
+    """Test that a candidate lookup is scoped to the caller's tenant."""
+    with patch('database_integration.session') as mock_session:
+        mock_session.query.return_value.filter_by.return_value.first.return_value = None
+
+        assert delete_candidate("existing-id", tenant="acme") is False
+        mock_session.query.return_value.filter_by.assert_called_once_with(tenant_id="acme", unique_id="existing-id")
+
+
+def test_migrate_columns_upgrades_existing_tables(tmp_path):
+    """Test that migrating tables created before multi-tenancy adds a tenant column defaulting to the default tenant, and the tables added since."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as connection:
+        connection.execute(text("CREATE TABLE candidates (id INTEGER PRIMARY KEY, unique_id VARCHAR, name VARCHAR)"))
+        connection.execute(text("CREATE TABLE jobs (id INTEGER PRIMARY KEY, unique_id VARCHAR, title VARCHAR)"))
+        connection.execute(text("INSERT INTO candidates (unique_id, name) VALUES ('old', 'John')"))
+
+    migrate_schema(engine)
+    migrate_schema(engine)
+
+    inspector = inspect(engine)
+    for table in ("candidates", "jobs"):
+        assert "tenant_id" in {column["name"] for column in inspector.get_columns(table)}
+        assert f"ix_{table}_tenant_id" in {index["name"] for index in inspector.get_indexes(table)}
+    assert "content_hash" in {column["name"] for column in inspector.get_columns("candidates")}
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT tenant_id FROM candidates")).scalar() == "default"
+        connection.execute(text("INSERT INTO outbox (operation, unique_id, created_at, updated_at) VALUES ('job_save', 'j', 0, 0)"))
+        assert connection.execute(text("SELECT status, attempts FROM outbox")).one() == ("pending", 0)
+
+    assert "ix_candidates_tenant_location" in {index["name"] for index in inspector.get_indexes("candidates")}
+
+
+def test_normalize_skills():
+    """Test that skill lists and comma separated strings normalize the same way."""
+    assert normalize_skills(["Python", " machine  Learning", "python"]) == ["python", "machine learning"]
+    assert normalize_skills("Python, SQL;Go") == ["python", "sql", "go"]
+    assert normalize_skills(None) == []
+
+
+def test_skills_are_indexed_and_filterable(db_session):
+    """Test that saved skills land in candidate_skills and filter candidates by all given skills."""
+    save_candidate({"name": "Ann", "location": "Baku", "skills": ["Python", "SQL"]}, "r-1", tenant="acme")
+    save_candidate({"name": "Bob", "location": "Baku", "skills": ["Python"]}, "r-2", tenant="acme")
+    save_candidate({"name": "Cem", "location": "Ganja", "skills": ["Python", "SQL"]}, "r-3", tenant="acme")
+    save_candidate({"name": "Dan", "location": "Baku", "skills": ["Python", "SQL"]}, "r-4", tenant="other")
+
+    assert db_session.query(Candidate).filter_by(unique_id="r-1").one().skills == "Python, SQL"
+    assert find_candidate_ids("acme", skills=["python", "sql"]) == ["r-1", "r-3"]
+    assert find_candidate_ids("acme", skills=["Python"], location="Baku") == ["r-1", "r-2"]
+
+    update_candidate({"skills": ["Go"]}, "r-1", tenant="acme")
+    assert find_candidate_ids("acme", skills=["sql"]) == ["r-3"]
+
+    delete_candidate("r-3", tenant="acme")
+    delete_candidates(["r-2"], tenant="acme")
+    assert {row.unique_id for row in db_session.query(CandidateSkill)} == {"r-1", "r-4"}
+
+
+def test_backfill_candidate_skills(db_session):
+    """Test that candidates saved before candidate_skills are backfilled once."""
+    db_session.add_all([
+        Candidate(tenant_id="acme", unique_id="old-1", skills="Python, SQL"),
+        Candidate(tenant_id="acme", unique_id="old-2", skills=None),
+    ])
+    db_session.commit()
+
+    assert backfill_candidate_skills(batch_size=1) == 1
+    assert backfill_candidate_skills() == 0
+    assert find_candidate_ids("acme", skills=["sql"]) == ["old-1"]
+
+
+def test_fetch_records_read_through_and_invalidation(db_session):
+    """Test that records are cached after one batched query and dropped from the cache on writes."""
+    record_cache.local.clear()
+    save_candidate({"name": "Ann", "location": "Baku", "skills": ["Python"]}, "r-1", tenant="acme")
+    save_candidate({"name": "Bob", "location": "Baku"}, "r-2", tenant="acme")
+    save_job("Dev", "Build things", "j-1", tenant="acme")
+
+    records = fetch_candidate_records(["r-1", "r-2", "missing"], tenant="acme")
+    assert records["r-1"] == {"name": "Ann", "location": "Baku", "experience": None, "education": None,
+                              "skills": "Python"}
+    assert set(records) == {"r-1", "r-2"}
+    assert fetch_job_records(["j-1"], tenant="acme")["j-1"]["title"] == "Dev"
+    assert fetch_candidate_records(["r-1"], tenant="other") == {}
+
+    with patch.object(db_session, "query", side_effect=AssertionError("not cached")):
+        assert fetch_candidate_records(["r-1", "r-2"], tenant="acme")["r-2"]["name"] == "Bob"
+
+    update_candidate({"name": "Anna"}, "r-1", tenant="acme")
+    assert fetch_candidate_records(["r-1"], tenant="acme")["r-1"]["name"] == "Anna"
+    delete_candidates(["r-2"], tenant="acme")
+    assert fetch_candidate_records(["r-2"], tenant="acme") == {}
+    delete_job("j-1", tenant="acme")
+    assert fetch_job_records(["j-1"], tenant="acme") == {}
+
+
+def test_find_candidates_near_a_point(db_session):
+    """Test that locations are geocoded at save time and radius searches keep only nearby candidates."""
+    save_candidate({"name": "Ann", "location": "Baku"}, "r-baku", tenant="acme")
+    save_candidate({"name": "Bob", "location": "Sumqayıt"}, "r-sumgait", tenant="acme")
+    save_candidate({"name": "Cem", "location": "Ganja"}, "r-ganja", tenant="acme")
+    save_candidate({"name": "Dan", "location": "Remote"}, "r-remote", tenant="acme")
+
+    baku = (40.4093, 49.8671)
+    assert find_candidate_ids("acme", near=(*baku, 50)) == ["r-baku", "r-sumgait"]
+    assert find_candidate_ids("acme", near=(*baku, 400)) == ["r-baku", "r-sumgait", "r-ganja"]
+    assert find_candidate_ids("acme", near=(*baku, 20000)) == ["r-baku", "r-sumgait", "r-ganja"]
+
+    update_candidate({"location": "Baku"}, "r-ganja", tenant="acme")
+    assert find_candidate_ids("acme", near=(*baku, 10)) == ["r-baku", "r-ganja"]
+
+
+def test_backfill_candidate_locations(db_session):
+    """Test that candidates saved before geocoding get coordinates."""
+    db_session.add_all([
+        Candidate(tenant_id="acme", unique_id="old-1", location="Tbilisi"),
+        Candidate(tenant_id="acme", unique_id="old-2", location="Nowhere"),
+    ])
+    db_session.commit()
+
+    assert backfill_candidate_locations(batch_size=1) == 1
+    assert db_session.query(Candidate).filter_by(unique_id="old-1").one().geohash.startswith("sz")
+
+
+def test_candidate_attributes_derived_on_save_and_update(db_session):
+    """Test that experience/education attributes are stored at save time and recomputed on update."""
+    save_candidate(
+        {"name": "Ann", "experience": "Senior Engineer 2012 - 2019", "education": "MSc Physics"}, "r-1", tenant="acme"
+    )
+    save_candidate({"name": "Bob", "years_experience": 3.0}, "r-2", tenant="acme")
+    generation = candidate_generations.get("acme", 0)
+
+    update_candidate({"education": "PhD Physics"}, "r-1", tenant="acme")
+
+    assert candidate_generations["acme"] == generation + 1
+    assert list(iter_candidate_attributes("acme")) == [[("r-1", 8.0, 3, 4), ("r-2", 3.0, None, None)]]
+
+
+def test_backfill_candidate_attributes(db_session):
+    """Test that candidates saved before attribute extraction get their attributes."""
+    db_session.add_all([
+        Candidate(tenant_id="acme", unique_id="old-1", experience="Junior Developer 2020 - 2021"),
+        Candidate(tenant_id="acme", unique_id="old-2", experience="Various projects"),
+    ])
+    db_session.commit()
+
+    assert backfill_candidate_attributes(batch_size=1) == 1
+    candidate = db_session.query(Candidate).filter_by(unique_id="old-1").one()
+    assert (candidate.years_experience, candidate.seniority_level, candidate.degree_level) == (2.0, 1, None)
+
+
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,66 @@
+import pytest
+import numpy as np
+from unittest.mock import patch
+from dedup import minhash_signature, minhash_similarity, find_near_duplicate
+
+RESUME_TEXT = (
+    "Experience: 5 years as a backend developer at Acme building payment APIs in Python and Go, "
+    "leading a team of four engineers. Education: BSc Computer Science, Baku State University. "
+    "Skills: ['Python', 'Go', 'PostgreSQL', 'Docker', 'Kubernetes']"
+)
+
+
+def _search_result(candidate_id, embedding, metadata):
+    return {'ids': [[candidate_id]], 'embeddings': [[embedding]], 'metadatas': [[metadata]]}
+
+
+def test_minhash_similarity_estimates_jaccard():
+    """Test MinHash similarity for identical, lightly edited and unrelated texts."""
+    signature = minhash_signature(RESUME_TEXT)
+    edited = minhash_signature(RESUME_TEXT.replace("four", "five"))
+    unrelated = minhash_signature("Experience: ten years as a nurse. Education: nursing school. Skills: patient care")
+
+    assert minhash_similarity(signature, minhash_signature(RESUME_TEXT)) == 1.0
+    assert minhash_similarity(signature, edited) > 0.8
+    assert minhash_similarity(signature, unrelated) < 0.2
+
+
+def test_find_near_duplicate_confirms_with_minhash():
+    """Test that a close embedding with near-identical text is reported as a duplicate."""
+    with patch('dedup.search_resume_chroma') as mock_search:
+        mock_search.return_value = _search_result("existing", [1.0, 0.01], {"text": RESUME_TEXT})
+
+        assert find_near_duplicate(np.array([1.0, 0.0]), RESUME_TEXT, tenant="acme") == "existing"
+        mock_search.assert_called_once_with(pytest.approx(np.array([1.0, 0.0])), k=1, tenant="acme", version=None)
+
+
+def test_find_near_duplicate_rejects_distant_embedding():
+    """Test that the text check is skipped when embeddings are not close."""
+    with patch('dedup.search_resume_chroma') as mock_search:
+        mock_search.return_value = _search_result("existing", [0.0, 1.0], {"text": RESUME_TEXT})
+
+        assert find_near_duplicate([1.0, 0.0], RESUME_TEXT) is None
+
+
+def test_find_near_duplicate_rejects_different_text():
+    """Test that similar embeddings of different texts are not merged."""
+    with patch('dedup.search_resume_chroma') as mock_search:
+        mock_search.return_value = _search_result("existing", [1.0, 0.0], {"experience": "nurse"})
+
+        result = find_near_duplicate(
+            [1.0, 0.0], RESUME_TEXT, text_of=lambda metadata: f"Experience: {metadata['experience']}"
+        )
+
+        assert result is None
+
+
+def test_find_near_duplicate_empty_collection():
+    """Test near-duplicate detection when there are no stored resumes."""
+    with patch('dedup.search_resume_chroma') as mock_search:
+        mock_search.return_value = {'ids': [[]], 'embeddings': [[]], 'metadatas': [[]]}
+
+        assert find_near_duplicate([1.0, 0.0], RESUME_TEXT) is None
+
+
+if __name__ == "__main__":
+    pytest.main()
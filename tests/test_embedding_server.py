@@ -0,0 +1,107 @@
+import socket
+import threading
+import pytest
+import numpy as np
+from embedding_server import EmbeddingClient, EmbeddingServer, EmbeddingServerUnavailable, serve_in_thread
+
+
+def _fake_encode(calls):
+    def encode(model_name, texts):
+        calls.append((model_name, list(texts)))
+        if "boom" in texts:
+            raise ValueError("cannot embed")
+        return np.array([[len(text), float(model_name == "m2")] for text in texts], dtype=np.float32)
+    return encode
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    """Unix socket path for a test server."""
+    return str(tmp_path / "embed.sock")
+
+
+def test_client_round_trip_and_connection_reuse(socket_path):
+    """Test that the client gets one row per text and reuses its pooled connection."""
+    calls = []
+    serve_in_thread(EmbeddingServer(_fake_encode(calls), max_wait_ms=0), socket_path)
+    client = EmbeddingClient(socket_path)
+
+    first = client.encode("m1", ["ab", "abcd"])
+    second = client.encode("m2", ["abc"])
+
+    assert first.tolist() == [[2.0, 0.0], [4.0, 0.0]]
+    assert second.tolist() == [[3.0, 1.0]]
+    assert first.flags.writeable
+    assert client._idle.qsize() == 1
+    client.close()
+
+
+def test_concurrent_requests_are_batched_together(socket_path):
+    """Test that requests from many callers within the wait window share a batch."""
+    calls = []
+    server = EmbeddingServer(_fake_encode(calls), max_batch=64, max_wait_ms=200)
+    serve_in_thread(server, socket_path)
+    results = {}
+
+    def worker(index):
+        client = EmbeddingClient(socket_path)
+        results[index] = client.encode("m1", ["x" * index])
+        client.close()
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(1, 9)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert {index: rows.tolist() for index, rows in results.items()} == {
+        index: [[float(index), 0.0]] for index in range(1, 9)
+    }
+    assert server.texts == 8
+    assert server.batches < 8
+
+
+def test_server_errors_are_raised_to_the_caller(socket_path):
+    """Test that an inference error lets the caller fall back without breaking the connection."""
+    serve_in_thread(EmbeddingServer(_fake_encode([]), max_wait_ms=0), socket_path)
+    client = EmbeddingClient(socket_path)
+
+    with pytest.raises(EmbeddingServerUnavailable, match="cannot embed"):
+        client.encode("m1", ["boom"])
+    assert client.encode("m1", ["ok"]).tolist() == [[2.0, 0.0]]
+
+
+def test_unreachable_server_is_skipped_until_retry(socket_path):
+    """Test that a missing server fails fast and is not retried within the retry window."""
+    client = EmbeddingClient(socket_path, retry_seconds=60)
+
+    with pytest.raises(EmbeddingServerUnavailable):
+        client.encode("m1", ["a"])
+
+    serve_in_thread(EmbeddingServer(_fake_encode([]), max_wait_ms=0), socket_path)
+    with pytest.raises(EmbeddingServerUnavailable):
+        client.encode("m1", ["a"])
+
+    client._unavailable_until = 0.0
+    assert client.encode("m1", ["a"]).tolist() == [[1.0, 0.0]]
+
+
+def test_hung_server_times_out_once(socket_path):
+    """Test that a timeout on a pooled connection is not retried on a new connection."""
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen()
+    client = EmbeddingClient(socket_path, timeout=0.2, retry_seconds=60)
+    client._idle.put(client._connect())
+    connects = []
+    client._connect = lambda: connects.append(1)
+
+    with pytest.raises(EmbeddingServerUnavailable):
+        client.encode("m1", ["a"])
+
+    assert connects == []
+    listener.close()
+
+
+if __name__ == "__main__":
+    pytest.main()
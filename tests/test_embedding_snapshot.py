@@ -0,0 +1,172 @@
+import os
+import pytest
+import numpy as np
+import embedding_snapshot
+from embedding_snapshot import (
+    write_snapshot, load_snapshot, update_snapshot, rebuild_snapshot,
+    compact_snapshot, top_k
+)
+
+
+@pytest.fixture
+def snapshot_path(tmp_path):
+    """Path of a snapshot file inside a temporary persist directory."""
+    return str(tmp_path / "resume_snapshot.bin")
+
+
+def _ids(snapshot):
+    return sorted(candidate_id for candidate_id, _ in top_k(snapshot, np.ones(snapshot.dim), k=len(snapshot) or 1))
+
+
+def test_write_and_load_snapshot_roundtrip(snapshot_path):
+    """Test that ids and normalised embeddings survive a write/load cycle."""
+    write_snapshot(snapshot_path, ["a", "b"], [[3.0, 4.0], [0.0, 2.0]])
+
+    snapshot = load_snapshot(snapshot_path)
+
+    assert len(snapshot) == 2
+    assert [snapshot.id_at(0), snapshot.id_at(1)] == ["a", "b"]
+    np.testing.assert_allclose(snapshot.scores(np.array([0.0, 1.0], dtype=np.float32)), [0.8, 1.0], rtol=1e-6)
+
+
+def test_loaded_snapshot_is_read_only_memmap(snapshot_path):
+    """Test that ids and matrix are read-only memory maps, not private copies."""
+    write_snapshot(snapshot_path, ["a"], [[1.0, 0.0, 0.0]])
+
+    snapshot = load_snapshot(snapshot_path)
+
+    assert isinstance(snapshot._base_matrix, np.memmap)
+    assert isinstance(snapshot._base_ids, np.memmap)
+    assert not snapshot._base_matrix.flags.writeable
+
+
+def test_load_missing_snapshot_returns_none(snapshot_path):
+    """Test loading a snapshot that has not been built yet."""
+    assert load_snapshot(snapshot_path) is None
+
+
+def test_update_without_base_never_seeds_partial_snapshot(snapshot_path):
+    """Test that writes before the first build do not create a snapshot of only the new rows."""
+    update_snapshot(snapshot_path, add_ids=["new"], add_embeddings=[[1.0, 0.0]])
+
+    assert load_snapshot(snapshot_path) is None
+
+
+def test_rebuild_keeps_writes_made_during_the_scan(snapshot_path):
+    """Test that records appended while a rebuild scans are carried into the new snapshot."""
+    def read_rows():
+        # Another worker uploads and deletes while the scan is running
+        update_snapshot(snapshot_path, add_ids=["late"], add_embeddings=[[0.0, 1.0]])
+        update_snapshot(snapshot_path, remove_ids=["gone"])
+        return ["old", "gone"], [[1.0, 0.0], [1.0, 1.0]]
+
+    assert rebuild_snapshot(snapshot_path, read_rows)
+
+    assert _ids(load_snapshot(snapshot_path)) == ["late", "old"]
+
+
+def test_pre_build_log_is_bounded(snapshot_path):
+    """Test that writes before any build are not logged, and the first build removes its log."""
+    for _ in range(3):
+        update_snapshot(snapshot_path, add_ids=["new"], add_embeddings=[[1.0, 0.0]])
+    assert not os.path.exists(f"{snapshot_path}.0.delta")
+
+    def read_rows():
+        update_snapshot(snapshot_path, add_ids=["late"], add_embeddings=[[0.0, 1.0]])
+        return ["old"], [[1.0, 0.0]]
+
+    assert rebuild_snapshot(snapshot_path, read_rows)
+
+    assert not os.path.exists(f"{snapshot_path}.0.delta")
+    assert _ids(load_snapshot(snapshot_path)) == ["late", "old"]
+
+
+def test_update_appends_without_rewriting_base(snapshot_path):
+    """Test that an update is an append to the delta log, not a rewrite of the base."""
+    write_snapshot(snapshot_path, ["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    inode = os.stat(snapshot_path).st_ino
+
+    update_snapshot(snapshot_path, add_ids=["c"], add_embeddings=[[1.0, 1.0]])
+    update_snapshot(snapshot_path, add_ids=["a"], add_embeddings=[[0.0, 5.0]])
+    update_snapshot(snapshot_path, remove_ids=["b"])
+
+    assert os.stat(snapshot_path).st_ino == inode
+    snapshot = load_snapshot(snapshot_path)
+    assert len(snapshot) == 2
+    assert _ids(snapshot) == ["a", "c"]
+    assert top_k(snapshot, [0.0, 1.0], k=1)[0] == ("a", pytest.approx(1.0))
+
+
+def test_cached_view_sees_new_delta_records(snapshot_path):
+    """Test that a cached view picks up rows appended by other writers."""
+    write_snapshot(snapshot_path, ["a"], [[1.0, 0.0]])
+    first = load_snapshot(snapshot_path)
+
+    update_snapshot(snapshot_path, add_ids=["b"], add_embeddings=[[0.0, 1.0]])
+    second = load_snapshot(snapshot_path)
+
+    assert second is first
+    assert _ids(second) == ["a", "b"]
+
+
+def test_compaction_folds_delta_into_new_epoch(snapshot_path):
+    """Test that compaction swaps in a base containing exactly the live rows."""
+    write_snapshot(snapshot_path, ["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    old_view = load_snapshot(snapshot_path)
+    update_snapshot(snapshot_path, add_ids=["c"], add_embeddings=[[1.0, 1.0]])
+    update_snapshot(snapshot_path, remove_ids=["a"])
+
+    assert compact_snapshot(snapshot_path)
+
+    snapshot = load_snapshot(snapshot_path)
+    assert snapshot is not old_view
+    assert snapshot.epoch == old_view.epoch + 1
+    assert snapshot.base_count == 2
+    assert _ids(snapshot) == ["b", "c"]
+    # Readers still holding the previous epoch keep working
+    assert old_view.id_at(0) == "a"
+    leftovers = [name for name in os.listdir(os.path.dirname(snapshot_path)) if name.endswith(".tmp")]
+    assert leftovers == []
+
+
+def test_update_reports_when_compaction_is_due(snapshot_path, monkeypatch):
+    """Test the compaction threshold returned by update_snapshot."""
+    monkeypatch.setattr(embedding_snapshot, "COMPACT_MIN_DELTA_BYTES", 32)
+    write_snapshot(snapshot_path, ["a"], [[1.0, 0.0]])
+
+    assert update_snapshot(snapshot_path, remove_ids=["x"]) is False
+    assert update_snapshot(snapshot_path, add_ids=["b", "c"], add_embeddings=[[1.0, 0.0], [0.0, 1.0]]) is True
+
+
+def test_top_k_orders_by_cosine_similarity(snapshot_path):
+    """Test scoring against the snapshot."""
+    write_snapshot(snapshot_path, ["far", "near", "mid"], [[-1.0, 0.0], [2.0, 0.1], [1.0, 1.0]])
+    snapshot = load_snapshot(snapshot_path)
+
+    result = top_k(snapshot, np.array([1.0, 0.0]), k=2)
+
+    assert [candidate_id for candidate_id, _ in result] == ["near", "mid"]
+    assert result[0][1] == pytest.approx(2.0 / np.hypot(2.0, 0.1), rel=1e-6)
+
+
+def test_top_k_restricted_rows(snapshot_path):
+    """Test scoring only a subset of snapshot rows, including appended ones."""
+    write_snapshot(snapshot_path, ["a", "b", "c"], [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]])
+    update_snapshot(snapshot_path, add_ids=["d"], add_embeddings=[[0.5, 0.5]])
+    snapshot = load_snapshot(snapshot_path)
+
+    rows = snapshot.rows_for(["b", "c", "d"])
+    result = top_k(snapshot, [1.0, 0.0], k=5, rows=rows)
+
+    assert [candidate_id for candidate_id, _ in result] == ["b", "d", "c"]
+
+
+def test_top_k_empty_snapshot(snapshot_path):
+    """Test scoring an empty snapshot."""
+    write_snapshot(snapshot_path, [], np.zeros((0, 3)))
+
+    assert top_k(load_snapshot(snapshot_path), [1.0, 0.0, 0.0]) == []
+
+
+if __name__ == "__main__":
+    pytest.main()
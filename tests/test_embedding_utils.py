@@ -1,6 +1,8 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from embedding_utils import generate_embedding
+import numpy as np
+from embedding_server import EmbeddingServerUnavailable
+from embedding_utils import generate_embedding, generate_embeddings, generate_query_embedding, query_embedding_cache
 
 
 def test_generate_embedding_success():
@@ -117,5 +119,47 @@ def test_generate_embedding_consistency():
         assert mock_model.encode.call_count == 2
 
 
+def test_generate_query_embedding_is_cached():
+    """Test that a repeated search query (modulo whitespace) is embedded once."""
+    query_embedding_cache.clear()
+    with patch('embedding_utils.model') as mock_model:
+        mock_model.encode.return_value = np.array([0.1, 0.2])
+
+        first = generate_query_embedding("senior  backend engineer")
+        second = generate_query_embedding(" senior backend engineer ")
+
+        assert second is first
+        assert not first.flags.writeable
+        mock_model.encode.assert_called_once_with("senior backend engineer")
+
+    with pytest.raises(ValueError):
+        generate_query_embedding("   ")
+
+
+def test_embeddings_come_from_server_when_configured():
+    """Test that a configured embedding server is used instead of the local model."""
+    client = MagicMock()
+    client.encode.return_value = np.array([[0.1, 0.2], [0.3, 0.4]], dtype=np.float32)
+
+    with patch('embedding_utils.embedding_client', client), patch('embedding_utils.model') as mock_model:
+        assert generate_embeddings(["a", "b"]).tolist() == client.encode.return_value.tolist()
+        client.encode.return_value = np.array([[0.5, 0.6]], dtype=np.float32)
+        assert generate_embedding("c").tolist() == pytest.approx([0.5, 0.6])
+
+    assert client.encode.call_args.args == ("sentence-transformers/all-MiniLM-L6-v2", ["c"])
+    mock_model.encode.assert_not_called()
+
+
+def test_embeddings_fall_back_to_local_model_when_server_is_down():
+    """Test in-process inference while the embedding server is unreachable."""
+    client = MagicMock()
+    client.encode.side_effect = EmbeddingServerUnavailable("down")
+
+    with patch('embedding_utils.embedding_client', client), patch('embedding_utils.model') as mock_model:
+        mock_model.encode.return_value = [0.7, 0.8]
+        assert generate_embedding("text") == [0.7, 0.8]
+        mock_model.encode.assert_called_once_with("text")
+
+
 if __name__ == "__main__":
     pytest.main()
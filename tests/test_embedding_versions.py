@@ -0,0 +1,83 @@
+import pytest
+from embedding_versions import (
+    EmbeddingRegistry, DEFAULT_EMBEDDING_MODEL, validate_version, versioned_collection_name
+)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """Registry backed by a file in a temporary directory."""
+    return EmbeddingRegistry(str(tmp_path / "registry" / "embedding_versions.json"))
+
+
+def test_defaults_without_registry_file(registry):
+    """Test that a deployment without a registry serves version v1 with the original model."""
+    assert registry.active_version() == "v1"
+    assert registry.model_for("v1") == DEFAULT_EMBEDDING_MODEL
+    assert registry.writable_versions() == ["v1"]
+
+
+def test_versioned_collection_name():
+    """Test that v1 keeps the original collection names."""
+    assert versioned_collection_name("resume_collection", "v1") == "resume_collection"
+    assert versioned_collection_name("resume_collection", "v2") == "resume_collection__v2"
+
+    with pytest.raises(ValueError):
+        validate_version("latest")
+
+
+def test_building_version_receives_writes_but_not_reads(registry):
+    """Test that a registered version is written to while v1 still serves reads."""
+    registry.register("v2", "intfloat/e5-small-v2")
+
+    assert registry.active_version() == "v1"
+    assert registry.writable_versions() == ["v1", "v2"]
+    assert registry.model_for("v2") == "intfloat/e5-small-v2"
+
+    with pytest.raises(ValueError):
+        registry.activate("v2")
+
+
+def test_register_keeps_progress_and_refuses_other_model(registry):
+    """Test that re-registering a version resumes it, and its model cannot change."""
+    registry.register("v2", "model-a")
+    registry.update_progress("v2", candidates_last_id=42)
+    registry.register("v2", "model-a")
+
+    assert registry.version_info("v2")["progress"] == {"candidates_last_id": 42}
+    with pytest.raises(ValueError):
+        registry.register("v2", "model-b")
+
+
+def test_activate_and_roll_back(registry):
+    """Test switching reads to a ready version and back again."""
+    registry.register("v2", "model-a")
+    registry.mark_ready("v2")
+    registry.activate("v2")
+
+    assert registry.active_version() == "v2"
+    assert registry.writable_versions() == ["v2", "v1"]
+
+    registry.activate("v1")
+    assert registry.active_version() == "v1"
+
+    registry.retire("v2")
+    assert registry.writable_versions() == ["v1"]
+    with pytest.raises(ValueError):
+        registry.retire("v1")
+
+
+def test_switch_is_visible_to_other_instances(registry):
+    """Test that another worker's registry instance picks up the switch from the file."""
+    other = EmbeddingRegistry(registry.path)
+    assert other.active_version() == "v1"
+
+    registry.register("v2", "model-a")
+    registry.mark_ready("v2")
+    registry.activate("v2")
+
+    assert other.active_version() == "v2"
+
+
+if __name__ == "__main__":
+    pytest.main()
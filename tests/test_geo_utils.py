@@ -0,0 +1,51 @@
+import random
+import pytest
+from geo_utils import geocode, geohash_encode, geohash_cover, haversine_km, location_fields, normalize_place
+
+
+def test_geocode_matches_names_aliases_and_parts():
+    """Test that spelling variants and "city, country" strings resolve through the gazetteer."""
+    assert geocode("Baku")[0] == "Baku"
+    assert geocode("  BAKI ")[0] == "Baku"
+    assert geocode("Bakı, Azerbaijan")[0] == "Baku"
+    assert geocode("Gəncə")[0] == "Ganja"
+    assert geocode("Remote") is None
+    assert geocode(None) is None
+    assert normalize_place("São Paulo") == "sao paulo"
+
+
+def test_geohash_encode_known_value():
+    """Test geohash encoding against a published reference point."""
+    assert geohash_encode(57.64911, 10.40744, precision=11) == "u4pruydqqvj"
+
+
+def test_haversine_baku_ganja():
+    """Test the great-circle distance between two cities (about 300 km)."""
+    _, baku_lat, baku_lon = geocode("Baku")
+    _, ganja_lat, ganja_lon = geocode("Ganja")
+    assert 290 < haversine_km(baku_lat, baku_lon, ganja_lat, ganja_lon) < 320
+
+
+@pytest.mark.parametrize("latitude,longitude,radius_km", [
+    (40.4093, 49.8671, 50), (59.9, 30.3, 5), (0.01, 179.99, 120), (-33.87, 151.2, 800),
+])
+def test_geohash_cover_contains_every_point_in_radius(latitude, longitude, radius_km):
+    """Test that every stored geohash within the radius starts with one of the cover prefixes."""
+    cells = geohash_cover(latitude, longitude, radius_km)
+    rng = random.Random(0)
+    for _ in range(500):
+        point_lat = latitude + rng.uniform(-1, 1) * radius_km / 111.0
+        point_lon = longitude + rng.uniform(-1, 1) * radius_km / 30.0
+        point_lon = (point_lon + 180.0) % 360.0 - 180.0
+        if abs(point_lat) < 90 and haversine_km(latitude, longitude, point_lat, point_lon) <= radius_km:
+            assert any(geohash_encode(point_lat, point_lon).startswith(cell) for cell in cells)
+
+
+def test_location_fields_of_unknown_location_are_empty():
+    """Test that an unknown location stores no coordinates."""
+    assert location_fields("Atlantis") == {"latitude": None, "longitude": None, "geohash": None}
+    assert location_fields("Baku")["geohash"].startswith("tp5")
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -1,7 +1,7 @@
 import pytest
 import numpy as np
 from unittest.mock import patch, MagicMock
-from job_matching import calculate_ats_score
+from job_matching import calculate_ats_score, rank_jobs_for_resume, find_similar_candidates, filter_by_attributes
 
 
 def test_calculate_ats_score_success():
@@ -143,5 +143,147 @@ def test_calculate_ats_score_different_dimensions():
         assert 0 <= result[0]['score'] <= 1
 
 
+def test_calculate_ats_score_uses_snapshot_when_enabled():
+    """Test that matching scores against the memory-mapped snapshot when enabled."""
+    job_embedding = np.array([1.0, 0.0])
+
+    with patch('job_matching.RESUME_SNAPSHOT_ENABLED', True), \
+         patch('job_matching.search_resume_chroma') as mock_search, \
+         patch('job_matching.load_resume_snapshot') as mock_load, \
+         patch('job_matching.top_k') as mock_top_k, \
+         patch('job_matching.get_resume_metadatas') as mock_metadatas:
+        mock_top_k.return_value = [('candidate2', 0.9), ('candidate1', 0.4)]
+        mock_metadatas.return_value = {
+            'candidate1': {'name': 'John Doe'},
+            'candidate2': {'name': 'Jane Smith'}
+        }
+
+        result = calculate_ats_score(job_embedding, version='v2')
+
+        mock_search.assert_not_called()
+        mock_top_k.assert_called_once_with(mock_load.return_value, job_embedding, k=10, rows=None)
+        assert mock_metadatas.call_args.kwargs['version'] == 'v2'
+        assert [c['candidate_id'] for c in result] == ['candidate2', 'candidate1']
+        assert result[0]['metadata'] == {'name': 'Jane Smith'}
+        assert result[0]['score'] == 0.9
+
+
+def test_calculate_ats_score_reranks_projected_shortlist():
+    """Test that with a projection the snapshot is scored only on the first-pass shortlist."""
+    job_embedding = np.array([1.0, 0.0])
+    projection = MagicMock(source_dim=2)
+
+    with patch('job_matching.RESUME_SNAPSHOT_ENABLED', True), \
+         patch('job_matching.PROJECTION_ENABLED', True), \
+         patch('job_matching.load_resume_snapshot') as mock_load, \
+         patch('job_matching.load_resume_projection', return_value=projection), \
+         patch('job_matching.first_pass_rows', return_value=np.array([3, 7])) as mock_first_pass, \
+         patch('job_matching.top_k', return_value=[('candidate7', 0.8)]) as mock_top_k, \
+         patch('job_matching.get_resume_metadatas', return_value={}):
+        mock_load.return_value.dim = 2
+        result = calculate_ats_score(job_embedding, k=5)
+
+    mock_first_pass.assert_called_once_with(mock_load.return_value, projection, job_embedding, 100)
+    assert mock_top_k.call_args.kwargs["rows"].tolist() == [3, 7]
+    assert [match['candidate_id'] for match in result] == ['candidate7']
+
+
+def test_calculate_ats_score_preselects_by_filters():
+    """Test that skill/location filters score only the pre-selected candidates."""
+    job_embedding = np.array([1.0, 0.0])
+    records = {
+        'ids': ['candidate1', 'candidate2'],
+        'embeddings': [[0.0, 1.0], [1.0, 0.1]],
+        'metadatas': [{'name': 'John Doe'}, {'name': 'Jane Smith'}]
+    }
+
+    with patch('job_matching.find_candidate_ids', return_value=['candidate1', 'candidate2']) as mock_find, \
+         patch('job_matching.get_resume_records', return_value=records) as mock_records, \
+         patch('job_matching.search_resume_chroma') as mock_search:
+        result = calculate_ats_score(job_embedding, tenant="acme", skills=["python"], location="Baku")
+
+    mock_find.assert_called_once_with("acme", location="Baku", skills=["python"], near=None)
+    mock_records.assert_called_once_with(['candidate1', 'candidate2'], tenant="acme", version=None)
+    mock_search.assert_not_called()
+    assert [match['candidate_id'] for match in result] == ['candidate2', 'candidate1']
+
+
+def test_rank_jobs_for_resume():
+    """Test that jobs are ranked for a resume against the cached job matrix."""
+    records = {'ids': ['r-1'], 'embeddings': [[1.0, 0.0]], 'metadatas': [{}]}
+    jobs = {
+        "ids": ['job1', 'job2', 'job3'],
+        "matrix": np.array([[0.0, 1.0], [1.0, 0.0], [0.6, 0.8]], dtype=np.float32),
+        "metadatas": [{'title': 'A'}, {'title': 'B'}, {'title': 'C'}],
+    }
+
+    with patch('job_matching.get_resume_records', return_value=records), \
+         patch('job_matching.load_job_matrix', return_value=jobs):
+        result = rank_jobs_for_resume('r-1', k=2, tenant="acme")
+
+    assert [match['job_id'] for match in result] == ['job2', 'job3']
+    assert result[0]['job_title'] == 'B'
+    assert result[1]['score'] == pytest.approx(0.6)
+
+
+def test_rank_jobs_for_unknown_resume():
+    """Test that an unknown resume yields None."""
+    with patch('job_matching.get_resume_records', return_value={'ids': [], 'embeddings': [], 'metadatas': []}):
+        assert rank_jobs_for_resume('missing') is None
+
+
+def test_find_similar_candidates_queries_centroid_and_excludes_seeds():
+    """Test that seeds' stored vectors are averaged into one query and the seeds are left out."""
+    records = {'ids': ['r-1', 'r-2'], 'embeddings': [[2.0, 0.0], [0.0, 1.0]], 'metadatas': [{}, {}]}
+    matches = [
+        {"candidate_id": "r-1", "score": 0.9, "metadata": {}},
+        {"candidate_id": "r-3", "score": 0.8, "metadata": {}},
+        {"candidate_id": "r-2", "score": 0.7, "metadata": {}},
+        {"candidate_id": "r-4", "score": 0.6, "metadata": {}},
+    ]
+
+    with patch('job_matching.get_resume_records', return_value=records), \
+         patch('job_matching.calculate_ats_score', return_value=matches) as mock_calculate:
+        result = find_similar_candidates(['r-1', 'r-2', 'gone'], k=2, tenant="acme")
+
+    assert [match["candidate_id"] for match in result] == ["r-3", "r-4"]
+    centroid = mock_calculate.call_args.args[0]
+    assert centroid.tolist() == pytest.approx([0.5, 0.5])
+    assert mock_calculate.call_args.kwargs == {"tenant": "acme", "version": None, "k": 4}
+
+
+def test_filter_by_attributes_masks_ranges_and_unknowns():
+    """Test range predicates over the attribute index, with unknown values never matching."""
+    rows = [[("r-1", 8.0, 3, 4), ("r-2", 3.0, 2, None), ("r-3", None, None, 2)]]
+
+    with patch('job_matching.iter_candidate_attributes', return_value=rows) as mock_iter, \
+         patch('job_matching._attribute_indexes', {}), \
+         patch('job_matching.candidate_generations', {"acme": 1}) as generations:
+        assert filter_by_attributes("acme", min_years=3) == ["r-1", "r-2"]
+        assert filter_by_attributes("acme", max_years=5, min_seniority=2) == ["r-2"]
+        assert filter_by_attributes("acme", min_degree=2) == ["r-1", "r-3"]
+        assert mock_iter.call_count == 1
+
+        generations["acme"] = 2
+        filter_by_attributes("acme")
+        assert mock_iter.call_count == 2
+
+
+def test_calculate_ats_score_intersects_attributes_with_filters():
+    """Test that the attribute mask narrows the pre-selection before scoring."""
+    records = {'ids': ['candidate2'], 'embeddings': [[1.0, 0.0]], 'metadatas': [{}]}
+
+    with patch('job_matching.filter_by_attributes', return_value=['candidate2', 'candidate3']) as mock_filter, \
+         patch('job_matching.find_candidate_ids', return_value=['candidate1', 'candidate2']), \
+         patch('job_matching.get_resume_records', return_value=records) as mock_records:
+        result = calculate_ats_score(
+            np.array([1.0, 0.0]), tenant="acme", location="Baku", attributes={"min_years": 5}
+        )
+
+    mock_filter.assert_called_once_with("acme", min_years=5)
+    mock_records.assert_called_once_with(['candidate2'], tenant="acme", version=None)
+    assert [match['candidate_id'] for match in result] == ['candidate2']
+
+
 if __name__ == "__main__":
     pytest.main()
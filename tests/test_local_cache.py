@@ -0,0 +1,106 @@
+import pytest
+from local_cache import SqliteCache, LruCache, TieredCache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    """Path of a cache database in a temporary directory."""
+    return str(tmp_path / "cache" / "cache.sqlite3")
+
+
+def test_set_and_get_roundtrip(cache_path):
+    """Test storing and reading back a JSON value."""
+    cache = SqliteCache(cache_path)
+    cache.set("key", {"skills": ["Python"], "experience": "5 years"})
+
+    assert cache.get("key") == {"skills": ["Python"], "experience": "5 years"}
+    assert cache.get("missing") is None
+
+
+def test_cache_is_shared_between_instances(cache_path):
+    """Test that another process-level instance on the same file sees the entry."""
+    SqliteCache(cache_path).set("key", [1, 2])
+
+    assert SqliteCache(cache_path).get("key") == [1, 2]
+
+
+def test_expired_entries_are_missing(cache_path, monkeypatch):
+    """Test the time-to-live of entries."""
+    now = [1000.0]
+    monkeypatch.setattr("local_cache.time.time", lambda: now[0])
+    cache = SqliteCache(cache_path, ttl_seconds=60)
+    cache.set("old", 1)
+    now[0] += 30
+    cache.set("new", 2)
+    now[0] += 40
+
+    assert cache.get("old") is None
+    assert cache.get("new") == 2
+    assert len(cache) == 1
+
+
+def test_purge_expired(cache_path, monkeypatch):
+    """Test removing all expired entries at once."""
+    now = [1000.0]
+    monkeypatch.setattr("local_cache.time.time", lambda: now[0])
+    cache = SqliteCache(cache_path, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    now[0] += 61
+    cache.set("c", 3)
+
+    assert cache.purge_expired() == 2
+    assert len(cache) == 1
+
+
+def test_least_recently_used_entries_are_evicted(cache_path, monkeypatch):
+    """Test size-bounded eviction keeps the most recently used entries."""
+    now = [1000.0]
+    monkeypatch.setattr("local_cache.time.time", lambda: now[0])
+    cache = SqliteCache(cache_path, max_entries=2)
+    cache.set("a", 1)
+    now[0] += 1
+    cache.set("b", 2)
+    now[0] += 1
+    cache.get("a")
+    now[0] += 1
+    cache.set("c", 3)
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_lru_cache_evicts_least_recently_used_and_expires(monkeypatch):
+    """Test the in-process tier's size bound and time-to-live."""
+    now = [1000.0]
+    monkeypatch.setattr("local_cache.time.monotonic", lambda: now[0])
+    cache = LruCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    now[0] += 61
+    assert cache.get("c") is None
+
+
+def test_tiered_cache_reads_through_and_deletes_everywhere(cache_path):
+    """Test that a shared-tier hit fills the local tier and deletes reach both tiers."""
+    shared = SqliteCache(cache_path)
+    shared.set("key", {"name": "Ann"})
+    cache = TieredCache(LruCache(), shared)
+
+    assert cache.get("key") == {"name": "Ann"}
+    assert cache.local.get("key") == {"name": "Ann"}
+
+    cache.delete("key")
+    assert cache.get("key") is None
+    assert shared.get("key") is None
+
+
+if __name__ == "__main__":
+    pytest.main()
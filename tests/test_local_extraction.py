@@ -0,0 +1,124 @@
+import zipfile
+import pytest
+from local_extraction import (
+    extract_resume, extract_resume_locally, split_sections, parse_skills
+)
+
+RESUME_LINES = [
+    "John Doe",
+    "Summary",
+    "Backend engineer who likes reliable systems and clear documentation for every service.",
+    "Work Experience",
+    "Senior Backend Developer, Acme Corp, 2019 - 2024",
+    "Built payment APIs in Python and Go serving two million requests per day.",
+    "Education",
+    "BSc Computer Science, Baku State University, 2015",
+    "Technical Skills",
+    "Python, Go, PostgreSQL",
+    "Docker | Kubernetes",
+]
+
+
+def _docx(path, lines):
+    namespace = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    body = "".join(f"<w:p><w:r><w:t>{line}</w:t></w:r></w:p>" for line in lines)
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", f'<w:document xmlns:w="{namespace}"><w:body>{body}</w:body></w:document>')
+    return str(path)
+
+
+def _pdf(path, lines):
+    content = "BT /F1 10 Tf 14 TL 40 800 Td " + " ".join(f"({line}) Tj T*" for line in lines) + " ET"
+    objects = [
+        "<< /Type /Catalog /Pages 2 0 R >>",
+        "<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] /Contents 4 0 R "
+        "/Resources << /Font << /F1 5 0 R >> >> >>",
+        f"<< /Length {len(content)} >>\nstream\n{content}\nendstream",
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(data))
+        data += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(data)
+    data += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    data += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode("latin-1")
+    data += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as pdf_file:
+        pdf_file.write(data)
+    return str(path)
+
+
+def test_split_sections_and_parse_skills():
+    """Test grouping lines under known headings and splitting the skills list."""
+    sections = split_sections("\n".join(RESUME_LINES))
+
+    assert sections["experience"][0] == "Senior Backend Developer, Acme Corp, 2019 - 2024"
+    assert sections["education"] == ["BSc Computer Science, Baku State University, 2015"]
+    assert parse_skills(sections["skills"]) == ["Python", "Go", "PostgreSQL", "Docker", "Kubernetes"]
+
+
+def test_parse_skills_strips_labels_and_duplicates():
+    """Test category labels and repeated skills in a skills section."""
+    assert parse_skills(["Languages: Python, SQL", "• python • Rust"]) == ["Python", "SQL", "Rust"]
+
+
+def test_extract_resume_from_docx_is_confident(tmp_path):
+    """Test that a well-structured DOCX is extracted locally with full confidence."""
+    data, confidence = extract_resume(_docx(tmp_path / "resume.docx", RESUME_LINES), "docx")
+
+    assert confidence == pytest.approx(1.0)
+    assert "Acme Corp" in data["experience"]
+    assert data["education"].startswith("BSc Computer Science")
+    assert "Kubernetes" in data["skills"]
+
+
+def test_extract_resume_missing_sections_lowers_confidence(tmp_path):
+    """Test that a document without recognizable sections is not trusted."""
+    path = _docx(tmp_path / "letter.docx", ["Dear hiring manager,", "I would love to join your team."])
+
+    data, confidence = extract_resume(path, "docx")
+
+    assert confidence == pytest.approx(0.2)
+    assert data["skills"] == []
+
+
+def test_extract_resume_from_pdf_text_layer(tmp_path):
+    """Test local extraction from a PDF with a text layer."""
+    pytest.importorskip("pypdf")
+
+    data, confidence = extract_resume(_pdf(tmp_path / "resume.pdf", RESUME_LINES), "pdf")
+
+    assert confidence == pytest.approx(1.0)
+    assert "Python" in data["skills"]
+
+
+def test_extract_resume_scanned_pdf_has_zero_confidence(tmp_path):
+    """Test that a PDF without a usable text layer is left to LlamaExtract."""
+    pytest.importorskip("pypdf")
+
+    _, confidence = extract_resume(_pdf(tmp_path / "scan.pdf", ["Page 1"]), "pdf")
+
+    assert confidence == 0.0
+
+
+def test_extract_resume_unreadable_file(tmp_path):
+    """Test that a corrupt file yields zero confidence instead of raising."""
+    path = tmp_path / "broken.docx"
+    path.write_bytes(b"PK\x03\x04 not really a zip")
+
+    assert extract_resume(str(path), "docx")[1] == 0.0
+
+
+def test_extract_resume_locally_runs_in_process_pool(tmp_path):
+    """Test the process-pool entry point used by resume parsing."""
+    data, confidence = extract_resume_locally(_docx(tmp_path / "resume.docx", RESUME_LINES), "docx")
+
+    assert confidence == pytest.approx(1.0)
+    assert "Go" in data["skills"]
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,183 @@
+import json
+import pytest
+from unittest.mock import patch
+from database_integration import Candidate, Job, OutboxEntry
+from outbox import record_write, record_merge, abort_write, retry_pending, reconcile, OUTBOX_MAX_ATTEMPTS
+
+
+@pytest.fixture
+def session_modules():
+    """The outbox shares db_session with the database helpers."""
+    return ["outbox"]
+
+
+def stale(db_session, entry):
+    """Make an entry old enough for the retry sweep and the reconciliation grace window."""
+    entry.updated_at = 0
+    db_session.commit()
+    return entry
+
+
+def test_retry_rolls_forward_upload_that_reached_chroma(db_session):
+    """Test that an upload which died after the Chroma write gets its PostgreSQL row."""
+    entry = stale(db_session, record_write("resume_save", "r1", payload={"name": "John", "location": "Baku"}))
+    metadata = {"name": "John", "experience": "Python", "education": "BSc", "skills": ["Python"]}
+
+    with patch('outbox.get_resume_metadatas', return_value={"r1": metadata}):
+        assert retry_pending() == {"applied": 1, "failed": 0}
+
+    candidate = db_session.query(Candidate).filter_by(unique_id="r1").one()
+    assert candidate.name == "John"
+    assert candidate.experience == "Python"
+    assert "Experience: Python" in candidate.embedding_text
+    assert entry.status == "done"
+
+
+def test_retry_drops_upload_that_never_reached_chroma(db_session):
+    """Test that an upload that failed before the Chroma write leaves nothing behind."""
+    entry = stale(db_session, record_write("resume_save", "r1", payload={"name": "John"}))
+
+    with patch('outbox.get_resume_metadatas', return_value={}):
+        retry_pending()
+
+    assert db_session.query(Candidate).count() == 0
+    assert entry.status == "done"
+
+
+def test_retry_finishes_interrupted_delete(db_session):
+    """Test that a delete interrupted between the stores is applied to both."""
+    db_session.add(Candidate(unique_id="r1", name="John"))
+    entry = stale(db_session, record_write("resume_delete", "r1"))
+
+    with patch('outbox.delete_resume_from_chroma') as mock_delete:
+        retry_pending()
+
+    mock_delete.assert_called_once_with("r1", tenant="default")
+    assert db_session.query(Candidate).count() == 0
+    assert entry.status == "done"
+
+
+def test_interrupted_merge_is_undone_from_the_previous_row(db_session):
+    """Test that a merge which died after its Chroma write puts the existing candidate's resume back."""
+    db_session.add(Candidate(unique_id="r1", name="John", location="Baku", experience="Go", embedding_text="Experience: Go"))
+    db_session.commit()
+    entry = record_write("resume_save", "fresh-id", payload={"name": "Johnny", "location": "Paris"})
+    record_merge(entry, "r1")
+    stale(db_session, entry)
+
+    with patch('outbox.generate_embedding', return_value=[0.1]) as mock_embed, \
+         patch('outbox.update_resume_in_chroma') as mock_update:
+        assert retry_pending() == {"applied": 1, "failed": 0}
+
+    assert (entry.operation, entry.unique_id, entry.status) == ("resume_merge", "r1", "done")
+    assert mock_embed.call_args.args[0] == "Experience: Go"
+    assert mock_update.call_args.kwargs["unique_id"] == "r1"
+    assert mock_update.call_args.kwargs["metadata"]["name"] == "John"
+    assert db_session.query(Candidate).filter_by(unique_id="r1").one().name == "John"
+
+
+def test_aborted_merge_restores_instead_of_deleting(db_session):
+    """Test that a failed merge never deletes the existing candidate's vector."""
+    db_session.add(Candidate(unique_id="r1", name="John", embedding_text="Experience: Go"))
+    db_session.commit()
+    entry = record_merge(record_write("resume_save", "fresh-id", payload={"name": "Johnny"}), "r1")
+
+    with patch('outbox.generate_embedding', return_value=[0.1]), \
+         patch('outbox.update_resume_in_chroma') as mock_update, \
+         patch('outbox.delete_resume_from_chroma') as mock_delete:
+        abort_write(entry)
+
+    mock_delete.assert_not_called()
+    assert mock_update.call_args.kwargs["unique_id"] == "r1"
+    assert entry.status == "done"
+
+
+def test_retry_recreates_both_sides_of_a_job(db_session):
+    """Test that a journaled job is written to Chroma and PostgreSQL from its payload."""
+    payload = {"title": "Engineer", "description": "Build APIs"}
+    entry = stale(db_session, record_write("job_save", "j1", tenant="acme", payload=payload))
+
+    with patch('outbox.get_job_metadatas', return_value={}), \
+         patch('outbox.generate_embedding', return_value=[0.1]), \
+         patch('outbox.add_to_job_chroma') as mock_add:
+        retry_pending()
+
+    assert mock_add.call_args.kwargs["unique_id"] == "j1"
+    assert mock_add.call_args.kwargs["tenant"] == "acme"
+    assert db_session.query(Job).filter_by(tenant_id="acme", unique_id="j1").one().title == "Engineer"
+    assert entry.status == "done"
+
+
+def test_retry_gives_up_after_max_attempts(db_session):
+    """Test that an entry that keeps failing is marked failed with its error."""
+    entry = stale(db_session, record_write("resume_delete", "r1"))
+
+    with patch('outbox.delete_resume_from_chroma', side_effect=RuntimeError("chroma down")):
+        for _ in range(OUTBOX_MAX_ATTEMPTS):
+            assert retry_pending() == {"applied": 0, "failed": 1}
+            entry.updated_at = 0
+            db_session.commit()
+
+    assert entry.status == "failed"
+    assert entry.attempts == OUTBOX_MAX_ATTEMPTS
+    assert entry.last_error == "chroma down"
+
+
+def test_recent_entries_are_not_retried(db_session):
+    """Test that writes still in flight are left to their request."""
+    record_write("resume_delete", "r1")
+
+    with patch('outbox.delete_resume_from_chroma') as mock_delete:
+        assert retry_pending() == {"applied": 0, "failed": 0}
+
+    mock_delete.assert_not_called()
+
+
+def test_reconcile_repairs_drift(db_session):
+    """Test that orphaned vectors are deleted and rows without vectors are re-embedded."""
+    db_session.add_all([
+        Candidate(unique_id="both", name="A"),
+        Candidate(unique_id="no-vector", name="B", embedding_text="Experience: Go"),
+        Candidate(unique_id="in-flight", name="C"),
+    ])
+    db_session.commit()
+    record_write("resume_delete", "in-flight")
+    record_write("resume_save", "uploading")
+    chroma_ids = [{'ids': ["both", "orphan", "uploading"]}]
+
+    with patch('outbox.iter_resume_batches', return_value=chroma_ids), \
+         patch('outbox.iter_job_batches', return_value=[]), \
+         patch('outbox.delete_resume_from_chroma') as mock_delete, \
+         patch('outbox.generate_embedding', return_value=[0.1]) as mock_embed, \
+         patch('outbox.add_to_resume_chroma') as mock_add:
+        report = reconcile(batch_size=2)
+
+    assert report["resumes"] == {"chroma_orphans": 1, "missing_vectors": 1}
+    assert report["jobs"] == {"chroma_orphans": 0, "missing_vectors": 0}
+    mock_delete.assert_called_once_with("orphan", tenant="default")
+    assert mock_embed.call_args.args[0] == "Experience: Go"
+    assert mock_add.call_args.kwargs["unique_id"] == "no-vector"
+
+
+def test_reconcile_dry_run_only_reports(db_session):
+    """Test that a dry run changes neither store."""
+    with patch('outbox.iter_resume_batches', return_value=[{'ids': ["orphan"]}]), \
+         patch('outbox.iter_job_batches', return_value=[]), \
+         patch('outbox.delete_resume_from_chroma') as mock_delete:
+        report = reconcile(dry_run=True)
+
+    assert report["resumes"]["chroma_orphans"] == 1
+    mock_delete.assert_not_called()
+
+
+def test_record_write_stores_payload(db_session):
+    """Test that the journal keeps what is needed to redo the write."""
+    record_write("job_save", "j1", payload={"title": "Engineer", "description": "Build APIs"})
+
+    entry = db_session.query(OutboxEntry).one()
+    assert entry.status == "pending"
+    assert json.loads(entry.payload)["title"] == "Engineer"
+
+
+if __name__ == "__main__":
+    pytest.main()
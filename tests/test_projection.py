@@ -0,0 +1,100 @@
+import os
+import pytest
+import numpy as np
+from embedding_snapshot import write_snapshot, load_snapshot, update_snapshot, top_k
+from projection import fit_projection, load_projection, first_pass_rows, projection_report
+
+
+def _low_rank_embeddings(count=500, dim=32, rank=4, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.normal(size=(count, rank)) @ rng.normal(size=(rank, dim)) + 0.01 * rng.normal(size=(count, dim))).astype(np.float32)
+
+
+def test_fit_projection_captures_low_rank_structure():
+    """Test that a few components explain embeddings lying near a low-dimensional subspace."""
+    projection = fit_projection(_low_rank_embeddings(), 6, embedding_version="v1")
+
+    assert projection.dim == 6 and projection.source_dim == 32
+    assert projection.explained_variance_ratio[:4].sum() > 0.95
+    reduced = projection.transform(_low_rank_embeddings(count=3, seed=1))
+    assert reduced.shape == (3, 6)
+    assert np.allclose(np.linalg.norm(reduced, axis=1), 1.0, atol=1e-5)
+    assert projection.truncated(2).dim == 2
+
+
+def test_fit_projection_rejects_bad_dimensions():
+    """Test that impossible target dimensions are rejected."""
+    with pytest.raises(ValueError):
+        fit_projection(_low_rank_embeddings(count=10), 64)
+    with pytest.raises(ValueError):
+        fit_projection(_low_rank_embeddings(count=1), 2)
+
+
+def test_projection_save_load_and_refit(tmp_path):
+    """Test that a saved projection round-trips and a refit on disk is picked up."""
+    path = str(tmp_path / "resume_snapshot.bin.projection.npz")
+    assert load_projection(path) is None
+
+    first = fit_projection(_low_rank_embeddings(), 4, embedding_version="v1")
+    first.save(path)
+    loaded = load_projection(path)
+    assert loaded.fit_id == first.fit_id
+    assert loaded.embedding_version == "v1"
+    assert load_projection(path) is loaded
+
+    second = fit_projection(_low_rank_embeddings(seed=3), 4, embedding_version="v1")
+    second.save(path)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+    assert load_projection(path).fit_id == second.fit_id
+    assert [name for name in os.listdir(tmp_path) if name.endswith(".tmp")] == []
+
+
+def test_first_pass_shortlist_reranked_exactly(tmp_path):
+    """Test that re-ranking the reduced-space shortlist finds the exact best matches, including delta rows."""
+    path = str(tmp_path / "resume_snapshot.bin")
+    embeddings = _low_rank_embeddings(count=400)
+    write_snapshot(path, [f"id-{i}" for i in range(400)], embeddings)
+    update_snapshot(path, add_ids=["new"], add_embeddings=embeddings[5:6] * 2)
+    snapshot = load_snapshot(path)
+    projection = fit_projection(embeddings, 8)
+
+    query = embeddings[5]
+    rows = first_pass_rows(snapshot, projection, query, shortlist=40)
+
+    assert len(rows) == 41 and snapshot.base_count in rows
+    exact = top_k(snapshot, query, k=5)
+    assert top_k(snapshot, query, k=5, rows=rows) == exact
+    assert "new" in [candidate_id for candidate_id, _ in exact]
+
+
+def test_first_pass_skips_deleted_base_rows(tmp_path):
+    """Test that deleted rows in the reduced-space top-k do not crowd live rows out of the shortlist."""
+    path = str(tmp_path / "resume_snapshot.bin")
+    embeddings = _low_rank_embeddings(count=400)
+    write_snapshot(path, [f"id-{i}" for i in range(400)], embeddings)
+    snapshot = load_snapshot(path)
+    projection = fit_projection(embeddings, 8)
+    query = embeddings[5]
+    closest = first_pass_rows(snapshot, projection, query, shortlist=10)[:10]
+    update_snapshot(path, remove_ids=[snapshot.id_at(int(row)) for row in closest])
+    snapshot = load_snapshot(path)
+
+    rows = first_pass_rows(snapshot, projection, query, shortlist=10)
+
+    assert len(rows) == 10 and not set(rows.tolist()) & set(closest.tolist())
+    assert len(top_k(snapshot, query, k=10, rows=rows)) == 10
+
+
+def test_projection_report_recall_by_dimension():
+    """Test the speed/recall report: more dimensions never lose recall on this data."""
+    embeddings = _low_rank_embeddings(count=600, rank=6)
+    report = projection_report(embeddings, embeddings[:20], dims=(2, 8), k=5, shortlist_factor=2)
+
+    assert [row["dim"] for row in report] == [2, 8]
+    assert report[1]["recall"] == pytest.approx(1.0)
+    assert report[0]["explained_variance"] < report[1]["explained_variance"]
+    assert report[0]["mean_ms"] >= 0 and report[0]["exact_mean_ms"] >= 0
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,108 @@
+import pytest
+import numpy as np
+from unittest.mock import patch, MagicMock
+from database_integration import Candidate, Job
+from embedding_versions import EmbeddingRegistry
+from reembed import reembed
+
+
+@pytest.fixture
+def session_modules():
+    """reembed reads the rows through db_session."""
+    return ["reembed"]
+
+
+@pytest.fixture
+def db_session(db_session):
+    """Session on a database with two candidates and one job."""
+    db_session.add_all([
+        Candidate(tenant_id="default", unique_id="r1", embedding_text="Experience: Python"),
+        Candidate(tenant_id="acme", unique_id="r2"),
+        Candidate(tenant_id="default", unique_id="deleted"),
+        Job(tenant_id="default", unique_id="j1", title="Engineer", description="Build APIs"),
+    ])
+    db_session.commit()
+    return db_session
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """Empty embedding registry shared by reembed and the embedding functions."""
+    registry = EmbeddingRegistry(str(tmp_path / "embedding_versions.json"))
+    with patch('reembed.registry', registry):
+        yield registry
+
+
+@pytest.fixture
+def chroma():
+    """Stored resume metadata per tenant and mocked Chroma writes."""
+    stored = {
+        "default": {"r1": {"name": "John", "experience": "Python"}},
+        "acme": {"r2": {"name": "Jane", "experience": "Go", "education": "BSc", "skills": ["Go"]}},
+    }
+    job_collection = MagicMock()
+    with patch('reembed.get_resume_metadatas',
+               side_effect=lambda ids, tenant, version: {i: stored[tenant][i] for i in ids if i in stored[tenant]}), \
+         patch('reembed.upsert_resume_batch') as mock_upsert, \
+         patch('reembed.delete_resumes_from_chroma') as mock_delete, \
+         patch('reembed.get_job_collection', return_value=job_collection), \
+         patch('reembed.rebuild_resume_snapshot'), \
+         patch('reembed.generate_embeddings',
+               side_effect=lambda texts, version: np.ones((len(texts), 3), dtype=np.float32)) as mock_embed:
+        yield {"upsert": mock_upsert, "delete": mock_delete, "jobs": job_collection, "embed": mock_embed, "stored": stored}
+
+
+def test_reembed_builds_new_version(db_session, registry, chroma):
+    """Test that every stored resume and job is embedded with the new version's model."""
+    progress = reembed("v2", "model-b", batch_size=2, throttle=0)
+
+    upserted = {call.kwargs["tenant"]: call.args for call in chroma["upsert"].call_args_list}
+    assert upserted["default"][0] == ["r1"]
+    assert upserted["acme"][0] == ["r2"]
+    assert upserted["acme"][2] == [{"name": "Jane", "experience": "Go", "education": "BSc", "skills": ["Go"]}]
+    assert all(call.kwargs["version"] == "v2" for call in chroma["upsert"].call_args_list)
+
+    embedded = [text for call in chroma["embed"].call_args_list for text in call.args[0]]
+    assert "Experience: Python" in embedded
+    assert "Experience: Go Education: BSc Skills: ['Go']" in embedded
+
+    chroma["jobs"].upsert.assert_called_once()
+    assert chroma["jobs"].upsert.call_args.kwargs["metadatas"] == [{"title": "Engineer", "description": "Build APIs"}]
+
+    assert progress["candidates_done"] == 2
+    assert progress["candidates_total"] == 3
+    assert progress["jobs_done"] == 1
+    assert registry.version_info("v2")["status"] == "ready"
+    assert registry.active_version() == "v1"
+
+
+def test_reembed_resumes_from_progress(db_session, registry, chroma):
+    """Test that an interrupted build continues after the last finished batch."""
+    registry.register("v2", "model-b")
+    first_id = db_session.query(Candidate).filter_by(unique_id="r1").one().id
+    registry.update_progress("v2", candidates_last_id=first_id, candidates_done=1, candidates_total=3)
+
+    progress = reembed("v2", "model-b", batch_size=10, throttle=0)
+
+    assert [call.args[0] for call in chroma["upsert"].call_args_list] == [["r2"]]
+    assert progress["candidates_done"] == 2
+
+
+def test_reembed_drops_resume_deleted_during_its_batch(db_session, registry, chroma):
+    """Test that a resume deleted while being re-embedded is removed again instead of resurrected."""
+    chroma["upsert"].side_effect = lambda ids, *args, **kwargs: chroma["stored"]["default"].pop("r1", None)
+
+    progress = reembed("v2", "model-b", batch_size=10, throttle=0)
+
+    chroma["delete"].assert_called_once_with(["r1"], tenant="default")
+    assert progress["candidates_done"] == 1
+
+
+def test_reembed_refuses_active_version(db_session, registry, chroma):
+    """Test that the version serving reads cannot be rebuilt in place."""
+    with pytest.raises(ValueError):
+        reembed("v1", "model-b")
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,53 @@
+import pytest
+from unittest.mock import patch
+from resume_attributes import (
+    years_of_experience, seniority_level, degree_level, derive_attributes, SENIORITY_LEVELS, DEGREE_LEVELS
+)
+
+
+def test_years_of_experience_merges_overlapping_ranges():
+    """Test that overlapping date ranges are counted once."""
+    experience = "Backend Developer, Jan 2015 - Dec 2018. Consultant 2017 – 2019."
+    assert years_of_experience(experience) == 5.0
+
+
+def test_years_of_experience_open_range_and_stated_years():
+    """Test ranges ending at present and explicit "N+ years" statements."""
+    with patch('resume_attributes.time.gmtime') as mock_gmtime:
+        mock_gmtime.return_value.tm_year = 2024
+        mock_gmtime.return_value.tm_mon = 1
+        assert years_of_experience("Engineer, Jan 2020 - Present") == 4.1
+    assert years_of_experience("10+ years building payment systems") == 10.0
+    assert years_of_experience("Worked on many projects") is None
+    assert years_of_experience("") is None
+
+
+def test_seniority_from_titles_or_years():
+    """Test that titles win over the years based estimate."""
+    assert seniority_level("Sr. Data Engineer at Acme") == SENIORITY_LEVELS["senior"]
+    assert seniority_level("Tech Lead, 2019 - 2021", years=2) == SENIORITY_LEVELS["lead"]
+    assert seniority_level("Developer", years=6) == SENIORITY_LEVELS["senior"]
+    assert seniority_level("Developer") is None
+
+
+def test_degree_level_takes_highest_degree():
+    """Test that the highest mentioned degree is returned."""
+    assert degree_level("B.Sc. in Physics, M.Sc. in Computer Science") == DEGREE_LEVELS["master"]
+    assert degree_level("PhD, Stanford") == DEGREE_LEVELS["doctorate"]
+    assert degree_level("Bachelor's degree, ADA University") == DEGREE_LEVELS["bachelor"]
+    assert degree_level("High school") is None
+
+
+def test_derive_attributes_accepts_lists():
+    """Test that list valued sections are joined before parsing."""
+    attributes = derive_attributes(["Junior Developer 2021 - 2022"], ["MBA"])
+    assert attributes == {
+        "years_experience": 2.0,
+        "seniority_level": SENIORITY_LEVELS["junior"],
+        "degree_level": DEGREE_LEVELS["master"],
+    }
+    assert derive_attributes(None, None) == {"years_experience": None, "seniority_level": None, "degree_level": None}
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -2,7 +2,105 @@ import pytest
 import tempfile
 import os
 from unittest.mock import patch, mock_open, MagicMock
-from resume_parsing import parse_resume_with_llm
+from local_cache import SqliteCache
+from resume_parsing import parse_resume_with_llm, SCHEMA_VERSION
+
+
+@pytest.fixture(autouse=True)
+def extraction_cache(tmp_path):
+    """Use an empty extraction cache per test."""
+    cache = SqliteCache(str(tmp_path / "extraction_cache.sqlite3"))
+    with patch('resume_parsing.extraction_cache', cache):
+        yield cache
+
+
+@pytest.fixture(autouse=True)
+def local_extraction_unsure():
+    """Make the local extractor defer to LlamaExtract unless a test says otherwise."""
+    empty = {"experience": "", "education": "", "skills": []}
+    with patch('resume_parsing.extract_resume_locally', return_value=(empty, 0.0)) as mock_local:
+        yield mock_local
+
+
+@pytest.fixture(autouse=True)
+def no_near_duplicates():
+    """Treat every parsed resume as new unless a test says otherwise."""
+    with patch('resume_parsing.find_near_duplicate', return_value=None) as mock_find:
+        yield mock_find
+
+
+def _mock_extraction(mock_agent):
+    mock_agent.extract.return_value = MagicMock()
+    mock_agent.extract.return_value.data = {
+        "experience": "5 years in software development",
+        "education": "BSc Computer Science",
+        "skills": ["Python", "SQL"]
+    }
+
+
+def test_parse_resume_merges_near_duplicate(no_near_duplicates):
+    """Test that a near-duplicate resume updates the existing candidate instead of adding one."""
+    no_near_duplicates.return_value = "existing-id"
+
+    with patch('resume_parsing.agent') as mock_agent, \
+         patch('resume_parsing.DEDUP_POLICY', 'merge'), \
+         patch('resume_parsing.generate_embedding', return_value=[0.1, 0.2]), \
+         patch('resume_parsing.add_to_resume_chroma') as mock_add_to_chroma, \
+         patch('resume_parsing.get_resume_metadatas', return_value={"existing-id": {"name": "John", "location": "Baku"}}), \
+         patch('resume_parsing.update_resume_in_chroma') as mock_update:
+        _mock_extraction(mock_agent)
+
+        result, embedding = parse_resume_with_llm(b"%PDF-1.4", "John Doe", "New York", "pdf", tenant="acme")
+
+        assert result["unique_id"] == "existing-id"
+        assert result["duplicate_of"] == "existing-id"
+        mock_add_to_chroma.assert_not_called()
+        assert mock_update.call_args.args[0] == "existing-id"
+        # The existing candidate keeps its identity; the resume fields are the upload's.
+        assert mock_update.call_args.args[2]["name"] == "John"
+        assert mock_update.call_args.args[2]["location"] == "Baku"
+        assert mock_update.call_args.args[2]["skills"] == ["Python", "SQL"]
+        assert mock_update.call_args.kwargs["tenant"] == "acme"
+        assert mock_update.call_args.kwargs["version"] == "v1"
+        assert no_near_duplicates.call_args.kwargs["tenant"] == "acme"
+
+
+def test_parse_resume_journals_merge_before_overwriting(no_near_duplicates):
+    """Test that a merge is journaled under the existing candidate before its vector is overwritten."""
+    no_near_duplicates.return_value = "existing-id"
+    calls = MagicMock()
+    entry = MagicMock()
+
+    with patch('resume_parsing.agent') as mock_agent, \
+         patch('resume_parsing.DEDUP_POLICY', 'merge'), \
+         patch('resume_parsing.generate_embedding', return_value=[0.1, 0.2]), \
+         patch('resume_parsing.get_resume_metadatas', return_value={}), \
+         patch('resume_parsing.record_merge', calls.record_merge), \
+         patch('resume_parsing.update_resume_in_chroma', calls.update):
+        _mock_extraction(mock_agent)
+
+        parse_resume_with_llm(b"%PDF-1.4", "John Doe", "New York", "pdf", outbox_entry=entry)
+
+    assert [name for name, *_ in calls.mock_calls] == ["record_merge", "update"]
+    assert calls.record_merge.call_args.args == (entry, "existing-id")
+
+
+def test_parse_resume_rejects_near_duplicate(no_near_duplicates):
+    """Test the reject policy for near-duplicate resumes."""
+    no_near_duplicates.return_value = "existing-id"
+
+    with patch('resume_parsing.agent') as mock_agent, \
+         patch('resume_parsing.DEDUP_POLICY', 'reject'), \
+         patch('resume_parsing.generate_embedding', return_value=[0.1, 0.2]), \
+         patch('resume_parsing.add_to_resume_chroma') as mock_add_to_chroma:
+        _mock_extraction(mock_agent)
+
+        result, embedding = parse_resume_with_llm(b"%PDF-1.4", "John Doe", "New York", "pdf")
+
+        assert "error" in result
+        assert result["duplicate_of"] == "existing-id"
+        assert embedding is None
+        mock_add_to_chroma.assert_not_called()
 
 
 def test_parse_resume_with_valid_pdf():
@@ -27,6 +125,9 @@ def test_parse_resume_with_valid_pdf():
                 assert result["message"] == "Resume parsed successfully"
                 assert result["unique_id"] == "test-unique-id"
                 assert embedding is not None
+                assert (result["years_experience"], result["seniority_level"], result["degree_level"]) == (5.0, 3, 2)
+                metadata = mock_add_to_chroma.call_args.args[1]
+                assert metadata["years_experience"] == 5.0 and metadata["degree_level"] == 2
 
 
 def test_parse_resume_with_valid_docx():
@@ -118,5 +219,89 @@ def test_parse_resume_temp_file_handling(mock_remove, mock_temp_file, mock_open_
                 mock_remove.assert_called_once()
 
 
+def test_parse_resume_reads_spooled_path_in_place():
+    """Test that a spooled upload path is passed to the extractor without another copy."""
+    with patch('resume_parsing.agent') as mock_agent, \
+         patch('resume_parsing.tempfile.NamedTemporaryFile') as mock_temp_file, \
+         patch('resume_parsing.os.remove') as mock_remove, \
+         patch('resume_parsing.generate_embedding', return_value=[0.1, 0.2]), \
+         patch('resume_parsing.add_to_resume_chroma', return_value="test-unique-id"):
+        _mock_extraction(mock_agent)
+
+        result, _ = parse_resume_with_llm("/tmp/upload.pdf", "John Doe", "New York", "pdf")
+
+        assert result["unique_id"] == "test-unique-id"
+        mock_agent.extract.assert_called_once_with("/tmp/upload.pdf")
+        mock_temp_file.assert_not_called()
+        mock_remove.assert_not_called()
+
+
+def test_parse_resume_uses_confident_local_extraction(local_extraction_unsure):
+    """Test that a confident local extraction skips the remote LlamaExtract call."""
+    local_extraction_unsure.return_value = (
+        {"experience": "Backend developer at Acme", "education": "BSc Computer Science", "skills": ["Python"]},
+        0.95
+    )
+
+    with patch('resume_parsing.agent') as mock_agent, \
+         patch('resume_parsing.generate_embedding', return_value=[0.1, 0.2]) as mock_embedding, \
+         patch('resume_parsing.add_to_resume_chroma', return_value="test-unique-id") as mock_add_to_chroma:
+        result, _ = parse_resume_with_llm("/tmp/upload.pdf", "John Doe", "New York", "pdf")
+
+        assert result["unique_id"] == "test-unique-id"
+        mock_agent.extract.assert_not_called()
+        local_extraction_unsure.assert_called_once_with("/tmp/upload.pdf", "pdf")
+        assert "Backend developer at Acme" in mock_embedding.call_args.args[0]
+        assert mock_add_to_chroma.call_args.args[1]["skills"] == ["Python"]
+
+
+def test_parse_resume_falls_back_on_low_confidence(local_extraction_unsure):
+    """Test that a low-confidence local extraction falls back to LlamaExtract."""
+    local_extraction_unsure.return_value = ({"experience": "x", "education": "", "skills": []}, 0.5)
+
+    with patch('resume_parsing.agent') as mock_agent, \
+         patch('resume_parsing.generate_embedding', return_value=[0.1, 0.2]), \
+         patch('resume_parsing.add_to_resume_chroma', return_value="test-unique-id"):
+        _mock_extraction(mock_agent)
+
+        result, _ = parse_resume_with_llm("/tmp/upload.pdf", "John Doe", "New York", "pdf")
+
+        assert result["unique_id"] == "test-unique-id"
+        mock_agent.extract.assert_called_once_with("/tmp/upload.pdf")
+
+
+def test_parse_resume_caches_extraction_by_content_hash(extraction_cache):
+    """Test that a retried upload of the same file reuses the cached extraction."""
+    with patch('resume_parsing.agent') as mock_agent, \
+         patch('resume_parsing.generate_embedding', return_value=[0.1, 0.2]), \
+         patch('resume_parsing.add_to_resume_chroma', return_value="test-unique-id"):
+        _mock_extraction(mock_agent)
+
+        first, _ = parse_resume_with_llm(b"%PDF-1.4 same", "John Doe", "New York", "pdf")
+        second, _ = parse_resume_with_llm(b"%PDF-1.4 same", "John Doe", "New York", "pdf")
+
+        assert first["unique_id"] == second["unique_id"] == "test-unique-id"
+        mock_agent.extract.assert_called_once()
+        assert len(extraction_cache) == 1
+
+
+def test_parse_resume_cache_hit_uses_hash_and_schema_version(extraction_cache, local_extraction_unsure):
+    """Test that a spooled path is looked up by the caller's hash and the schema version."""
+    extraction_cache.set(
+        f"abc123:{SCHEMA_VERSION}",
+        {"experience": "cached experience", "education": "BSc", "skills": ["Go"]}
+    )
+
+    with patch('resume_parsing.agent') as mock_agent, \
+         patch('resume_parsing.generate_embedding', return_value=[0.1, 0.2]) as mock_embedding, \
+         patch('resume_parsing.add_to_resume_chroma', return_value="test-unique-id"):
+        result, _ = parse_resume_with_llm("/tmp/upload.pdf", "John Doe", "New York", "pdf", content_hash="abc123")
+
+        assert result["unique_id"] == "test-unique-id"
+        mock_agent.extract.assert_not_called()
+        local_extraction_unsure.assert_not_called()
+        assert "cached experience" in mock_embedding.call_args.args[0]
+
+
 if __name__ == "__main__":
     pytest.main()
@@ -0,0 +1,74 @@
+import gzip
+import pytest
+import numpy as np
+import orjson
+from unittest.mock import patch, MagicMock
+from serialization import dumps_json, negotiated_response, compress, benchmark, sample_match_response
+
+
+def _request(accept="application/json", accept_encoding=""):
+    request = MagicMock()
+    request.headers = {"accept": accept, "accept-encoding": accept_encoding}
+    return request
+
+
+def test_dumps_json_serializes_numpy_values():
+    """Test that NumPy arrays and scalars are rendered without conversion by the caller."""
+    body = dumps_json({"score": np.float32(0.25), "count": np.int64(3), "vector": np.array([1.0, 2.0], dtype=np.float32)})
+
+    assert orjson.loads(body) == {"score": 0.25, "count": 3, "vector": [1.0, 2.0]}
+
+
+def test_negotiated_response_defaults_to_json():
+    """Test that clients without a MessagePack Accept header get JSON."""
+    response = negotiated_response(_request(), {"results": [{"score": np.float64(0.5)}]})
+
+    assert response.media_type == "application/json"
+    assert orjson.loads(response.body) == {"results": [{"score": 0.5}]}
+    assert response.headers["vary"] == "Accept, Accept-Encoding"
+
+
+def test_negotiated_response_msgpack():
+    """Test that internal clients asking for MessagePack get it."""
+    msgpack = pytest.importorskip("msgpack")
+    response = negotiated_response(_request(accept="application/msgpack"), {"score": np.float32(0.5)})
+
+    assert response.media_type == "application/msgpack"
+    assert msgpack.unpackb(response.body) == {"score": 0.5}
+
+
+def test_negotiated_response_falls_back_to_json_without_msgpack():
+    """Test that a MessagePack Accept header is ignored when msgpack is not installed."""
+    with patch('serialization.msgpack', None):
+        response = negotiated_response(_request(accept="application/msgpack"), {"ok": True})
+
+    assert response.media_type == "application/json"
+
+
+def test_compress_only_large_bodies_the_client_accepts():
+    """Test that compression needs the setting, the client's Accept-Encoding and a large enough body."""
+    body = b"x" * 5000
+
+    with patch('serialization.COMPRESSION_ENABLED', True), \
+         patch('serialization.COMPRESS_MIN_BYTES', 1024), \
+         patch('serialization.brotli', None):
+        compressed, encoding = compress(body, "gzip, deflate")
+        assert encoding == "gzip"
+        assert gzip.decompress(compressed) == body
+        assert compress(b"x" * 100, "gzip") == (b"x" * 100, None)
+        assert compress(body, "gzip;q=0, identity") == (body, None)
+
+    assert compress(body, "gzip") == (body, None)
+
+
+def test_benchmark_reports_each_serializer():
+    """Test that the benchmark compares FastAPI's default encoding against orjson on the same payload."""
+    report = benchmark(sample_match_response(jobs=5, candidates=2), repeat=1)
+
+    rows = {row["serializer"]: row for row in report}
+    assert {"jsonable_encoder+json", "orjson"} <= set(rows)
+    assert all(row["gzip_bytes"] < row["bytes"] for row in report)
+
+
+if __name__ == "__main__":
+    pytest.main()
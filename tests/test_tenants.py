@@ -0,0 +1,26 @@
+import pytest
+from tenants import DEFAULT_TENANT, validate_tenant, tenant_collection_name
+
+
+def test_validate_tenant_accepts_safe_ids():
+    """Test that short lowercase ids are accepted unchanged."""
+    assert validate_tenant("acme") == "acme"
+    assert validate_tenant("acme-corp_2") == "acme-corp_2"
+    assert validate_tenant("a") == "a"
+
+
+@pytest.mark.parametrize("tenant", ["", "Acme", "../acme", "acme-", "-acme", "a" * 25, None])
+def test_validate_tenant_rejects_unsafe_ids(tenant):
+    """Test that ids unusable as collection or directory names are rejected."""
+    with pytest.raises(ValueError):
+        validate_tenant(tenant)
+
+
+def test_tenant_collection_name():
+    """Test that the default tenant keeps the original collection names."""
+    assert tenant_collection_name("resume_collection", DEFAULT_TENANT) == "resume_collection"
+    assert tenant_collection_name("resume_collection", "acme") == "resume_collection__acme"
+
+
+if __name__ == "__main__":
+    pytest.main()
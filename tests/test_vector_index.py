@@ -0,0 +1,238 @@
+import os
+import pytest
+import numpy as np
+from vector_index import BruteForceVectorIndex, HNSWVectorIndex, IVFVectorIndex, recall_report
+
+
+def _random_embeddings(count, dim=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+
+def test_brute_force_query_returns_nearest_first():
+    """Test exact search ordering and cosine distances."""
+    index = BruteForceVectorIndex()
+    index.add(["a", "b", "c"], [[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]])
+
+    ids, distances = index.query([1.0, 0.1], k=2)
+
+    assert ids == ["a", "c"]
+    assert distances[0] < distances[1]
+    assert len(index) == 3
+
+
+def test_brute_force_add_replaces_and_delete_removes():
+    """Test that re-adding an id replaces it and delete removes it."""
+    index = BruteForceVectorIndex()
+    index.add(["a", "b"], [[1.0, 0.0], [0.0, 1.0]])
+    index.add(["a"], [[0.0, 1.0]])
+    index.delete(["b"])
+
+    ids, distances = index.query([0.0, 1.0], k=5)
+
+    assert ids == ["a"]
+    assert distances[0] == pytest.approx(0.0, abs=1e-6)
+
+
+@pytest.fixture
+def hnsw_directory(tmp_path):
+    """Temporary directory for a persisted HNSW index."""
+    pytest.importorskip("hnswlib")
+    return str(tmp_path / "ann")
+
+
+def test_hnsw_incremental_add_and_delete(hnsw_directory):
+    """Test incremental updates on the HNSW index."""
+    index = HNSWVectorIndex(hnsw_directory)
+    embeddings = _random_embeddings(50)
+    ids = [f"id-{i}" for i in range(50)]
+    index.add(ids, embeddings)
+
+    found, _ = index.query(embeddings[7], k=1)
+    assert found == ["id-7"]
+
+    index.delete(["id-7"])
+    found, _ = index.query(embeddings[7], k=5)
+    assert "id-7" not in found
+    assert len(index) == 49
+
+
+def test_hnsw_writes_are_visible_to_other_processes(hnsw_directory):
+    """Test that a second instance replays the write-ahead log of the first."""
+    writer = HNSWVectorIndex(hnsw_directory)
+    reader = HNSWVectorIndex(hnsw_directory)
+    embeddings = _random_embeddings(10)
+
+    writer.add([f"id-{i}" for i in range(10)], embeddings)
+    writer.delete(["id-3"])
+
+    assert len(reader.query(embeddings[0], k=10)[0]) == 9
+    assert reader.query(embeddings[5], k=1)[0] == ["id-5"]
+
+
+def test_hnsw_persists_across_checkpoint_and_reload(hnsw_directory):
+    """Test that a checkpointed index loads back with the same contents."""
+    index = HNSWVectorIndex(hnsw_directory, M=8, ef=32)
+    embeddings = _random_embeddings(30)
+    index.add([f"id-{i}" for i in range(30)], embeddings)
+    index.delete(["id-0"])
+    index.checkpoint()
+    index.add(["id-new"], embeddings[:1])
+
+    reloaded = HNSWVectorIndex(hnsw_directory)
+
+    assert len(reloaded) == 30
+    assert reloaded.query(embeddings[0], k=1)[0] == ["id-new"]
+    assert reloaded.query(embeddings[12], k=1)[0] == ["id-12"]
+
+
+def test_hnsw_automatic_checkpoint(hnsw_directory):
+    """Test that the WAL is folded into a checkpoint after enough writes."""
+    index = HNSWVectorIndex(hnsw_directory, checkpoint_every=3)
+    embeddings = _random_embeddings(4)
+    for i in range(4):
+        index.add([f"id-{i}"], embeddings[i:i + 1])
+
+    reloaded = HNSWVectorIndex(hnsw_directory)
+
+    assert reloaded._generation >= 1
+    assert len(reloaded) == 4
+
+
+def test_hnsw_checkpoint_keeps_previous_generation(hnsw_directory):
+    """Test that a checkpoint keeps the generation other workers may still be reading."""
+    reader = HNSWVectorIndex(hnsw_directory)
+    writer = HNSWVectorIndex(hnsw_directory)
+    embeddings = _random_embeddings(5)
+    writer.add([f"id-{i}" for i in range(5)], embeddings)
+    writer.checkpoint()
+    writer.checkpoint()
+
+    files = set(os.listdir(hnsw_directory))
+    assert {"index-1.bin", "index-2.bin"} <= files
+    writer.checkpoint()
+    assert "index-1.bin" not in set(os.listdir(hnsw_directory))
+
+    assert reader.query(embeddings[2], k=1)[0] == ["id-2"]
+
+
+def test_hnsw_bulk_load_skips_wal_and_keeps_concurrent_writes(hnsw_directory):
+    """Test that a bulk build writes one checkpoint and replays writes made during it."""
+    index = HNSWVectorIndex(hnsw_directory)
+    other_worker = HNSWVectorIndex(hnsw_directory)
+    embeddings = _random_embeddings(21)
+
+    def batches():
+        yield [f"id-{i}" for i in range(10)], embeddings[:10]
+        other_worker.add(["live"], embeddings[20:21])
+        other_worker.delete(["id-3"])
+        yield [f"id-{i}" for i in range(10, 20)], embeddings[10:20]
+
+    assert index.bulk_load(batches())
+
+    assert index._generation == 1
+    assert os.path.getsize(os.path.join(hnsw_directory, "wal-1.log")) == 0
+    assert len(index) == 20
+    assert index.query(embeddings[20], k=1)[0] == ["live"]
+    assert "id-3" not in index.query(embeddings[3], k=5)[0]
+    assert len(other_worker.query(embeddings[0], k=25)[0]) == 20
+
+
+def test_hnsw_bulk_load_only_if_empty(hnsw_directory):
+    """Test that an automatic first build does not overwrite an existing index."""
+    index = HNSWVectorIndex(hnsw_directory)
+    embeddings = _random_embeddings(3)
+    index.add(["a"], embeddings[:1])
+
+    assert index.bulk_load([(["b", "c"], embeddings[1:])], only_if_empty=True) is False
+    assert len(index) == 1
+
+
+def test_recall_report_against_brute_force():
+    """Test that the recall report is perfect for an exact index."""
+    embeddings = _random_embeddings(40)
+    ids = [f"id-{i}" for i in range(40)]
+    index = BruteForceVectorIndex()
+    index.add(ids, embeddings)
+
+    report = recall_report(index, ids, embeddings, embeddings[:5], k=5)
+
+    assert len(report) == 1
+    assert report[0]["recall"] == pytest.approx(1.0)
+    assert report[0]["mean_ms"] >= 0
+
+
+def _clustered_embeddings(clusters=8, per_cluster=60, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    return np.vstack([center + 0.1 * rng.normal(size=(per_cluster, dim)) for center in centers]).astype(np.float32)
+
+
+def test_ivf_untrained_index_is_exact_and_incremental(tmp_path):
+    """Test that vectors added before training are searched exhaustively, with replace and delete."""
+    index = IVFVectorIndex(str(tmp_path / "ivf"))
+    embeddings = _random_embeddings(30)
+    index.add([f"id-{i}" for i in range(30)], embeddings)
+    index.add(["id-0"], embeddings[1:2])
+    index.delete(["id-5"])
+
+    assert index.query(embeddings[7], k=1)[0] == ["id-7"]
+    assert "id-5" not in index.query(embeddings[5], k=30)[0]
+    assert set(index.query(embeddings[1], k=2)[0]) == {"id-0", "id-1"}
+    assert len(index) == 29
+    assert index.cluster_sizes() == []
+
+
+def test_ivf_bulk_load_trains_partition_and_persists(tmp_path):
+    """Test that a bulk build trains k-means, routes queries to nearby clusters and survives reload."""
+    directory = str(tmp_path / "ivf")
+    embeddings = _clustered_embeddings()
+    ids = [f"id-{i}" for i in range(len(embeddings))]
+    index = IVFVectorIndex(directory, nlist=8, nprobe=1)
+
+    assert index.bulk_load([(ids[:200], embeddings[:200]), (ids[200:], embeddings[200:])])
+
+    sizes = index.cluster_sizes()
+    assert len(sizes) == 8 and sum(sizes) == len(ids)
+    assert index.query(embeddings[123], k=1)[0] == ["id-123"]
+
+    other_worker = IVFVectorIndex(directory, nprobe=1)
+    other_worker.add(["new"], embeddings[10:11] + 0.01)
+    other_worker.delete(["id-10"])
+    assert index.query(embeddings[10], k=1)[0] == ["new"]
+
+    index.checkpoint()
+    reloaded = IVFVectorIndex(directory, nprobe=1)
+    assert len(reloaded) == len(ids)
+    assert reloaded.cluster_sizes() == index.cluster_sizes()
+    assert reloaded.query(embeddings[300], k=1)[0] == ["id-300"]
+
+
+def test_ivf_trains_at_checkpoint_once_large_enough(tmp_path):
+    """Test that an index filled through the WAL gets a partition at its first checkpoint."""
+    index = IVFVectorIndex(str(tmp_path / "ivf"), min_train_size=100)
+    embeddings = _clustered_embeddings(clusters=4, per_cluster=40)
+    index.add([f"id-{i}" for i in range(len(embeddings))], embeddings)
+
+    index.checkpoint()
+
+    assert sum(index.cluster_sizes()) == len(embeddings)
+    assert len(index.cluster_sizes()) == len(embeddings) // IVFVectorIndex.MIN_POINTS_PER_CLUSTER
+
+
+def test_recall_report_sweeps_nprobe(tmp_path):
+    """Test that recall rises with the probe count and is exact when every cluster is probed."""
+    embeddings = _random_embeddings(400, seed=1)
+    ids = [f"id-{i}" for i in range(400)]
+    index = IVFVectorIndex(str(tmp_path / "ivf"), nlist=8, nprobe=2)
+    index.bulk_load([(ids, embeddings)])
+
+    report = recall_report(index, ids, embeddings, _random_embeddings(20, seed=2), k=5, values=(1, 8))
+
+    assert [row["value"] for row in report] == [1, 8]
+    assert report[0]["parameter"] == "nprobe"
+    assert report[0]["recall"] <= report[1]["recall"] == pytest.approx(1.0)
+    assert index.nprobe == 2
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,717 @@
+import fcntl
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+
+class VectorIndex:
+
+    """
+    Interface for resume vector indexes used behind `search_resume_chroma`.
+
+    Implementations keep string ids and return cosine distances
+    (1 - cosine similarity), smallest first, like a Chroma cosine query.
+    """
+
+    def add(self, ids, embeddings):
+        raise NotImplementedError
+
+    def delete(self, ids):
+        raise NotImplementedError
+
+    def query(self, query_embedding, k=10):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+
+class BruteForceVectorIndex(VectorIndex):
+
+    """Exact in-memory index; the ground truth for recall reports."""
+
+    def __init__(self):
+        self._ids = []
+        self._row_of = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def add(self, ids, embeddings):
+        embeddings = _normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        self.delete([unique_id for unique_id in ids if unique_id in self._row_of])
+        if not self._ids:
+            self._matrix = np.zeros((0, embeddings.shape[1]), dtype=np.float32)
+        self._matrix = np.vstack([self._matrix, embeddings])
+        for unique_id in ids:
+            self._row_of[unique_id] = len(self._ids)
+            self._ids.append(unique_id)
+
+    def delete(self, ids):
+        rows = [self._row_of[unique_id] for unique_id in ids if unique_id in self._row_of]
+        if not rows:
+            return
+        keep = np.setdiff1d(np.arange(len(self._ids)), rows)
+        self._ids = [self._ids[row] for row in keep]
+        self._matrix = self._matrix[keep]
+        self._row_of = {unique_id: row for row, unique_id in enumerate(self._ids)}
+
+    def query(self, query_embedding, k=10):
+        if not self._ids or k <= 0:
+            return [], []
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+        distances = 1.0 - self._matrix @ query
+        k = min(k, len(self._ids))
+        best = np.argpartition(distances, k - 1)[:k]
+        best = best[np.argsort(distances[best], kind="stable")]
+        return [self._ids[row] for row in best], distances[best].tolist()
+
+    def __len__(self):
+        return len(self._ids)
+
+
+class LoggedVectorIndex(VectorIndex):
+
+    """
+    On-disk persistence shared by the local indexes.
+
+    An index is a checkpoint plus an append-only write-ahead log
+    `wal-<gen>.log`. `manifest.json` names the current generation and is
+    replaced atomically. Every process replays only the new WAL entries
+    before a query, so writes from one gunicorn worker are visible to the
+    others without reloading the whole index. Once the WAL grows past
+    `checkpoint_every` entries it is folded into a new checkpoint.
+
+    Subclasses keep the in-memory structure: `_reset`, `_checkpoint_files`,
+    `_load_files`, `_save_files`, `_apply_add`, `_apply_delete` and
+    `_builder`, plus `_finish_build` for work done once after a bulk load.
+
+    API handlers run on a thread pool, so within a process the replay
+    position and the in-memory structure are guarded by `_mutex`; queries
+    hold it too. The file locks are always taken before it.
+    """
+
+    def __init__(self, directory, checkpoint_every=10_000, load=True):
+        self.directory = directory
+        self.checkpoint_every = checkpoint_every
+
+        self._mutex = threading.RLock()
+        self._generation = None
+        self._wal_offset = 0
+        self._wal_entries = 0
+        self._reset(None)
+
+        os.makedirs(directory, exist_ok=True)
+        if load:
+            self.sync()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @contextmanager
+    def _lock(self, name=".lock"):
+        with open(self._path(name), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_manifest(self):
+        try:
+            with open(self._path("manifest.json")) as manifest_file:
+                return json.load(manifest_file)
+        except FileNotFoundError:
+            return {"generation": 0, "dim": None}
+
+    def _load_checkpoint(self, manifest):
+        generation = manifest["generation"]
+        self._generation = generation
+        self._wal_offset = 0
+        self._wal_entries = 0
+        self._reset(manifest.get("dim"))
+
+        if self._dim is None or not os.path.exists(self._path(self._checkpoint_files(generation)[0])):
+            return
+        self._load_files(generation, manifest)
+
+    def sync(self):
+
+        """Loads a newer checkpoint if one exists and replays unseen WAL entries."""
+
+        with self._mutex:
+            for attempt in range(3):
+                manifest = self._read_manifest()
+                if manifest["generation"] == self._generation:
+                    break
+                try:
+                    self._load_checkpoint(manifest)
+                    break
+                except FileNotFoundError:
+                    # A checkpoint landed between reading the manifest and the
+                    # files; read the manifest again.
+                    self._generation = None
+                    if attempt == 2:
+                        raise
+
+            wal_path = self._path(f"wal-{self._generation}.log")
+            try:
+                if os.path.getsize(wal_path) <= self._wal_offset:
+                    return
+            except FileNotFoundError:
+                return
+
+            with open(wal_path, "rb") as wal_file:
+                wal_file.seek(self._wal_offset)
+                for line in wal_file:
+                    if not line.endswith(b"\n"):
+                        break
+                    self._apply(json.loads(line))
+                    self._wal_offset += len(line)
+                    self._wal_entries += 1
+
+    def _apply(self, entry):
+        if entry["op"] == "add":
+            self._apply_add(entry["ids"], np.asarray(entry["embeddings"], dtype=np.float32))
+        elif entry["op"] == "delete":
+            self._apply_delete(entry["ids"])
+
+    def _append(self, entry):
+        with self._lock(), self._mutex:
+            self.sync()
+            wal_path = self._path(f"wal-{self._generation}.log")
+            with open(wal_path, "ab") as wal_file:
+                wal_file.write(json.dumps(entry).encode("utf-8") + b"\n")
+                wal_file.flush()
+                os.fsync(wal_file.fileno())
+            self.sync()
+            if self._wal_entries >= self.checkpoint_every:
+                self._checkpoint()
+
+    def add(self, ids, embeddings):
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1)
+        self._append({"op": "add", "ids": list(ids), "embeddings": embeddings.tolist()})
+
+    def delete(self, ids):
+        self._append({"op": "delete", "ids": list(ids)})
+
+    def checkpoint(self):
+
+        """Folds the WAL into a fresh on-disk checkpoint."""
+
+        with self._lock(), self._mutex:
+            self.sync()
+            self._checkpoint()
+
+    def _manifest_params(self):
+        return {}
+
+    def _checkpoint(self):
+        old_generation = self._generation
+        generation = old_generation + 1
+
+        self._save_files(generation)
+        open(self._path(f"wal-{generation}.log"), "ab").close()
+        _write_json_atomic(self._path("manifest.json"), {
+            "generation": generation,
+            "dim": self._dim,
+            **self._manifest_params(),
+            "count": len(self),
+        })
+
+        self._generation = generation
+        self._wal_offset = 0
+        self._wal_entries = 0
+
+        # Other workers may still be loading or replaying the generation we
+        # just replaced, so only the one before it is removed.
+        stale = old_generation - 1
+        for name in self._checkpoint_files(stale) + [f"wal-{stale}.log"]:
+            if os.path.exists(self._path(name)):
+                os.remove(self._path(name))
+
+    def _finish_build(self):
+        pass
+
+    def bulk_load(self, batches, only_if_empty=False):
+
+        """
+        Builds the index in memory from `(ids, embeddings)` batches and writes
+        it as a single checkpoint, without going through the WAL.
+
+        The build runs without the writer lock; WAL entries appended by other
+        workers meanwhile are replayed on top before the new checkpoint is
+        published. Concurrent builds are serialised.
+
+        Args:
+            batches (iterable): `(ids, embeddings)` pairs.
+            only_if_empty (bool): Skip the build if the index already has rows.
+
+        Returns:
+            bool: True if a new checkpoint was written.
+        """
+
+        with self._lock(".build.lock"):
+            self.sync()
+            if only_if_empty and len(self) > 0:
+                return False
+
+            generation = self._generation
+            wal_path = self._path(f"wal-{generation}.log")
+            start_offset = os.path.getsize(wal_path) if os.path.exists(wal_path) else 0
+
+            builder = self._builder()
+            builder._generation = generation
+            for ids, embeddings in batches:
+                if len(ids):
+                    builder._apply_add(list(ids), np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+            builder._finish_build()
+
+            with self._lock():
+                if self._read_manifest()["generation"] != generation:
+                    self.sync()
+                    return False
+                if os.path.exists(wal_path):
+                    with open(wal_path, "rb") as wal_file:
+                        wal_file.seek(start_offset)
+                        for line in wal_file:
+                            if line.endswith(b"\n"):
+                                builder._apply(json.loads(line))
+                builder._checkpoint()
+
+        self.sync()
+        return True
+
+
+class HNSWVectorIndex(LoggedVectorIndex):
+
+    """
+    Persistent HNSW index (hnswlib) with incremental add/delete.
+
+    The checkpoint is `index-<gen>.bin` + `labels-<gen>.json`; see
+    `LoggedVectorIndex` for the write-ahead log.
+
+    Args:
+        directory (str): Index directory.
+        M (int): HNSW graph degree.
+        ef_construction (int): Build-time candidate list size.
+        ef (int): Query-time candidate list size (recall vs latency knob).
+        checkpoint_every (int): WAL entries before an automatic checkpoint.
+    """
+
+    search_parameter = "ef"
+    search_values = (16, 32, 64, 128, 256)
+
+    def __init__(self, directory, M=16, ef_construction=200, ef=64, checkpoint_every=10_000, load=True):
+        if hnswlib is None:
+            raise RuntimeError("hnswlib is not installed; install it to use the HNSW vector index.")
+
+        self.M = M
+        self.ef_construction = ef_construction
+        self.ef = ef
+        super().__init__(directory, checkpoint_every=checkpoint_every, load=load)
+
+    def _reset(self, dim):
+        self._dim = dim
+        self._index = None
+        self._labels = []
+        self._label_of = {}
+
+    def _builder(self):
+        return HNSWVectorIndex(self.directory, M=self.M, ef_construction=self.ef_construction, ef=self.ef, load=False)
+
+    def _new_graph(self, dim, capacity):
+        index = hnswlib.Index(space="cosine", dim=dim)
+        index.init_index(max_elements=max(capacity, 1024), M=self.M, ef_construction=self.ef_construction, allow_replace_deleted=False)
+        index.set_ef(self.ef)
+        return index
+
+    def _checkpoint_files(self, generation):
+        return [f"index-{generation}.bin", f"labels-{generation}.json"]
+
+    def _load_files(self, generation, manifest):
+        with open(self._path(f"labels-{generation}.json")) as labels_file:
+            self._labels = json.load(labels_file)
+        self._label_of = {unique_id: label for label, unique_id in enumerate(self._labels) if unique_id is not None}
+
+        self._index = hnswlib.Index(space="cosine", dim=self._dim)
+        self._index.load_index(self._path(f"index-{generation}.bin"), max_elements=max(len(self._labels) * 2, 1024))
+        self._index.set_ef(self.ef)
+
+    def _save_files(self, generation):
+        if self._index is not None:
+            self._index.save_index(self._path(f"index-{generation}.bin"))
+            _write_json_atomic(self._path(f"labels-{generation}.json"), self._labels)
+
+    def _manifest_params(self):
+        return {"M": self.M, "ef_construction": self.ef_construction}
+
+    def _apply_add(self, ids, embeddings):
+        if self._index is None:
+            self._dim = embeddings.shape[1]
+            self._index = self._new_graph(self._dim, len(ids))
+
+        labels = []
+        for unique_id in ids:
+            label = self._label_of.get(unique_id)
+            if label is None:
+                label = len(self._labels)
+                self._labels.append(unique_id)
+                self._label_of[unique_id] = label
+            labels.append(label)
+
+        if len(self._labels) > self._index.get_max_elements():
+            self._index.resize_index(max(len(self._labels), self._index.get_max_elements() * 2))
+        self._index.add_items(embeddings, labels)
+
+    def _apply_delete(self, ids):
+        for unique_id in ids:
+            label = self._label_of.pop(unique_id, None)
+            if label is None:
+                continue
+            self._labels[label] = None
+            self._index.mark_deleted(label)
+
+    def query(self, query_embedding, k=10):
+        with self._mutex:
+            self.sync()
+            if self._index is None or k <= 0 or not self._label_of:
+                return [], []
+
+            k = min(k, len(self._label_of))
+            self._index.set_ef(max(self.ef, k))
+            labels, distances = self._index.knn_query(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1), k=k)
+            return [self._labels[label] for label in labels[0]], distances[0].tolist()
+
+    def __len__(self):
+        return len(self._label_of)
+
+
+class IVFVectorIndex(LoggedVectorIndex):
+
+    """
+    Persistent inverted-file (IVF) index: resumes are partitioned by k-means
+    over their normalized embeddings, and a query scores the centroids
+    first and then only the members of the `nprobe` nearest clusters.
+
+    The partition is trained by `bulk_load` (`python vector_index.py build`),
+    or at the first checkpoint with `min_train_size` vectors, and stored with
+    the inverted lists in the checkpoint (`ivf-<gen>.npz` +
+    `labels-<gen>.json`). Later adds are assigned to the nearest existing
+    centroid, so the partition drifts as the pool changes until it is
+    rebuilt. Vectors added before any partition exists are scanned
+    exhaustively.
+
+    Args:
+        directory (str): Index directory.
+        nlist (int): Number of clusters; by default 4 * sqrt(pool size).
+        nprobe (int): Clusters scanned per query (recall vs latency knob).
+        train_sample (int): Vectors k-means is trained on.
+        iterations (int): k-means iterations.
+        min_train_size (int): Vectors needed to train at a checkpoint.
+        checkpoint_every (int): WAL entries before an automatic checkpoint.
+    """
+
+    search_parameter = "nprobe"
+    search_values = (1, 2, 4, 8, 16, 32, 64)
+
+    # k-means needs a few dozen training vectors per centroid.
+    MIN_POINTS_PER_CLUSTER = 39
+
+    def __init__(
+        self, directory, nlist=None, nprobe=8, train_sample=50_000, iterations=10, min_train_size=10_000,
+        checkpoint_every=10_000, load=True
+    ):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_sample = train_sample
+        self.iterations = iterations
+        self.min_train_size = min_train_size
+        super().__init__(directory, checkpoint_every=checkpoint_every, load=load)
+
+    def _reset(self, dim):
+        self._dim = dim
+        self._centroids = None
+        self._ids = []
+        self._row_of = {}
+        self._vectors = np.zeros((0, dim or 0), dtype=np.float32)
+        self._assignment = np.zeros(0, dtype=np.int32)
+        self._members = []
+        self._unassigned = set()
+
+    def _builder(self):
+        return IVFVectorIndex(
+            self.directory, nlist=self.nlist, nprobe=self.nprobe, train_sample=self.train_sample,
+            iterations=self.iterations, min_train_size=self.min_train_size, load=False
+        )
+
+    def _checkpoint_files(self, generation):
+        return [f"ivf-{generation}.npz", f"labels-{generation}.json"]
+
+    def _load_files(self, generation, manifest):
+        with open(self._path(f"labels-{generation}.json")) as labels_file:
+            self._ids = json.load(labels_file)
+        with np.load(self._path(f"ivf-{generation}.npz")) as arrays:
+            self._vectors = arrays["vectors"]
+            self._assignment = arrays["assignment"]
+            centroids = arrays["centroids"]
+        self._row_of = {unique_id: row for row, unique_id in enumerate(self._ids)}
+        if len(centroids):
+            self._set_partition(centroids, self._assignment[:len(self._ids)])
+        else:
+            self._unassigned = set(range(len(self._ids)))
+
+    def _save_files(self, generation):
+        if self._dim is None:
+            return
+        if self._centroids is None and len(self) >= self.min_train_size:
+            self._train()
+
+        rows = np.fromiter(self._row_of.values(), dtype=np.int64, count=len(self._row_of))
+        rows.sort()
+        centroids = self._centroids if self._centroids is not None else np.zeros((0, self._dim), dtype=np.float32)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as temp_file:
+            np.savez(
+                temp_file, centroids=centroids, vectors=self._vectors[rows], assignment=self._assignment[rows]
+            )
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.replace(temp_path, self._path(f"ivf-{generation}.npz"))
+        _write_json_atomic(self._path(f"labels-{generation}.json"), [self._ids[row] for row in rows.tolist()])
+
+    def _manifest_params(self):
+        return {"nlist": 0 if self._centroids is None else len(self._centroids)}
+
+    def _set_partition(self, centroids, assignment):
+        self._centroids = centroids
+        self._assignment = np.asarray(assignment, dtype=np.int32)
+        self._members = [set() for _ in range(len(centroids))]
+        self._unassigned = set()
+        for row, cluster in enumerate(self._assignment.tolist()):
+            if row < len(self._ids) and self._ids[row] is not None:
+                self._members[cluster].add(row)
+
+    def _nearest(self, vectors, batch_size=8192):
+        return np.concatenate([
+            np.argmax(vectors[start:start + batch_size] @ self._centroids.T, axis=1)
+            for start in range(0, len(vectors), batch_size)
+        ]).astype(np.int32) if len(vectors) else np.zeros(0, dtype=np.int32)
+
+    def _train(self):
+        rows = np.fromiter(self._row_of.values(), dtype=np.int64, count=len(self._row_of))
+        if rows.size == 0:
+            return
+        rows.sort()
+        rng = np.random.default_rng(0)
+        sample = self._vectors[rng.choice(rows, size=min(self.train_sample, rows.size), replace=False)]
+        nlist = self.nlist or int(4 * np.sqrt(rows.size))
+        nlist = max(1, min(nlist, len(sample) // self.MIN_POINTS_PER_CLUSTER or 1))
+
+        centroids = sample[rng.choice(len(sample), size=nlist, replace=False)].copy()
+        for _ in range(self.iterations):
+            self._centroids = centroids
+            nearest = self._nearest(sample)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, nearest, sample)
+            counts = np.bincount(nearest, minlength=nlist)
+            # Empty clusters are re-seeded with random sample vectors.
+            empty = np.flatnonzero(counts == 0)
+            sums[empty] = sample[rng.choice(len(sample), size=empty.size, replace=False)]
+            centroids = _normalize(sums)
+
+        self._centroids = centroids.astype(np.float32)
+        assignment = np.full(len(self._vectors), -1, dtype=np.int32)
+        assignment[rows] = self._nearest(self._vectors[rows])
+        self._set_partition(self._centroids, assignment)
+
+    def _finish_build(self):
+        self._train()
+
+    def _apply_add(self, ids, embeddings):
+        embeddings = _normalize(embeddings)
+        if self._dim is None:
+            self._dim = embeddings.shape[1]
+            self._vectors = np.zeros((0, self._dim), dtype=np.float32)
+
+        clusters = self._nearest(embeddings) if self._centroids is not None else None
+        for position, unique_id in enumerate(ids):
+            row = self._row_of.get(unique_id)
+            if row is None:
+                row = len(self._ids)
+                self._ids.append(unique_id)
+                self._row_of[unique_id] = row
+                if row >= len(self._vectors):
+                    capacity = max(row + 1, len(self._vectors) * 2, 1024)
+                    self._vectors = np.resize(self._vectors, (capacity, self._dim))
+                    self._assignment = np.resize(self._assignment, capacity)
+            else:
+                self._unlink(row)
+            self._vectors[row] = embeddings[position]
+            if clusters is None:
+                self._assignment[row] = -1
+                self._unassigned.add(row)
+            else:
+                self._assignment[row] = clusters[position]
+                self._members[clusters[position]].add(row)
+
+    def _unlink(self, row):
+        cluster = self._assignment[row]
+        if cluster < 0:
+            self._unassigned.discard(row)
+        else:
+            self._members[cluster].discard(row)
+
+    def _apply_delete(self, ids):
+        for unique_id in ids:
+            row = self._row_of.pop(unique_id, None)
+            if row is None:
+                continue
+            self._unlink(row)
+            self._ids[row] = None
+
+    def _probe_rows(self, query):
+        lists = [self._unassigned]
+        if self._centroids is not None:
+            scores = self._centroids @ query
+            nprobe = min(self.nprobe, len(scores))
+            lists += [self._members[cluster] for cluster in np.argpartition(-scores, nprobe - 1)[:nprobe]]
+        return np.fromiter(itertools.chain.from_iterable(lists), dtype=np.int64)
+
+    def query(self, query_embedding, k=10):
+        query = _normalize(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+        with self._mutex:
+            self.sync()
+            if not self._row_of or k <= 0:
+                return [], []
+
+            rows = self._probe_rows(query)
+            if rows.size == 0:
+                return [], []
+            distances = 1.0 - self._vectors[rows] @ query
+            k = min(k, rows.size)
+            best = np.argpartition(distances, k - 1)[:k]
+            best = best[np.argsort(distances[best], kind="stable")]
+            return [self._ids[row] for row in rows[best].tolist()], distances[best].tolist()
+
+    def cluster_sizes(self):
+
+        """Members per cluster, for checking how balanced the partition still is."""
+
+        with self._mutex:
+            self.sync()
+            return [len(members) for members in self._members]
+
+    def __len__(self):
+        return len(self._row_of)
+
+
+# Persistent backends selectable with ATS_VECTOR_INDEX. BruteForceVectorIndex
+# is per-process and in-memory, so it is only used for tests and reports.
+VECTOR_INDEX_BACKENDS = {
+    "hnsw": HNSWVectorIndex,
+    "ivf": IVFVectorIndex,
+}
+
+
+def _normalize(matrix):
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _write_json_atomic(path, payload):
+
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w") as temp_file:
+        json.dump(payload, temp_file)
+        temp_file.flush()
+        os.fsync(temp_file.fileno())
+    os.replace(temp_path, path)
+
+
+def recall_report(index, ids, embeddings, queries, k=10, values=None):
+
+    """
+    Measures recall@k and query latency of `index` against brute force.
+
+    Args:
+        index (VectorIndex): Index under test; must already contain `ids`.
+        ids (list[str]): Ids of the indexed embeddings.
+        embeddings (array-like): The indexed embeddings.
+        queries (array-like): Query vectors.
+        k (int): Neighbours per query.
+        values (tuple[int]): Settings of the index's search parameter (`ef`
+            for HNSW, `nprobe` for IVF) to sweep; defaults to the index's own.
+
+    Returns:
+        list[dict]: One row per setting with recall and latency in milliseconds.
+    """
+
+    exact = BruteForceVectorIndex()
+    exact.add(list(ids), embeddings)
+    truth = [set(exact.query(query, k)[0]) for query in queries]
+
+    parameter = getattr(index, "search_parameter", None)
+    settings = (values or index.search_values) if parameter else (None,)
+    original = getattr(index, parameter) if parameter else None
+    report = []
+    for value in settings:
+        if parameter:
+            setattr(index, parameter, value)
+
+        hits, latencies = 0, []
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            found, _ = index.query(query, k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len(expected.intersection(found))
+
+        report.append({
+            "parameter": parameter,
+            "value": value,
+            "recall": hits / max(sum(len(expected) for expected in truth), 1),
+            "mean_ms": float(np.mean(latencies)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+        })
+    if parameter:
+        setattr(index, parameter, original)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or evaluate the resume ANN index.")
+    parser.add_argument("command", choices=["build", "report"])
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--tenant", default="default")
+    parser.add_argument("--values", type=int, nargs="+", help="Search parameter settings to sweep (ef or nprobe).")
+    args = parser.parse_args()
+
+    from chroma_utils import rebuild_resume_ann_index, get_resume_ann_index, iter_resume_batches
+    from tenants import validate_tenant
+
+    tenant = validate_tenant(args.tenant)
+    if args.command == "build":
+        print(f"Indexed {rebuild_resume_ann_index(tenant)} resumes.")
+    else:
+        ids, embeddings = [], []
+        for batch in iter_resume_batches(include=["embeddings"], tenant=tenant):
+            ids.extend(batch['ids'])
+            embeddings.extend(batch['embeddings'])
+        sample = np.random.default_rng(0).choice(len(ids), size=min(args.queries, len(ids)), replace=False)
+        queries = [embeddings[i] for i in sample]
+        for row in recall_report(get_resume_ann_index(tenant), ids, embeddings, queries, k=args.k, values=args.values):
+            print(f"{row['parameter']}={row['value']}\trecall@{args.k}={row['recall']:.3f}\tmean={row['mean_ms']:.2f}ms\tp95={row['p95_ms']:.2f}ms")